@@ -0,0 +1,261 @@
+"""
+Vectorised board engine, for stepping thousands of games at once with NumPy.
+
+`BatchBoards` holds N layouts as an (N, 4, 13) int8 array of card codes
+(the same codes as engine.py, with BLANK for spaces), and does the same things
+as `Board` (legal moves, making moves, stuck and ordered checks, new rounds)
+for all of them in a few array operations, rather than one game at a time in Python.
+
+The legal moves for a layout are stored as 16 candidates, 4 for each space:
+a space at the start of a row can take any of the four 2s,
+and any other space can take at most one card (the next one up from the card before it).
+
+`play_batch` uses it to play whole games, like `simulate.play_game`,
+but with NumPy's random number generator, so the deals for a seed are different.
+"""
+
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+
+from engine import BLANK, KING, ROUNDS, TWOS
+from simulate import MAX_MOVES_PER_ROUND, SimulationStats
+
+# Column of each slot
+COLS = np.arange(52) % 13
+
+# The total of split_index when every row is ordered
+ALL_ORDERED = 4 * 12
+
+
+class BatchBoards:
+    """N layouts, as an (N, 4, 13) array of card codes, with an index of where each card is"""
+
+    def __init__(self, cells):
+        self.cells = np.array(cells, dtype=np.int8).reshape(-1, 4, 13)
+        self.pos = np.full((len(self), 52), BLANK, dtype=np.int8)
+        self.build_index()
+
+    @classmethod
+    def deal(cls, n, rng):
+        """Deal n layouts, using a NumPy random Generator"""
+        deck = np.array([BLANK if code % 13 == 0 else code for code in range(52)], dtype=np.int8)
+        return cls(rng.permuted(np.tile(deck, (n, 1)), axis=1))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def keep(self, which):
+        """Drop all but the layouts in `which` (an array of indices)"""
+        self.cells = self.cells[which]
+        self.pos = self.pos[which]
+
+    @property
+    def flat(self):
+        """The layouts as an (N, 52) array, by slot (a view, so can be written to)"""
+        return self.cells.reshape(len(self), 52)
+
+    def build_index(self, which=None):
+        """(Re)build the card -> slot index, for all layouts or for those in `which` (an array of indices)"""
+        if which is None:
+            which = np.arange(len(self))
+        flat = self.flat[which]
+        self.pos[which] = BLANK
+        boards, slots = np.nonzero(flat != BLANK)
+        self.pos[which[boards], flat[boards, slots]] = slots
+
+    def blanks(self):
+        """(N, 4) array of the slots of the spaces in each layout"""
+        # every layout has exactly four, and np.nonzero goes through them in order
+        return np.nonzero(self.flat == BLANK)[1].reshape(len(self), 4)
+
+    def live_blanks(self, blanks):
+        """Which spaces a card can be moved into: at the start of a row,
+        or after a card other than a King (as in `Board.is_valid_move`)"""
+        at_start = blanks % 13 == 0
+        before = np.take_along_axis(self.flat, np.maximum(blanks - 1, 0), axis=1)
+        after_card = ~at_start & (before != BLANK) & (before % 13 + 1 != KING)
+        return at_start, before, after_card
+
+    def legal_moves(self):
+        """Candidate moves, as three (N, 16) arrays: from slots, to slots, and which are valid"""
+        n = len(self)
+        blanks = self.blanks()
+        at_start, before, after_card = self.live_blanks(blanks)
+
+        # the cards wanted in each space: any 2 at the start of a row, otherwise the next card up
+        wanted = np.empty((n, 4, 4), dtype=np.int8)
+        wanted[:] = TWOS
+        wanted[:, :, 0] = np.where(at_start, TWOS[0], before + 1)
+        valid = np.repeat(at_start[:, :, None], 4, axis=2)
+        valid[:, :, 0] |= after_card
+
+        wanted = np.where(valid, wanted, 0).reshape(n, 16) # (any real card, to keep the lookup in range)
+        from_slots = np.take_along_axis(self.pos, wanted, axis=1)
+        to_slots = np.repeat(blanks, 4, axis=1)
+        return from_slots, to_slots, valid.reshape(n, 16)
+
+    def apply(self, from_slots, to_slots, active):
+        """Make one move in each active layout (from (N,) arrays of slots, and an (N,) bool array)"""
+        which = np.nonzero(active)[0]
+        from_slots = from_slots[which]
+        to_slots = to_slots[which]
+        flat = self.flat
+        cards = flat[which, from_slots]
+        flat[which, to_slots] = cards
+        flat[which, from_slots] = BLANK
+        self.pos[which, cards] = to_slots
+
+    def is_stuck(self):
+        """(N,) bool array: are all the spaces after Kings or other spaces?"""
+        at_start, _, after_card = self.live_blanks(self.blanks())
+        return ~(at_start | after_card).any(axis=1)
+
+    def split_index(self):
+        """(N, 4) array of the length of the ordered run at the start of each row"""
+        first = self.cells[:, :, 0].astype(np.int16)
+        starts_with_2 = (first != BLANK) & (first % 13 + 1 == 2)
+        # an ordered row is first, first + 1, first + 2, ...
+        expected = first[:, :, None] + np.arange(13)
+        match = (self.cells == expected) & starts_with_2[:, :, None]
+        # (the 13th card can never match, as first + 12 would be an Ace)
+        return np.cumprod(match, axis=2).sum(axis=2)
+
+    def ordered_count(self):
+        return self.split_index().sum(axis=1)
+
+    def is_ordered(self):
+        return (self.split_index() == 12).all(axis=1)
+
+    def redeal(self, which, rng):
+        """Start a new round in the layouts in `which` (an array of indices), as in `Board.redeal`"""
+        if len(which) == 0:
+            return
+        flat = self.flat[which]
+        split = np.repeat(self.split_index()[which], 13, axis=1) # (m, 52), each row's split for each slot
+        ordered = COLS < split
+        unordered_cards = ~ordered & (flat != BLANK)
+
+        # shuffle the unordered cards to the front of each layout
+        keys = rng.random(flat.shape)
+        keys[~unordered_cards] = 2.0
+        shuffled = np.take_along_axis(flat, np.argsort(keys, axis=1), axis=1)
+        count = unordered_cards.sum(axis=1)
+
+        # keep the ordered cards, leave a space after them, and fill the rest of each row
+        new = np.where(ordered, flat, BLANK).astype(np.int8)
+        fill = COLS > split
+        new[fill] = shuffled[np.arange(52) < count[:, None]]
+
+        self.flat[which] = new
+        self.build_index(which)
+
+
+# Batch policies choose one of the 16 candidate moves for each layout,
+# returning an (N,) array of indices into the candidates.
+# Layouts with no valid moves get an arbitrary index, which isn't used.
+
+def random_policy(boards, from_slots, to_slots, valid, rng):
+    """Any legal move"""
+    keys = rng.random(valid.shape)
+    keys[~valid] = -1.0
+    return keys.argmax(axis=1)
+
+
+def greedy_policy(boards, from_slots, to_slots, valid, rng):
+    """As `simulate.greedy_policy`: a move that adds to the ordered cards if there is one,
+    otherwise one that doesn't take a card out of them"""
+    split = np.repeat(boards.split_index(), 13, axis=1)
+    extends = COLS[to_slots] == np.take_along_axis(split, to_slots, axis=1)
+    breaks = COLS[from_slots] < np.take_along_axis(split, from_slots, axis=1)
+    # the random part breaks ties, without outweighing the score
+    keys = extends.astype(np.float64) - breaks + rng.random(valid.shape) * 0.5
+    keys[~valid] = -2.0
+    return keys.argmax(axis=1)
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+
+def play_batch(n, policy, rng, rounds=ROUNDS, max_moves=MAX_MOVES_PER_ROUND):
+    """Play n games in lockstep, one move in every game per step. Returns `SimulationStats`."""
+    boards = BatchBoards.deal(n, rng)
+    game = np.arange(n) # which game each layout in `boards` is
+    round = np.zeros(n, dtype=np.int64) # index from 0
+    moves = np.zeros(n, dtype=np.int64)
+    done = np.zeros(n, dtype=bool)
+    won = np.zeros(n, dtype=bool)
+    ordered_log = np.full((n, rounds), -1, dtype=np.int64)
+    moves_log = np.zeros((n, rounds), dtype=np.int64)
+
+    while not done.all():
+        # a few games can go on much longer than the rest,
+        # so once most are finished, stop stepping the finished ones
+        if done.sum() > len(done) // 2:
+            playing = np.nonzero(~done)[0]
+            boards.keep(playing)
+            game, round, moves, done = game[playing], round[playing], moves[playing], done[playing]
+
+        from_slots, to_slots, valid = boards.legal_moves()
+
+        # end the round for games that are stuck (or have gone on too long)
+        end_round = ~done & (~valid.any(axis=1) | (moves >= max_moves))
+        if end_round.any():
+            ending = np.nonzero(end_round)[0]
+            ordered = boards.ordered_count()[ending]
+            ordered_log[game[ending], round[ending]] = ordered
+            moves_log[game[ending], round[ending]] = moves[ending]
+            won[game[ending]] = ordered == ALL_ORDERED
+            finished = (ordered == ALL_ORDERED) | (round[ending] == rounds - 1)
+            done[ending[finished]] = True
+            next_round = ending[~finished]
+            round[next_round] += 1
+            moves[next_round] = 0
+            boards.redeal(next_round, rng)
+
+        # everyone else makes a move (games in a new round start next step)
+        active = ~done & ~end_round
+        choice = policy(boards, from_slots, to_slots, valid, rng)
+        everyone = np.arange(len(boards))
+        boards.apply(from_slots[everyone, choice], to_slots[everyone, choice], active)
+        moves[active] += 1
+
+    stats = SimulationStats(rounds)
+    stats.games = n
+    stats.wins = int(won.sum())
+    stats.rounds_used = Counter({int(k): int(v) for k, v in zip(*np.unique((ordered_log >= 0).sum(axis=1), return_counts=True))})
+    for r in range(rounds):
+        played = ordered_log[:, r] >= 0
+        values, counts = np.unique(ordered_log[played, r], return_counts=True)
+        stats.ordered[r] = Counter({int(k): int(v) for k, v in zip(values, counts)})
+        stats.moves[r] = int(moves_log[played, r].sum())
+    return stats
+
+
+def simulate_batch(games, policy="random", seed=0, rounds=ROUNDS, batch_size=10000):
+    """Play `games` games, `batch_size` at a time, and return the `SimulationStats`"""
+    rng = np.random.default_rng(seed)
+    stats = SimulationStats(rounds)
+    began = time.perf_counter()
+    for start in range(0, games, batch_size):
+        stats.merge(play_batch(min(batch_size, games - start), POLICIES[policy], rng, rounds))
+    stats.seconds = time.perf_counter() - began
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate games of Interference, many at once with NumPy")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    stats = simulate_batch(args.games, args.policy, args.seed, batch_size=args.batch_size)
+    print(stats, end="")
+    print(f"{stats.seconds:.1f}s ({stats.games / stats.seconds:,.0f} games/sec)")
@@ -0,0 +1,313 @@
+"""
+Benchmarks for the hot paths of Interference.
+
+Times the engine operations (dealing, checking and making moves, the stuck
+check, new rounds), whole random games, how long the modules take to import
+(checking that only the game itself loads arcade), and the game view itself
+(`GameView.setup`, `GameView.new_round`, `Deck.move` and the frame time
+of `GameView.on_draw`, in a hidden headless window), and the frame time of the
+spectator view with 64 tables (spectator.py).
+
+Results are times in seconds per operation (lower is better), and can be
+saved as JSON and compared with a saved baseline, e.g.
+
+    python benchmark.py --save baseline.json
+    ... change something ...
+    python benchmark.py --compare baseline.json
+
+which exits with status 1 if anything is slower than the baseline
+by more than its threshold (from THRESHOLDS, or DEFAULT_THRESHOLD,
+unless one for every benchmark is given with --threshold).
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from engine import Board
+from simulate import game_seed, play_game, random_policy
+
+# Modules that mustn't load arcade when they're imported (the batch workers import these)
+HEADLESS_MODULES = ["interference", "engine", "solver", "simulate", "batch", "dealindex", "movelog", "poscache", "hint",
+                    "tournament", "planner", "deadlock", "dataset"]
+
+# How much slower than the baseline a benchmark can be before it counts as a regression
+DEFAULT_THRESHOLD = 0.25
+# (timings that go through the graphics driver are noisier)
+THRESHOLDS = {
+    "gameview_setup": 0.5,
+    "gameview_new_round": 0.5,
+    "on_draw_frame": 0.5,
+    "on_draw_frame_p95": 0.5,
+    "spectator_frame": 0.5,
+    "spectator_frame_p95": 0.5,
+    # (and so are timings that start a new process)
+    **{f"import_{module}": 0.5 for module in HEADLESS_MODULES + ["game"]},
+}
+
+# Time spent on each benchmark (roughly, in seconds)
+MIN_TIME = 0.5
+REPEAT = 5
+
+FRAMES = 200
+
+# Fresh interpreters started to time each import
+IMPORT_REPEAT = 5
+
+# Times an import in a new interpreter, printing the seconds, and whether arcade got loaded
+IMPORT_SCRIPT = """
+import sys, time
+began = time.perf_counter()
+import {module}
+print(time.perf_counter() - began, "arcade" in sys.modules)
+"""
+
+
+def time_per_op(run, ops=1, min_time=MIN_TIME, repeat=REPEAT):
+    """Seconds per operation for `run()`, which does `ops` operations.
+    Runs it in a loop, `repeat` times, and takes the fastest (the least disturbed by anything else)."""
+    loops = 1
+    while True:
+        began = time.perf_counter()
+        for _ in range(loops):
+            run()
+        seconds = time.perf_counter() - began
+        if seconds >= min_time / repeat:
+            break
+        loops *= 2
+
+    best = seconds
+    for _ in range(repeat - 1):
+        began = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, time.perf_counter() - began)
+    return best / (loops * ops)
+
+
+def engine_benchmarks(min_time=MIN_TIME):
+    """Benchmarks for engine.py and simulate.py, which don't need a display"""
+    rng = random.Random(0)
+    results = {}
+
+    results["deal"] = time_per_op(lambda: Board.deal(rng), min_time=min_time)
+
+    # a mix of legal and illegal moves, from a few positions
+    boards = [Board.deal(rng) for _ in range(10)]
+    checks = [(board, rng.randrange(52), rng.randrange(52)) for board in boards for _ in range(90)]
+    checks += [(board, *move) for board in boards for move in board.legal_moves()]
+
+    def check_moves():
+        for board, from_slot, to_slot in checks:
+            board.is_valid_move(from_slot, to_slot)
+    results["is_valid_move"] = time_per_op(check_moves, len(checks), min_time)
+
+    # make a move and take it back
+    moves = [(board, move) for board in boards for move in board.legal_moves()]
+
+    def apply_moves():
+        for board, (from_slot, to_slot) in moves:
+            board.apply((from_slot, to_slot))
+            board.apply((to_slot, from_slot))
+    results["apply"] = time_per_op(apply_moves, 2 * len(moves), min_time)
+
+    def legal_moves():
+        for board in boards:
+            board.legal_moves()
+    results["legal_moves"] = time_per_op(legal_moves, len(boards), min_time)
+
+    def is_stuck():
+        for board in boards:
+            board.is_stuck()
+    results["is_stuck"] = time_per_op(is_stuck, len(boards), min_time)
+
+    results["redeal"] = time_per_op(lambda: boards[0].redeal(rng), min_time=min_time)
+
+    seeds = [game_seed(0, game) for game in range(20)]
+
+    def random_games():
+        for seed in seeds:
+            play_game(seed, random_policy)
+    results["random_game"] = time_per_op(random_games, len(seeds), min_time)
+
+    return results
+
+
+def import_time(module, repeat=IMPORT_REPEAT):
+    """Seconds to import a module in a new interpreter (the fastest of `repeat` tries),
+    and whether it loaded arcade"""
+    env = dict(os.environ, ARCADE_HEADLESS="1")
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module)], env=env,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+        seconds, loaded_arcade = out.stdout.split()
+        best = min(best or float(seconds), float(seconds))
+    return best, loaded_arcade == "True"
+
+
+def import_benchmarks(ui=True, repeat=IMPORT_REPEAT):
+    """Import times for the launcher and the engine (which shouldn't load arcade), and for the game (which does)"""
+    results = {}
+    for module in HEADLESS_MODULES:
+        seconds, loaded_arcade = import_time(module, repeat)
+        if loaded_arcade:
+            raise RuntimeError(f"importing {module} loads arcade")
+        results[f"import_{module}"] = seconds
+    if ui:
+        results["import_game"], _ = import_time("game", repeat)
+    return results
+
+
+def ui_benchmarks(min_time=MIN_TIME, frames=FRAMES):
+    """Benchmarks for the game view, in a hidden window with no display needed"""
+    os.environ.setdefault("ARCADE_HEADLESS", "1")
+    from game import SCREEN_HEIGHT, SCREEN_WIDTH, GameView, GameWindow
+
+    window = GameWindow(int(SCREEN_WIDTH), int(SCREEN_HEIGHT), "Benchmark", visible=False)
+    game = GameView()
+    window.show_view(game)
+    results = {}
+
+    results["gameview_setup"] = time_per_op(game.setup, min_time=min_time)
+
+    def new_round():
+        game.round = 1 # so it never runs out of rounds
+        game.new_round()
+    results["gameview_new_round"] = time_per_op(new_round, min_time=min_time)
+
+    game.setup()
+    card = next(card for card in game.deck if card.value != "Blank")
+    blank = next(card for card in game.deck if card.value == "Blank")
+
+    def move_sprites():
+        game.deck.move(card.slot, blank.slot)
+        game.deck.move(card.slot, blank.slot)
+    results["move_sprites"] = time_per_op(move_sprites, 2, min_time)
+
+    # frame time: draw, then wait for the GPU to finish, so the work isn't just queued up
+    game.on_draw()
+    window.ctx.finish()
+    times = []
+    for _ in range(frames):
+        began = time.perf_counter()
+        game.on_draw()
+        window.ctx.finish()
+        times.append(time.perf_counter() - began)
+    results["on_draw_frame"] = statistics.median(times)
+    results["on_draw_frame_p95"] = statistics.quantiles(times, n=20)[-1]
+
+    window.close()
+    return results
+
+
+def spectator_benchmarks(frames=FRAMES, columns=8, rows=8):
+    """Frame time of the spectator view (a frame's update and draw), in a hidden window"""
+    os.environ.setdefault("ARCADE_HEADLESS", "1")
+    import arcade
+    from spectator import SCREEN_HEIGHT, SCREEN_WIDTH, SpectatorView
+
+    # (collect the last benchmark's window first: pyglet closes a window when it's deleted,
+    # and arcade then forgets whichever window is current, even if it's a newer one)
+    gc.collect()
+    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, "Benchmark", visible=False, antialiasing=False)
+    view = SpectatorView(columns, rows, "greedy", plies_per_second=60)
+    window.show_view(view)
+    view.on_draw()
+    window.ctx.finish()
+    times = []
+    for _ in range(frames):
+        began = time.perf_counter()
+        view.on_update(1 / 60)
+        view.on_draw()
+        window.ctx.finish()
+        times.append(time.perf_counter() - began)
+
+    window.close()
+    return {
+        "spectator_frame": statistics.median(times),
+        "spectator_frame_p95": statistics.quantiles(times, n=20)[-1],
+    }
+
+
+def run_benchmarks(ui=True, min_time=MIN_TIME):
+    results = engine_benchmarks(min_time)
+    results.update(import_benchmarks(ui))
+    if ui:
+        results.update(ui_benchmarks(min_time))
+        results.update(spectator_benchmarks())
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=None):
+    """Compare results with a baseline (both as returned by `run_benchmarks`),
+    with the same threshold for every benchmark, if one's given, otherwise each one's own.
+    Returns a list of (name, seconds, baseline seconds, change, regressed)
+    for the benchmarks in both."""
+    rows = []
+    for name, seconds in results["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        change = seconds / base - 1
+        limit = threshold if threshold is not None else THRESHOLDS.get(name, DEFAULT_THRESHOLD)
+        rows.append((name, seconds, base, change, change > limit))
+    return rows
+
+
+def format_seconds(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.2f} us"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Interference")
+    parser.add_argument("--no-ui", action="store_true", help="only benchmark the engine (no arcade needed)")
+    parser.add_argument("--quick", action="store_true", help="spend less time on each benchmark (noisier)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--save", metavar="FILE", help="save the results as JSON, e.g. as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="fraction slower than the baseline that counts as a regression, for every benchmark "
+                             f"(default {DEFAULT_THRESHOLD}, or more for the noisier ones)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(ui=not args.no_ui, min_time=MIN_TIME / 5 if args.quick else MIN_TIME)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        rows = compare(results, baseline, args.threshold)
+        regressions = [name for name, *_, regressed in rows if regressed]
+        results["compare"] = {name: {"seconds": seconds, "baseline": base, "change": change, "regressed": regressed}
+                              for name, seconds, base, change, regressed in rows}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif args.compare:
+        for name, seconds, base, change, regressed in rows:
+            print(f"{name:20} {format_seconds(seconds):>12} {format_seconds(base):>12} {change:+7.1%}"
+                  + ("  REGRESSION" if regressed else ""))
+    else:
+        for name, seconds in results["results"].items():
+            print(f"{name:20} {format_seconds(seconds):>12} {1 / seconds:>14,.0f}/s")
+
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,431 @@
+"""
+Datasets of positions and the moves played from them, for training and analysing move heuristics,
+stored as fixed-width NumPy columns that can be memory-mapped.
+
+Every position a move was made from is a row, with these columns:
+
+- board: the layout, as 52 int8 card codes in slot order (as `Board.cells`)
+- round: which round it was (from 1)
+- move: the move made, as (from_slot, to_slot)
+- legal: the legal moves, as a 16-bit mask of the 16 candidates of batch.py
+  (bit 4k + j is candidate j for the kth space in slot order: the 2 of suit j
+  for a space at the start of a row, otherwise just j = 0, the next card up)
+- choice: which of the candidates the move was (so `legal >> choice & 1` is always 1)
+- game: the game's number in the dataset
+- won, ordered: how the game ended (whether it was won, and the ordered cards at the end of its last round)
+
+and every game is a row of a smaller table (seed, won, rounds, ordered, positions),
+so the positions of game g are the `positions` rows after those of games 0 to g - 1.
+`batch.BatchBoards(rows["board"]).legal_moves()` turns the boards of a batch back into
+the candidate moves that `legal` and `choice` refer to.
+
+A dataset is a directory of chunks, each a few thousand games, with every column of a chunk
+in its own .npy file (`00000-board.npy`, `00000-game-seed.npy`, ...), and `index.json`
+listing the chunks and columns. The index is rewritten as each chunk is finished,
+so a dataset can be read while it's still being written (up to the last finished chunk).
+
+`PositionBuffer` is what the positions are written into, by the headless game loop
+(`simulate.play_game(..., positions=buffer)` adds a row before each move is made,
+straight into preallocated arrays, rather than making an object for each position),
+then it's saved as a chunk. `export_games` plays games in worker processes, a chunk
+each, and `export_logs` replays move logs. `Dataset` reads one back, memory-mapping
+the columns (so a row or batch from within a chunk is a view of the file, not a copy),
+e.g. `for rows in Dataset(path).batches(4096): ...`.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import numpy as np
+
+from engine import BLANK, KING, ROUNDS, Board, Redeal, rank_of, suit_of
+from movelog import read_log, replay
+from simulate import POLICIES, SimulationStats, game_seed, play_game
+
+FORMAT = "interference-positions"
+VERSION = 1
+
+# column name: (dtype, shape of one row)
+POSITION_COLUMNS = {
+    "board": ("int8", (52,)),
+    "round": ("int8", ()),
+    "move": ("int8", (2,)),
+    "legal": ("uint16", ()),
+    "choice": ("int8", ()),
+    "game": ("uint32", ()),
+    "won": ("bool", ()),
+    "ordered": ("int8", ()),
+}
+GAME_COLUMNS = {
+    "seed": ("uint64", ()),
+    "won": ("bool", ()),
+    "rounds": ("int8", ()),
+    "ordered": ("int8", ()),
+    "positions": ("uint32", ()),
+}
+
+# code % 13 for a King
+KING_CODE = KING - 1
+
+# Games in each chunk that `export_games` writes (one shard of games per chunk)
+CHUNK_GAMES = 2000
+
+# Positions a `PositionBuffer` has room for to start with (it doubles when it's full)
+INITIAL_CAPACITY = 1 << 16
+
+
+def legal_mask(board):
+    """The legal moves on a board, as a mask of the 16 candidates (see the top of the file)"""
+    mask = 0
+    cells = board.cells
+    for k, to_slot in enumerate(sorted(board.blanks)):
+        if to_slot % 13 == 0:
+            # any of the 2s can go at the start of a row
+            mask |= 0xF << 4 * k
+        else:
+            before = cells[to_slot - 1]
+            if before != BLANK and rank_of(before) != KING:
+                mask |= 1 << 4 * k
+    return mask
+
+
+def candidate_index(board, move):
+    """Which of the 16 candidates a legal move is"""
+    from_slot, to_slot = move
+    k = sorted(board.blanks).index(to_slot)
+    return 4 * k + (suit_of(board.cells[from_slot]) if to_slot % 13 == 0 else 0)
+
+
+class PositionBuffer:
+    """Rows of positions and games, in NumPy arrays, written a position at a time by a game loop
+
+    `add` writes the position before each move, and `end_game` fills in the outcome
+    for the game's positions and adds a row for the game. Positions are written
+    through memoryviews of the arrays, which is a lot quicker than numpy's item assignment.
+    """
+
+    def __init__(self, first_game=0, capacity=INITIAL_CAPACITY):
+        self.positions = 0
+        self.games = 0
+        self.first_game = first_game # the number of the first game, in the dataset
+        self.game_start = 0 # the first position of the game being played
+        self.columns = {name: np.zeros((capacity,) + shape, dtype=dtype)
+                        for name, (dtype, shape) in POSITION_COLUMNS.items()}
+        self.game_columns = {name: [] for name in GAME_COLUMNS}
+        self.make_views()
+
+    def make_views(self):
+        columns = self.columns
+        self.capacity = len(columns["board"])
+        self.board_view = memoryview(columns["board"].reshape(-1)).cast("b")
+        self.round_view = memoryview(columns["round"]).cast("b")
+        self.move_view = memoryview(columns["move"].reshape(-1)).cast("b")
+        self.legal_view = memoryview(columns["legal"]).cast("B").cast("H")
+        self.choice_view = memoryview(columns["choice"]).cast("b")
+
+    def grow(self):
+        for name, column in self.columns.items():
+            bigger = np.zeros((2 * len(column),) + column.shape[1:], dtype=column.dtype)
+            bigger[:len(column)] = column
+            self.columns[name] = bigger
+        self.make_views()
+
+    def add(self, board, round, move):
+        """Add a row for the position on `board`, in round `round`, and the move about to be made from it"""
+        n = self.positions
+        if n == self.capacity:
+            self.grow()
+        self.board_view[52 * n:52 * n + 52] = memoryview(board.cells)
+        self.round_view[n] = round
+        self.move_view[2 * n] = move[0]
+        self.move_view[2 * n + 1] = move[1]
+        # (as `legal_mask` and `candidate_index`, but sorting the spaces just the once)
+        cells = board.cells
+        blanks = sorted(board.blanks)
+        mask = 0
+        for k, to_slot in enumerate(blanks):
+            if to_slot % 13 == 0:
+                mask |= 0xF << 4 * k
+            else:
+                before = cells[to_slot - 1]
+                if before != BLANK and before % 13 != KING_CODE:
+                    mask |= 1 << 4 * k
+        self.legal_view[n] = mask
+        to_slot = move[1]
+        self.choice_view[n] = 4 * blanks.index(to_slot) + (cells[move[0]] // 13 if to_slot % 13 == 0 else 0)
+        self.positions = n + 1
+
+    def end_game(self, result):
+        """Fill in the outcome of the game just played (a `simulate.GameResult`, or a `movelog.Replay`)"""
+        start, stop = self.game_start, self.positions
+        final_ordered = result.ordered[-1] if isinstance(result.ordered, list) else result.ordered
+        rounds = result.rounds
+        columns = self.columns
+        columns["game"][start:stop] = self.first_game + self.games
+        columns["won"][start:stop] = result.won
+        columns["ordered"][start:stop] = final_ordered
+
+        games = self.game_columns
+        games["seed"].append(result.seed)
+        games["won"].append(result.won)
+        games["rounds"].append(rounds)
+        games["ordered"].append(final_ordered)
+        games["positions"].append(stop - start)
+        self.games += 1
+        self.game_start = stop
+
+    def save(self, path, name):
+        """Write the finished games' rows as chunk `name` of the dataset in `path`,
+        returning its entry for the index"""
+        n = self.game_start
+        for column, values in self.columns.items():
+            np.save(os.path.join(path, f"{name}-{column}.npy"), values[:n])
+        for column, (dtype, _) in GAME_COLUMNS.items():
+            np.save(os.path.join(path, f"{name}-game-{column}.npy"), np.array(self.game_columns[column], dtype=dtype))
+        return {"name": name, "positions": n, "games": self.games, "first_game": self.first_game}
+
+    def clear(self, first_game):
+        """Start again, for the next chunk (keeping the arrays, as they're the right size by now)"""
+        self.positions = 0
+        self.games = 0
+        self.first_game = first_game
+        self.game_start = 0
+        self.game_columns = {name: [] for name in GAME_COLUMNS}
+
+
+def write_index(path, chunks, **info):
+    """(Re)write a dataset's index, replacing the old one in one step, so readers never see half of it"""
+    index = {
+        "format": FORMAT,
+        "version": VERSION,
+        **info,
+        "positions": sum(chunk["positions"] for chunk in chunks),
+        "games": sum(chunk["games"] for chunk in chunks),
+        "columns": {name: {"dtype": dtype, "shape": list(shape)} for name, (dtype, shape) in POSITION_COLUMNS.items()},
+        "game_columns": {name: {"dtype": dtype, "shape": list(shape)} for name, (dtype, shape) in GAME_COLUMNS.items()},
+        "chunks": chunks,
+    }
+    temp = os.path.join(path, "index.json.tmp")
+    with open(temp, "w") as file:
+        json.dump(index, file, indent=1)
+    os.replace(temp, os.path.join(path, "index.json"))
+
+
+def export_shard(args):
+    """Play games `start` to `stop` of a run (in a worker process), and save their positions as a chunk"""
+    path, name, master_seed, start, stop, policy_name, rounds, stop_when_dead = args
+    policy = POLICIES[policy_name]
+    buffer = PositionBuffer(start)
+    stats = SimulationStats(rounds)
+    began = time.perf_counter()
+    for game in range(start, stop):
+        result = play_game(game_seed(master_seed, game), policy, rounds, stop_when_dead=stop_when_dead, positions=buffer)
+        buffer.end_game(result)
+        stats.add(result)
+    stats.seconds = time.perf_counter() - began
+    return buffer.save(path, name), stats
+
+
+def export_games(path, games, policy="random", seed=0, workers=None, rounds=ROUNDS, chunk_games=CHUNK_GAMES,
+                 stop_when_dead=False):
+    """Play `games` games with the named policy (the same games as `simulate.simulate`'s for the seed),
+    writing their positions to a dataset in `path`, a chunk per shard of games.
+    Returns the `SimulationStats`."""
+    os.makedirs(path, exist_ok=True)
+    shards = [(path, f"{i:05d}", seed, start, min(start + chunk_games, games), policy, rounds, stop_when_dead)
+              for i, start in enumerate(range(0, games, chunk_games))]
+    info = {"source": "simulate", "policy": policy, "seed": seed, "rounds": rounds}
+
+    stats = SimulationStats(rounds)
+    chunks = []
+    def finished(chunk, shard_stats):
+        chunks.append(chunk)
+        stats.merge(shard_stats)
+        write_index(path, chunks, **info)
+
+    write_index(path, chunks, **info)
+    if workers == 1:
+        for shard in shards:
+            finished(*export_shard(shard))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            # (in order, so the chunks go in the index in order)
+            for chunk, shard_stats in pool.imap(export_shard, shards):
+                finished(chunk, shard_stats)
+    return stats
+
+
+def replay_positions(seed, body, buffer):
+    """Replay a logged game into `buffer`, returning its `movelog.Replay`.
+    Moves that were undone aren't included: just the moves and new rounds that the game ended up with."""
+    result = replay(seed, body)
+    if not result.valid:
+        return result
+
+    board = Board.deal(random.Random(seed))
+    round = 1
+    for entry in result.line:
+        if isinstance(entry, Redeal):
+            board.permute(entry.perm)
+            round += 1
+        else:
+            buffer.add(board, round, entry)
+            board.apply(entry)
+    buffer.end_game(result)
+    return result
+
+
+def export_logs(path, logs, chunk_positions=1_000_000):
+    """Write the positions of the valid games in move logs to a dataset in `path`,
+    starting a new chunk after a game takes a chunk past `chunk_positions` positions.
+    Returns the numbers of games written and skipped (as invalid)."""
+    os.makedirs(path, exist_ok=True)
+    info = {"source": "logs", "logs": [os.path.basename(log) for log in logs], "rounds": ROUNDS}
+    buffer = PositionBuffer()
+    chunks = []
+    written = skipped = 0
+    write_index(path, chunks, **info)
+    for log in logs:
+        for seed, body in read_log(log):
+            if replay_positions(seed, body, buffer).valid:
+                written += 1
+            else:
+                skipped += 1
+            if buffer.positions >= chunk_positions:
+                chunks.append(buffer.save(path, f"{len(chunks):05d}"))
+                write_index(path, chunks, **info)
+                buffer.clear(written)
+    if buffer.games:
+        chunks.append(buffer.save(path, f"{len(chunks):05d}"))
+        write_index(path, chunks, **info)
+    return written, skipped
+
+
+class Dataset:
+    """A dataset written by `export_games` or `export_logs`, with its columns memory-mapped"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json")) as file:
+            self.index = json.load(file)
+        if self.index.get("format") != FORMAT or self.index.get("version") != VERSION:
+            raise ValueError(f"{path} isn't a version {VERSION} positions dataset")
+        self.chunks = self.index["chunks"]
+        self.column_names = list(self.index["columns"])
+        # the first position of each chunk (and the end of the last)
+        self.offsets = np.cumsum([0] + [chunk["positions"] for chunk in self.chunks])
+        self.loaded = {}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def games(self):
+        return self.index["games"]
+
+    def column(self, chunk, name):
+        """Column `name` of chunk number `chunk`, memory-mapped"""
+        key = (chunk, name)
+        if key not in self.loaded:
+            file = os.path.join(self.path, f"{self.chunks[chunk]['name']}-{name}.npy")
+            self.loaded[key] = np.load(file, mmap_mode="r")
+        return self.loaded[key]
+
+    def chunk(self, chunk, columns=None):
+        """Every row of a chunk, as a dict of memory-mapped columns"""
+        return {name: self.column(chunk, name) for name in columns or self.column_names}
+
+    def __getitem__(self, i):
+        """Position i, as a dict of column values (the board is a view of the file)"""
+        if not 0 <= i < len(self):
+            raise IndexError(f"position {i} out of range (the dataset has {len(self)})")
+        chunk = int(np.searchsorted(self.offsets, i, side="right")) - 1
+        row = i - int(self.offsets[chunk])
+        return {name: self.column(chunk, name)[row] for name in self.column_names}
+
+    def batches(self, size, columns=None, start=0, stop=None):
+        """Positions `start` to `stop`, `size` at a time, each batch as a dict of arrays.
+        A batch within one chunk is a view of the files; one that spans two chunks is copied together."""
+        columns = columns or self.column_names
+        stop = len(self) if stop is None else stop
+        for begin in range(start, stop, size):
+            yield self.slice(begin, min(begin + size, stop), columns)
+
+    def slice(self, start, stop, columns=None):
+        """Positions `start` to `stop`, as a dict of arrays"""
+        columns = columns or self.column_names
+        first = int(np.searchsorted(self.offsets, start, side="right")) - 1
+        last = int(np.searchsorted(self.offsets, stop, side="left")) - 1
+        parts = {name: [] for name in columns}
+        for chunk in range(first, max(first, last) + 1):
+            offset = int(self.offsets[chunk])
+            lo, hi = max(start - offset, 0), min(stop - offset, self.chunks[chunk]["positions"])
+            for name in columns:
+                parts[name].append(self.column(chunk, name)[lo:hi])
+        return {name: values[0] if len(values) == 1 else np.concatenate(values) for name, values in parts.items()}
+
+    def take(self, indices, columns=None):
+        """The positions at `indices` (e.g. a random sample), as a dict of arrays (copied)"""
+        columns = columns or self.column_names
+        indices = np.asarray(indices, dtype=np.int64)
+        chunk_of = np.searchsorted(self.offsets, indices, side="right") - 1
+        out = {}
+        for name in columns:
+            dtype, shape = self.index["columns"][name]["dtype"], tuple(self.index["columns"][name]["shape"])
+            out[name] = np.empty((len(indices),) + shape, dtype=dtype)
+        for chunk in np.unique(chunk_of):
+            which = np.nonzero(chunk_of == chunk)[0]
+            rows = indices[which] - self.offsets[chunk]
+            for name in columns:
+                out[name][which] = self.column(int(chunk), name)[rows]
+        return out
+
+    def game_table(self, name):
+        """Column `name` of the games table, for every game (read into memory, as it's small)"""
+        return np.concatenate([np.load(os.path.join(self.path, f"{chunk['name']}-game-{name}.npy"))
+                               for chunk in self.chunks]) if self.chunks else np.array([])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write and read datasets of Interference positions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="play games and write their positions")
+    export.add_argument("path", help="directory to write the dataset to")
+    export.add_argument("--games", type=int, default=10000)
+    export.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    export.add_argument("--seed", type=int, default=0)
+    export.add_argument("--workers", type=int, default=None)
+    export.add_argument("--chunk-games", type=int, default=CHUNK_GAMES)
+    export.add_argument("--stop-dead", action="store_true",
+                        help="end a round as soon as no more cards can be ordered in it")
+
+    from_logs = commands.add_parser("from-logs", help="write the positions of the games in move logs")
+    from_logs.add_argument("path", help="directory to write the dataset to")
+    from_logs.add_argument("logs", nargs="+", metavar="LOG")
+
+    info = commands.add_parser("info", help="summarise a dataset, reading through all of it")
+    info.add_argument("path")
+    info.add_argument("--batch-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    if args.command == "export":
+        stats = export_games(args.path, args.games, args.policy, args.seed, args.workers,
+                             chunk_games=args.chunk_games, stop_when_dead=args.stop_dead)
+        print(stats, end="")
+    elif args.command == "from-logs":
+        written, skipped = export_logs(args.path, args.logs)
+        print(f"{written} games written, {skipped} skipped as invalid")
+    else:
+        dataset = Dataset(args.path)
+        won = 0
+        for rows in dataset.batches(args.batch_size, ["won"]):
+            won += int(rows["won"].sum())
+        print(f"{len(dataset):,} positions from {dataset.games:,} games ({len(dataset.chunks)} chunks), "
+              f"{won / len(dataset) if len(dataset) else 0:.1%} of them from won games")
+    print(f"{time.perf_counter() - began:.1f}s")
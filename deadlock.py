@@ -0,0 +1,126 @@
+"""
+Static analysis of a position: which cards can never move again this round,
+and how many cards could, at most, end up ordered.
+
+A card other than a 2 can only ever move into the slot after the card one below it
+(the 7H only goes after the 6H), and a 2 only into the first slot of a row.
+So if the 6H never moves, the 7H's only way to move is into the slot after it,
+and if the card in that slot never moves either, neither does the 7H.
+`frozen_cards` finds the cards that can be shown never to move this way:
+it starts by supposing none of them move, and lets go of any card whose reason
+for staying put depends on a card that might move, until what's left holds up.
+(Whatever moves are made, the first of those cards to move would need one of the
+others to have moved first, so none of them ever do.)
+
+From that, `ordered_bound` works out, for each row, how far its ordered run could
+possibly get: the next card for the run has to get into the slot after it, which it
+can't if it's frozen somewhere else, or if the card in that slot is frozen there.
+The total over the rows is an upper bound on the ordered cards this round
+(not always one that can be reached), and if it's no more than what's ordered
+already, the round is dead (`is_dead`): more moves can shuffle the cards around,
+but not order any more of them, so it might as well be the next round.
+
+It's cheap (tens of microseconds), compared with searching, so the solver works out
+the bound for the position it starts from, and stops as soon as it finds a line that
+reaches it (or doesn't search at all, if the position's dead). It doesn't check the bound
+at every position it searches, to cut off lines that can't beat its best: see `solver.solve`.
+The game points out a dead round, and simulations can skip to the next round
+(`simulate.play_game(..., stop_when_dead=True)`).
+"""
+
+from engine import BLANK
+
+# (The tables for the board's size, e.g. which codes are 2s and Kings, are on `board.dims`.)
+
+
+def frozen_cards(board):
+    """Which cards can never move this round, as a bytearray indexed by card code (1 if frozen)"""
+    cells = board.cells
+    pos = board.pos
+    dims = board.dims
+    ranks = dims.ranks
+    is_two = dims.is_two
+    is_king = dims.is_top
+    first_column = dims.first_column
+    frozen = bytearray(dims.size)
+    for code in cells:
+        if code != BLANK:
+            frozen[code] = 1
+
+    todo = [code for code in cells if code != BLANK]
+    while todo:
+        code = todo.pop()
+        if not frozen[code]:
+            continue
+
+        # Does the card stay put, if the frozen cards all do?
+        if is_two[code]:
+            # a 2 stays put if every other first slot is taken, for good
+            stays = all(slot == pos[code] or (cells[slot] != BLANK and frozen[cells[slot]])
+                        for slot in first_column)
+        elif not frozen[code - 1]:
+            stays = False
+        else:
+            slot = pos[code - 1] + 1
+            # nothing can go after the end of a row, and if it's already where it would go, it's staying
+            stays = slot % ranks == 0 or slot == pos[code] or (cells[slot] != BLANK and frozen[cells[slot]])
+        if stays:
+            continue
+
+        frozen[code] = 0
+        # the cards that were relying on this one staying put need another look:
+        # the next card of its suit,
+        if not is_king[code]:
+            todo.append(code + 1)
+        # the card that could go in its slot (the one after the card to its left),
+        slot = pos[code]
+        if slot % ranks:
+            left = cells[slot - 1]
+            if left != BLANK and not is_king[left]:
+                todo.append(left + 1)
+        # and, if it's in the first column, the 2s
+        else:
+            todo.extend(dims.twos)
+    return frozen
+
+
+def row_bound(board, i, frozen):
+    """The longest ordered run row i could possibly get this round"""
+    cells = board.cells
+    dims = board.dims
+    longest = dims.last_col
+    start = i * dims.ranks
+    first = cells[start]
+    if first != BLANK and frozen[first]:
+        # whatever's at the start of the row stays there
+        twos = [first] if dims.is_two[first] else []
+    else:
+        # any 2 that can move (or that's here already) could start the row
+        twos = [two for two in dims.twos if not frozen[two] or board.pos[two] == start]
+
+    best = 0
+    for two in twos:
+        length = 0
+        card = two
+        while length < longest:
+            here = cells[start + length]
+            if here != card and (frozen[card] or (here != BLANK and frozen[here])):
+                break
+            length += 1
+            card += 1
+        best = max(best, length)
+        if best == longest:
+            break
+    return best
+
+
+def ordered_bound(board, frozen=None):
+    """An upper bound on the ordered cards that could be reached this round (at least `board.ordered_count()`)"""
+    if frozen is None:
+        frozen = frozen_cards(board)
+    return min(sum(row_bound(board, i, frozen) for i in range(board.dims.suits)), board.dims.all_ordered)
+
+
+def is_dead(board):
+    """True if no more cards can be ordered this round (including if the layout is stuck)"""
+    return board.is_stuck() or ordered_bound(board) <= board.ordered_count()
@@ -0,0 +1,251 @@
+"""
+Index of which deals can be won, worked out ahead of time.
+
+`build` runs the solver over a range of deal seeds (the seeds that
+`GameView.setup` takes), playing each game a round at a time: the solver finds
+the line of play that orders the most cards in the round, and then the cards are
+redealt, from the same seeded random number generator as the game, up to ROUNDS rounds.
+Most first rounds are too big to search completely, so each round's search
+stops after `node_limit` positions. A deal is recorded as WON if the solver's
+line wins (so it certainly can be won), NOT_WON_BY_SOLVER if it doesn't and every search
+was complete, and UNKNOWN otherwise. NOT_WON_BY_SOLVER isn't a proof the deal can't be won:
+each search only finds the most cards that can be ordered in its round, and a line that
+ends the round with the same or fewer cards ordered, but in other places, collects them
+in another order for the redeal, so the next round is dealt differently, and that
+might have been won.
+
+The index file is a 32-byte header, then one 8-byte record per seed, so the record
+for a seed is found by arithmetic, and the file is memory-mapped rather than read in.
+Records start as all zeros (not done yet) and are filled in as results come in,
+so a build that's been stopped can be picked up where it left off, by running it again.
+
+    python dealindex.py build deals.idx --count 100000
+    python dealindex.py stats deals.idx
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import time
+from collections import Counter
+
+from engine import ROUNDS, Board
+from solver import solve
+
+MAGIC = b"IFDX"
+VERSION = 1
+# magic, version, rounds, first seed, number of seeds, node limit (then padding to 32 bytes)
+HEADER = struct.Struct("<4sHHQQI4x")
+# status, rounds used, ordered cards at the end, difficulty, moves (then 2 spare bytes)
+RECORD = struct.Struct("<BBBBH2x")
+
+# Record status
+NOT_DONE = 0
+WON = 1
+NOT_WON_BY_SOLVER = 2
+UNKNOWN = 3
+STATUS_NAMES = {NOT_DONE: "not done", WON: "won", NOT_WON_BY_SOLVER: "not won by solver", UNKNOWN: "unknown"}
+
+# Positions searched per round, for each deal
+NODE_LIMIT = 200_000
+
+# Seeds are handed out to the workers this many at a time
+CHUNK_SIZE = 16
+
+# Difficulties run from 1 to this (see `difficulty`)
+MAX_DIFFICULTY = ROUNDS + 2
+
+
+def difficulty(won, rounds, ordered):
+    """1 to ROUNDS: won in that many rounds. Then one more if it wasn't won, but got close (40+ ordered),
+    and the highest (MAX_DIFFICULTY) if it was nowhere near"""
+    if won:
+        return rounds
+    return ROUNDS + 1 if ordered >= 40 else ROUNDS + 2
+
+
+class DealInfo:
+    """What the solver found for one deal
+
+    `moves` is the number of moves in the solver's line of play over all the rounds.
+    It's the length of the first best line found, so not necessarily the fewest moves.
+    """
+
+    def __init__(self, status, rounds, ordered, difficulty, moves):
+        self.status = status
+        self.rounds = rounds
+        self.ordered = ordered
+        self.difficulty = difficulty
+        self.moves = moves
+
+    @property
+    def winnable(self):
+        return self.status == WON
+
+    def pack(self):
+        return RECORD.pack(self.status, self.rounds, self.ordered, self.difficulty, min(self.moves, 65535))
+
+    @classmethod
+    def unpack(cls, data, offset=0):
+        return cls(*RECORD.unpack_from(data, offset))
+
+    def __str__(self):
+        return (f"{STATUS_NAMES[self.status]} in {self.rounds} rounds, {self.ordered} ordered, "
+                f"{self.moves} moves, difficulty {self.difficulty}")
+
+
+def analyse_deal(seed, rounds=ROUNDS, node_limit=NODE_LIMIT):
+    """Play the deal for `seed` with the solver, a round at a time"""
+    rng = random.Random(seed) # as in GameView.setup
+    board = Board.deal(rng)
+    moves = 0
+    complete = True
+    for round in range(1, rounds + 1):
+        if round > 1:
+            board.redeal(rng)
+        solution = solve(board, rounds - round + 1, node_limit=node_limit)
+        for move in solution.moves:
+            board.apply(move)
+        moves += len(solution.moves)
+        complete = complete and solution.complete
+        if solution.won:
+            break
+
+    won = board.is_ordered()
+    status = WON if won else NOT_WON_BY_SOLVER if complete else UNKNOWN
+    ordered = board.ordered_count()
+    return DealInfo(status, round, ordered, difficulty(won, round, ordered), moves)
+
+
+def analyse_chunk(args):
+    """Analyse some deals (in a worker process), returning (seed, packed record) pairs"""
+    seeds, rounds, node_limit = args
+    return [(seed, analyse_deal(seed, rounds, node_limit).pack()) for seed in seeds]
+
+
+def create(path, first_seed, count, rounds=ROUNDS, node_limit=NODE_LIMIT):
+    """Make an empty index for `count` seeds, starting at `first_seed`"""
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, rounds, first_seed, count, node_limit))
+        file.truncate(HEADER.size + count * RECORD.size) # (filled with zeros, i.e. NOT_DONE)
+
+
+def read_header(data):
+    magic, version, rounds, first_seed, count, node_limit = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a deal index")
+    if version != VERSION:
+        raise ValueError(f"deal index is version {version}, expected {VERSION}")
+    return rounds, first_seed, count, node_limit
+
+
+def build(path, first_seed=0, count=None, workers=None, node_limit=NODE_LIMIT, chunk_size=CHUNK_SIZE):
+    """Fill in an index (creating it if need be, in which case `count` is needed),
+    skipping any seeds already done"""
+    if not os.path.exists(path):
+        if count is None:
+            raise ValueError("need a count of seeds to make a new index")
+        create(path, first_seed, count, node_limit=node_limit)
+
+    with open(path, "r+b") as file, mmap.mmap(file.fileno(), 0) as data:
+        rounds, first_seed, count, node_limit = read_header(data)
+        # the first byte of each record is its status
+        statuses = data[HEADER.size::RECORD.size]
+        todo = [first_seed + i for i, status in enumerate(statuses) if status == NOT_DONE]
+        chunks = [(todo[i:i + chunk_size], rounds, node_limit) for i in range(0, len(todo), chunk_size)]
+        print(f"{count - len(todo)} of {count} deals already done, {len(todo)} to go")
+
+        began = time.perf_counter()
+        done = 0
+        try:
+            with multiprocessing.Pool(workers) as pool:
+                for results in pool.imap_unordered(analyse_chunk, chunks):
+                    for seed, record in results:
+                        offset = HEADER.size + (seed - first_seed) * RECORD.size
+                        data[offset:offset + RECORD.size] = record
+                    data.flush()
+                    done += len(results)
+                    seconds = time.perf_counter() - began
+                    print(f"\r{done} of {len(todo)} deals ({done / seconds:.1f}/sec)", end="", flush=True)
+        except KeyboardInterrupt:
+            print("\nStopped: run again to carry on from here")
+        else:
+            print()
+
+
+class DealIndex:
+    """A built (or part-built) index, memory-mapped, for looking deals up"""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rounds, self.first_seed, self.count, self.node_limit = read_header(self.data)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, seed):
+        """The `DealInfo` for a seed, or None if it's not in the index (or not done yet)"""
+        i = seed - self.first_seed
+        if not 0 <= i < self.count:
+            return None
+        info = DealInfo.unpack(self.data, HEADER.size + i * RECORD.size)
+        return info if info.status != NOT_DONE else None
+
+    def find(self, winnable=False, difficulty=None, rng=random, tries=1000):
+        """A random seed with a winnable deal, and/or of a given difficulty (or None if none turn up).
+        Looks at random records until one fits, so only ever looks at a few, unless they're rare."""
+        for _ in range(tries):
+            seed = self.first_seed + rng.randrange(self.count)
+            info = self[seed]
+            if info is None:
+                continue
+            if winnable and not info.winnable:
+                continue
+            if difficulty is not None and info.difficulty != difficulty:
+                continue
+            return seed
+        return None
+
+    def stats(self):
+        """Counts of the records by status, and of those done by difficulty"""
+        statuses = Counter()
+        difficulties = Counter()
+        for i in range(self.count):
+            info = DealInfo.unpack(self.data, HEADER.size + i * RECORD.size)
+            statuses[STATUS_NAMES[info.status]] += 1
+            if info.status != NOT_DONE:
+                difficulties[info.difficulty] += 1
+        return statuses, difficulties
+
+    def close(self):
+        self.data.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or look at an index of winnable deals")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="make an index, or carry on filling one in")
+    build_parser.add_argument("index")
+    build_parser.add_argument("--start", type=int, default=0, help="first seed (for a new index)")
+    build_parser.add_argument("--count", type=int, help="number of seeds (for a new index)")
+    build_parser.add_argument("--workers", type=int, default=None)
+    build_parser.add_argument("--node-limit", type=int, default=NODE_LIMIT,
+                              help="positions searched per round (for a new index)")
+    stats_parser = commands.add_parser("stats", help="summarise an index")
+    stats_parser.add_argument("index")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.index, args.start, args.count, args.workers, args.node_limit)
+    else:
+        index = DealIndex(args.index)
+        statuses, difficulties = index.stats()
+        print(f"{index.count} seeds from {index.first_seed}, {index.rounds} rounds, "
+              f"{index.node_limit} positions per round")
+        print(", ".join(f"{count} {name}" for name, count in sorted(statuses.items())))
+        for level in range(1, MAX_DIFFICULTY + 1):
+            print(f"difficulty {level}: {difficulties[level]}")
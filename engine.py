@@ -0,0 +1,529 @@
+"""
+Headless board engine for Interference.
+
+This module holds the rules of the game, with no dependency on arcade,
+so it can be used for simulations and on machines without a display.
+
+The layout is stored as a flat array of 52 card codes, row by row,
+with row 0 being the bottom row on screen (as in `GameView`).
+A position in that array is called a 'slot', so slot = row * 13 + column.
+
+A card code is `suit * 13 + value_int - 1`, where `suit` is an index into
+CARD_SUITS and `value_int` comes from VALUES_INT. So the Aces are 0, 13, 26 and 39,
+the Twos are 1, 14, 27 and 40, and so on. Aces are never on the board,
+since they're replaced by spaces, which are stored as BLANK.
+
+That's the standard game, but the numbers of suits and ranks can be changed
+(e.g. 4 suits of 6 ranks, small enough to solve every deal, or 8 suits of 13),
+by giving a `Board` other `Dimensions`: then there are `suits` rows of `ranks` slots,
+the codes are `suit * ranks + value_int - 1`, and the top rank (the last card
+of each row, which nothing can go after) plays the part of the King.
+The module constants (KING, TWOS, ...) are for the standard game; a board's own
+are on its `dims`. (The number of rounds was never part of the board:
+it's an argument wherever games are played, defaulting to ROUNDS.)
+"""
+
+import functools
+
+import random
+from array import array
+
+# Card constants
+# 'Blank' allows for playing spaces (will need to be ignored when creating deck)
+CARD_VALUES = ["Blank", "A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
+VALUES_INT = {value: index for index, value in enumerate(CARD_VALUES)} # allows us to check for consecutive values
+CARD_SUITS = ["Clubs", "Hearts", "Spades", "Diamonds"]
+# Not needed for game, but makes printing for debugging nicer
+SUIT_ICONS = {"Spades": "♠️", "Clubs": "♣️", "Hearts": "♥️", "Diamonds": "♦️"}
+
+# Number of rounds
+ROUNDS = 3
+
+# The code for a space on the board
+BLANK = -1
+
+KING = VALUES_INT["K"]
+TWOS = [suit * 13 + VALUES_INT["2"] - 1 for suit in range(4)]
+
+# Card codes and slots are stored as signed bytes, which limits the size of a board
+MAX_CARDS = 128
+
+# Seed for the Zobrist keys (see `Dimensions`)
+ZOBRIST_SEED = 20240901
+
+
+def card_code(suit, value):
+    """Code for a card, given its suit and value names, e.g. card_code("Hearts", "J")"""
+    if value == "Blank":
+        return BLANK
+    return CARD_SUITS.index(suit) * 13 + VALUES_INT[value] - 1
+
+
+def suit_of(code):
+    """Index into CARD_SUITS of a card code"""
+    return code // 13
+
+
+def rank_of(code):
+    """value_int of a card code (2 to 13 for cards on the board)"""
+    return code % 13 + 1
+
+
+def card_name(code):
+    """Printable name for a card code, matching `Card.__str__`"""
+    if code == BLANK:
+        return "__"
+    return f"{CARD_VALUES[rank_of(code)]}{SUIT_ICONS[CARD_SUITS[suit_of(code)]]}"
+
+
+class Dimensions:
+    """The size of a game: `suits` rows, each of `ranks` slots (an Ace, a 2, ... up to the top rank)
+
+    It also holds the tables the board looks things up in, worked out once for each size,
+    so get one with `Dimensions.of(suits, ranks)` (or `parse`), which shares them.
+    """
+
+    def __init__(self, suits, ranks):
+        if suits < 1 or ranks < 2 or suits * ranks > MAX_CARDS:
+            raise ValueError(f"can't play with {suits} suits of {ranks} ranks "
+                             f"(need at least 1 suit and 2 ranks, and at most {MAX_CARDS} cards)")
+        self.suits = suits
+        self.ranks = ranks
+        self.size = suits * ranks # slots, and card codes
+        self.top = ranks # value_int of the top rank (the King, in the standard game)
+        self.last_col = ranks - 1 # the column of the last slot of a row (and the longest ordered run)
+        self.all_ordered = suits * (ranks - 1) # ordered cards when the game's won
+        self.first_column = tuple(row * ranks for row in range(suits))
+        self.twos = [suit * ranks + 1 for suit in range(suits)]
+
+        # by card code
+        self.is_two = [code % ranks == 1 for code in range(self.size)]
+        self.is_top = [code % ranks == ranks - 1 for code in range(self.size)]
+        # Can a card be moved into a space after this card? (indexed by code + 1, so BLANK is 0)
+        # Only if it's a card, and not a King (or whatever the top rank is).
+        self.opens_space = [False] + [not top for top in self.is_top]
+
+        # Random keys for Zobrist hashing: one for each (slot, card code) pair, including BLANK.
+        # The key for `code` in `slot` is zobrist[slot * stride + code + 1].
+        # A fixed seed means hashes are the same from run to run (and process to process).
+        self.stride = self.size + 1
+        rng = random.Random(ZOBRIST_SEED)
+        self.zobrist = [rng.getrandbits(64) for _ in range(self.size * self.stride)]
+
+    @classmethod
+    @functools.cache
+    def of(cls, suits, ranks):
+        return cls(suits, ranks)
+
+    @classmethod
+    def parse(cls, text):
+        """From e.g. "4x6" (suits x ranks)"""
+        try:
+            suits, ranks = (int(n) for n in text.lower().split("x"))
+        except ValueError:
+            raise ValueError(f"expected SUITSxRANKS, e.g. 4x13, not {text!r}")
+        return cls.of(suits, ranks)
+
+    def __reduce__(self):
+        # (pickled as just the size, e.g. to send to a worker process, so the tables are shared there too)
+        return Dimensions.of, (self.suits, self.ranks)
+
+    def __str__(self):
+        return f"{self.suits}x{self.ranks}"
+
+    def __repr__(self):
+        return f"Dimensions({self.suits}, {self.ranks})"
+
+    def rank_of(self, code):
+        """value_int of a card code (2 to `top` for cards on the board)"""
+        return code % self.ranks + 1
+
+    def suit_of(self, code):
+        return code // self.ranks
+
+    def code(self, suit, rank):
+        """Code for a card, given its suit (an index) and value_int"""
+        return suit * self.ranks + rank - 1
+
+    def card_name(self, code):
+        """Printable name for a card code: as `card_name` in the standard game,
+        otherwise the rank as a number (past K) and suit as a number (past the four suits)"""
+        if code == BLANK:
+            return "__"
+        rank, suit = self.rank_of(code), self.suit_of(code)
+        value = CARD_VALUES[rank] if rank < len(CARD_VALUES) else str(rank)
+        return value + (SUIT_ICONS[CARD_SUITS[suit]] if suit < len(CARD_SUITS) else f"/{suit}")
+
+    def deck(self):
+        """Every card code, with the Aces replaced by spaces"""
+        return [BLANK if code % self.ranks == 0 else code for code in range(self.size)]
+
+
+STANDARD = Dimensions.of(4, 13)
+
+# The standard game's tables, by their old names
+OPENS_SPACE = STANDARD.opens_space
+ZOBRIST = STANDARD.zobrist
+
+
+class Board:
+    """The 4x13 layout of the game (or another size, see `Dimensions`), as an array of card codes
+
+    A move is a tuple `(from_slot, to_slot)`, moving the card in `from_slot`
+    into the space in `to_slot`.
+
+    As well as the layout (slot -> card), the board keeps an index of where
+    each card is (card -> slot) and of the slots of the four spaces,
+    so that finding a card or the moves into a space doesn't need a scan.
+
+    It also keeps count, for each row, of the 'live' spaces (those a card can
+    be moved into, i.e. not after a King or another space) and of the ordered
+    cards at the start of the row (its split index). A move only changes a few
+    slots, so these are updated as moves are made, and checking whether the
+    layout is stuck or ordered doesn't need to look at the whole board.
+    """
+
+    # Set to True to check the index against the layout after every change
+    # (slow, for testing only)
+    debug = False
+
+    def __init__(self, cells, dims=STANDARD):
+        """Board constructor, from 52 card codes in slot order (or `dims.size`)"""
+        self.dims = dims
+        self.cells = array("b", cells)
+        self.build_index()
+
+    def build_index(self):
+        """(Re)build the card -> slot index, the hash and the row counts from the layout"""
+        dims = self.dims
+        zobrist, stride = dims.zobrist, dims.stride
+        self.pos = array("b", [BLANK] * dims.size) # Aces stay at BLANK, as they're never on the board
+        self.blanks = []
+        self.hash = 0
+        for slot, code in enumerate(self.cells):
+            if code == BLANK:
+                self.blanks.append(slot)
+            else:
+                self.pos[code] = slot
+            self.hash ^= zobrist[slot * stride + code + 1]
+
+        self.live = [self.count_live_blanks(i) for i in range(dims.suits)]
+        self.live_total = sum(self.live)
+        self.splits = [self.find_split_index(i) for i in range(dims.suits)]
+
+    def check_index(self):
+        """Raise an AssertionError if the index doesn't match the layout"""
+        dims = self.dims
+        assert len(self.cells) == dims.size, f"expected {dims.size} slots, found {len(self.cells)}"
+        for slot, code in enumerate(self.cells):
+            if code == BLANK:
+                assert slot in self.blanks, f"space in slot {slot} is missing from the index"
+            else:
+                assert self.pos[code] == slot, f"{dims.card_name(code)} is in slot {slot}, but indexed at {self.pos[code]}"
+        assert len(self.blanks) == dims.suits, f"expected {dims.suits} spaces, indexed {len(self.blanks)}"
+        expected_hash = 0
+        for slot, code in enumerate(self.cells):
+            expected_hash ^= dims.zobrist[slot * dims.stride + code + 1]
+        assert self.hash == expected_hash, "hash doesn't match the layout"
+        for i in range(dims.suits):
+            assert self.live[i] == self.count_live_blanks(i), f"wrong count of live spaces in row {i}"
+            assert self.splits[i] == self.find_split_index(i), f"wrong split index for row {i}"
+        assert self.live_total == sum(self.live), "wrong total of live spaces"
+
+    @classmethod
+    def deal(cls, rng=random, dims=STANDARD):
+        """Shuffle a deck and deal it out, with the Aces replaced by spaces"""
+        deck = dims.deck()
+        rng.shuffle(deck)
+        return cls(deck, dims)
+
+    def copy(self):
+        return Board(self.cells, self.dims)
+
+    def __str__(self):
+        out = ""
+        for i in reversed(range(self.dims.suits)):
+            out += " ".join(self.dims.card_name(code) for code in self.row(i)) + "\n"
+        return out
+
+    def row(self, i):
+        """The card codes in row i"""
+        ranks = self.dims.ranks
+        return self.cells[i * ranks:(i + 1) * ranks]
+
+    def slot_of(self, code):
+        """The slot a card is in"""
+        return self.pos[code]
+
+    def where(self, code):
+        """The row index, and index within row, of a card"""
+        return divmod(self.pos[code], self.dims.ranks)
+
+    def card_at(self, row, col):
+        """The card code at a row and index within row"""
+        return self.cells[row * self.dims.ranks + col]
+
+    def is_valid_move(self, from_slot, to_slot):
+        card = self.cells[from_slot]
+
+        # Move not valid if card is blank or if destination is not blank
+        if card == BLANK or self.cells[to_slot] != BLANK:
+            return False
+
+        # can move a 2 (and nothing else) to the start of a row
+        dims = self.dims
+        if to_slot % dims.ranks == 0:
+            return dims.is_two[card]
+
+        # nothing can go after a King or a space,
+        # otherwise need same suit and consecutive values
+        test_card = self.cells[to_slot - 1]
+        if not dims.opens_space[test_card + 1]:
+            return False
+        return card == test_card + 1
+
+    def legal_moves(self):
+        """All valid moves, as a list of (from_slot, to_slot) tuples"""
+        moves = []
+        dims = self.dims
+        ranks = dims.ranks
+        opens_space = dims.opens_space
+        for to_slot in self.blanks:
+            if to_slot % ranks == 0:
+                wanted = dims.twos
+            else:
+                test_card = self.cells[to_slot - 1]
+                if not opens_space[test_card + 1]:
+                    continue
+                wanted = [test_card + 1]
+            for card in wanted:
+                moves.append((self.pos[card], to_slot))
+        moves.sort(key=lambda move: move[1]) # in slot order, whatever order the spaces were indexed in
+        return moves
+
+    def apply(self, move):
+        """Make a move. It isn't checked, so should come from `legal_moves`
+        or have passed `is_valid_move`.
+        A move can be taken back by applying it in reverse, i.e. `(to_slot, from_slot)`"""
+        from_slot, to_slot = move
+        cells = self.cells
+        card = cells[from_slot]
+        live = self.live
+        dims = self.dims
+        opens_space = dims.opens_space
+        last_col = dims.last_col
+        from_row, from_col = divmod(from_slot, dims.ranks)
+        to_row, to_col = divmod(to_slot, dims.ranks)
+
+        # Only the spaces at, or just after, the two slots can change between live and dead.
+        # The space at to_slot gets filled
+        change = 0
+        if to_col == 0 or opens_space[cells[to_slot - 1] + 1]:
+            live[to_row] -= 1
+            change -= 1
+        # a space after from_slot loses the card before it
+        if from_col != last_col and from_slot + 1 != to_slot and cells[from_slot + 1] == BLANK and opens_space[card + 1]:
+            live[from_row] -= 1
+            change -= 1
+        # a space after to_slot gains one
+        if to_col != last_col and to_slot + 1 != from_slot and cells[to_slot + 1] == BLANK and opens_space[card + 1]:
+            live[to_row] += 1
+            change += 1
+
+        cells[from_slot] = BLANK
+        cells[to_slot] = card
+
+        # and there's a new space at from_slot
+        if from_col == 0 or opens_space[cells[from_slot - 1] + 1]:
+            live[from_row] += 1
+            change += 1
+        self.live_total += change
+
+        # Taking a card out of an ordered run cuts it short
+        if from_col < self.splits[from_row]:
+            self.splits[from_row] = from_col
+        # Putting the right card at the end of an ordered run extends it,
+        # perhaps joining up with ordered cards already after it
+        if to_col == self.splits[to_row] and (dims.is_two[card] if to_col == 0 else card == cells[to_slot - 1] + 1):
+            col = to_col + 1
+            while col < last_col and cells[to_slot + col - to_col] == card + col - to_col:
+                col += 1
+            self.splits[to_row] = col
+
+        # update the index
+        self.pos[card] = to_slot
+        self.blanks[self.blanks.index(to_slot)] = from_slot
+
+        # update the hash: the card leaves from_slot (which becomes blank) and fills to_slot
+        zobrist, stride = dims.zobrist, dims.stride
+        self.hash ^= (zobrist[from_slot * stride + card + 1] ^ zobrist[from_slot * stride]
+                      ^ zobrist[to_slot * stride] ^ zobrist[to_slot * stride + card + 1])
+
+        if self.debug:
+            self.check_index()
+
+    def unapply(self, move):
+        """Take back a move made with `apply`"""
+        from_slot, to_slot = move
+        self.apply((to_slot, from_slot))
+
+    def is_live_blank(self, slot):
+        """Is there a space in this slot that a card could be moved into?"""
+        if self.cells[slot] != BLANK:
+            return False
+        return slot % self.dims.ranks == 0 or self.dims.opens_space[self.cells[slot - 1] + 1]
+
+    def count_live_blanks(self, i):
+        """Count the live spaces in row i by looking at the whole row"""
+        ranks = self.dims.ranks
+        return sum(self.is_live_blank(slot) for slot in range(i * ranks, (i + 1) * ranks))
+
+    def row_is_stuck(self, i):
+        """A row is stuck if all Blanks are after Kings (or other Blanks)"""
+        return self.live[i] == 0
+
+    def is_stuck(self):
+        return self.live_total == 0
+
+    def split_index(self, i):
+        """Length of the ordered run of cards (2, 3, 4, ... of one suit) at the start of row i"""
+        return self.splits[i]
+
+    def find_split_index(self, i):
+        """Work out the split index of row i by looking at the whole row"""
+        row = self.row(i)
+        first = row[0]
+        if first == BLANK or not self.dims.is_two[first]:
+            return 0
+        last_col = self.dims.last_col
+        for j in range(1, last_col):
+            if row[j] != first + j:
+                return j
+        return last_col # (an ordered row with 2-K will still have a blank or other card at the end)
+
+    def ordered_count(self):
+        """Total number of ordered cards, over all rows"""
+        return sum(self.splits)
+
+    def is_ordered(self):
+        return sum(self.splits) == self.dims.all_ordered
+
+    def redeal(self, rng=random):
+        """Start a new round:
+        keep the ordered cards at the start of each row,
+        then shuffle the rest and deal them out again,
+        leaving one space in each row after the ordered cards"""
+        prefixes = []
+        unordered = []
+        for i in range(self.dims.suits):
+            row = self.row(i)
+            split = self.splits[i]
+            prefixes.append(row[:split])
+            unordered.extend(code for code in row[split:] if code != BLANK)
+
+        rng.shuffle(unordered)
+
+        ranks = self.dims.ranks
+        cells = array("b")
+        for prefix in prefixes:
+            cells.extend(prefix)
+            cells.append(BLANK)
+            while len(cells) % ranks:
+                cells.append(unordered.pop())
+
+        self.cells = cells
+        self.build_index()
+
+        if self.debug:
+            self.check_index()
+
+    def permute(self, perm):
+        """Rearrange the cards, so the card in slot `perm[slot]` moves to `slot`"""
+        cells = self.cells
+        self.cells = array("b", [cells[old] for old in perm])
+        self.build_index()
+
+        if self.debug:
+            self.check_index()
+
+    def unpermute(self, perm):
+        """Undo `permute`"""
+        cells = array("b", [BLANK] * len(perm))
+        for slot, old in enumerate(perm):
+            cells[old] = self.cells[slot]
+        self.cells = cells
+        self.build_index()
+
+        if self.debug:
+            self.check_index()
+
+
+class Redeal:
+    """A new round in a `Journal`: the permutation of the slots that the redeal made
+    (see `Board.permute`), so it can be undone and redone without shuffling again"""
+
+    def __init__(self, before, after):
+        # where each card was before (the spaces are interchangeable, so are matched up in order)
+        old_slot = {code: slot for slot, code in enumerate(before) if code != BLANK}
+        old_blanks = iter(slot for slot, code in enumerate(before) if code == BLANK)
+        self.perm = array("b", [old_slot[code] if code != BLANK else next(old_blanks) for code in after])
+
+
+class Journal:
+    """The moves and new rounds made on a board, for undo and redo
+
+    A move is stored as the move itself (two slots), and is undone in O(1)
+    with `Board.unapply`, so a search can make and unmake moves on one board
+    rather than copying it. A new round is stored as a `Redeal`.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.done = []
+        self.undone = [] # (most recently undone last)
+
+    def __len__(self):
+        return len(self.done)
+
+    def move(self, move):
+        """Make a move (which clears anything that could be redone)"""
+        self.board.apply(move)
+        self.done.append(move)
+        self.undone.clear()
+
+    def redeal(self, rng=random):
+        """Start a new round (which clears anything that could be redone)"""
+        before = self.board.cells[:]
+        self.board.redeal(rng)
+        self.done.append(Redeal(before, self.board.cells))
+        self.undone.clear()
+
+    def can_undo(self, across_rounds=False):
+        return bool(self.done) and (across_rounds or not isinstance(self.done[-1], Redeal))
+
+    def can_redo(self, across_rounds=False):
+        return bool(self.undone) and (across_rounds or not isinstance(self.undone[-1], Redeal))
+
+    def undo(self, across_rounds=False):
+        """Take back the last move (or new round, if `across_rounds`), returning it, or None if there's nothing to undo"""
+        if not self.can_undo(across_rounds):
+            return None
+        entry = self.done.pop()
+        if isinstance(entry, Redeal):
+            self.board.unpermute(entry.perm)
+        else:
+            self.board.unapply(entry)
+        self.undone.append(entry)
+        return entry
+
+    def redo(self, across_rounds=False):
+        """Make the last undone move (or new round) again, returning it, or None if there's nothing to redo"""
+        if not self.can_redo(across_rounds):
+            return None
+        entry = self.undone.pop()
+        if isinstance(entry, Redeal):
+            self.board.permute(entry.perm)
+        else:
+            self.board.apply(entry)
+        self.done.append(entry)
+        return entry
@@ -0,0 +1,1043 @@
+"""
+The game itself: the card sprites, the window and the views, drawn with arcade.
+
+This and spectator.py are the only modules that need arcade (and a display), and they're only
+imported once a window is actually opened (see `interference.main`), so everything else
+(the rules in engine.py, the solver, the simulations) runs without graphics.
+"""
+
+import functools
+import logging
+import random
+import time
+
+import arcade
+
+# The rules of the game (and the card constants) live in engine.py
+from deadlock import is_dead
+from dealindex import MAX_DIFFICULTY, DealIndex
+from engine import BLANK, CARD_SUITS, CARD_VALUES, ROUNDS, STANDARD, SUIT_ICONS, VALUES_INT, Board, Journal, Redeal
+from hint import HintEngine
+from metrics import METRICS, event
+from movelog import MoveLog
+
+"""
+The board is usually 4 rows (one per suit) of 13 cards (one per rank),
+but the game can be played with other sizes (`play(dims=...)`, see `engine.Dimensions`),
+so the layout and the deck go by the game's `dims` rather than 4 and 13.
+The window starts at the standard size either way, and the cards are scaled to fit it.
+"""
+
+# Constants for sizing
+CARD_SCALE = 0.6
+
+# How big are the cards?
+CARD_WIDTH = 140 * CARD_SCALE
+CARD_HEIGHT = 190 * CARD_SCALE
+
+# How much space do we leave at the edges?
+X_MARGIN = CARD_WIDTH
+Y_MARGIN = CARD_WIDTH
+
+# Gaps between rows and columns
+X_GAP_PCT = 0.1
+X_GAP = X_GAP_PCT * CARD_WIDTH
+Y_GAP = 0.35 * CARD_HEIGHT
+
+# The X of where to start putting things on the left side
+X_START = X_MARGIN + CARD_WIDTH / 2
+
+# The Y values for the bottom (row 0) of the four rows
+Y_START = Y_MARGIN + CARD_HEIGHT / 2 
+
+
+def board_size(dims):
+    """Width and height of the board for a game's dims, with the margins around it, at CARD_SCALE"""
+    return (2 * X_MARGIN + dims.ranks * CARD_WIDTH + (dims.ranks - 1) * X_GAP,
+            2 * Y_MARGIN + dims.suits * CARD_HEIGHT + (dims.suits - 1) * Y_GAP)
+
+
+# Screen title and size
+SCREEN_WIDTH, SCREEN_HEIGHT = board_size(STANDARD)
+SCREEN_TITLE = "Interference"
+
+# For cards that don't have an image (ranks past the King, or suits past the fourth),
+# which are drawn instead: the colour of each suit's text (by suit index, wrapping round), and the font
+MADE_CARD_COLORS = [(0, 0, 0), (200, 0, 0), (0, 90, 200), (0, 140, 60), (140, 0, 160), (200, 110, 0)]
+MADE_CARD_FONT = ":resources:fonts/ttf/Kenney Future.ttf"
+
+# For text
+DEFAULT_LINE_HEIGHT = 45
+DEFAULT_FONT_SIZE = 20
+
+# How often on_update is called, normally and once the game has been left alone for IDLE_AFTER seconds
+UPDATE_RATE = 1 / 60
+IDLE_UPDATE_RATE = 1 / 10
+IDLE_AFTER = 2.0
+
+@functools.cache
+def card_textures():
+    """The card images, loaded once and shared by every card sprite.
+    (Called at startup, in `play`, so the first game doesn't have to wait.)"""
+    textures = {}
+    for card_suit in CARD_SUITS:
+        for card_value in CARD_VALUES[1:]: # there's no image for 'Blank'
+            file_name = f":resources:images/cards/card{card_suit}{card_value}.png"
+            textures[card_suit, card_value] = arcade.load_texture(file_name, hit_box_algorithm="None")
+    return textures
+
+
+@functools.cache
+def made_card_texture(suit, value):
+    """A texture for a card there's no image for, the same size as the others:
+    a white card with its value and suit written on it"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = card_textures()[CARD_SUITS[0], "A"].image.size
+    image = Image.new("RGBA", (width, height))
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle((0, 0, width - 1, height - 1), radius=width // 10,
+                           fill=(255, 255, 255, 255), outline=(120, 120, 120, 255), width=2)
+    color = MADE_CARD_COLORS[suit_index(suit) % len(MADE_CARD_COLORS)]
+    try:
+        path = arcade.resources.resolve_resource_path(MADE_CARD_FONT)
+        big, small = ImageFont.truetype(str(path), height // 3), ImageFont.truetype(str(path), height // 8)
+    except OSError:
+        big = small = ImageFont.load_default()
+    draw.text((width / 2, height * 0.42), value, fill=color, font=big, anchor="mm")
+    draw.text((width / 2, height * 0.78), suit, fill=color, font=small, anchor="mm")
+    return arcade.Texture(f"made_card_{suit}_{value}", image=image, hit_box_algorithm="None")
+
+
+def card_texture(suit, value):
+    """The texture for a card: its image, if there is one, otherwise one made for it"""
+    return card_textures().get((suit, value)) or made_card_texture(suit, value)
+
+
+def card_names(dims, code):
+    """Suit and value names for a card code: the usual ones (e.g. "Hearts" and "J") where there are any,
+    otherwise numbers, for ranks past the King and suits past the fourth (e.g. "5" and "14")"""
+    suit, rank = dims.suit_of(code), dims.rank_of(code)
+    return (CARD_SUITS[suit] if suit < len(CARD_SUITS) else str(suit),
+            CARD_VALUES[rank] if rank < len(CARD_VALUES) else str(rank))
+
+
+def suit_index(suit):
+    """The inverse of the suit name from `card_names`"""
+    return CARD_SUITS.index(suit) if suit in CARD_SUITS else int(suit)
+
+
+@functools.cache
+def card_pool(dims=STANDARD):
+    """The deck of card sprites, which is made once, then reset and reused for every game.
+    There's only ever one game on screen, so the game views take turns with it."""
+    # need to create Aces and assign them images, then swap to Blank,
+    # otherwise they don't get a hitbox
+    cards = []
+    for code in range(dims.size):
+        card_suit, card_value = card_names(dims, code)
+        card = Card(card_suit, card_value, CARD_SCALE, dims)
+        card.set_visibility()
+        if card.value == "A":
+            card.make_blank()
+        cards.append(card)
+    return Deck(cards, dims)
+
+
+@functools.cache
+def hint_engine():
+    """The hint engine, shared by every game (its worker process is only started when a hint is asked for)"""
+    return HintEngine()
+
+
+class Deck(arcade.SpriteList):
+    """Deck spritelist, holding all the card sprites (52, usually), which are drawn together in one call.
+
+    The sprites are added once, and the list never changes after that: a move or a new round
+    just changes which slot of the board each sprite is in, and so where it's drawn.
+    The rules of the game, and the rows, are in the `Board`: this is only for positioning the sprites.
+    """
+
+    def __init__(self, cards, dims=STANDARD):
+        """Deck constructor"""
+        super().__init__() # initialise the parent class
+        self.extend(cards)
+        self.dims = dims
+
+        # to find the sprite for a card code (the Blanks are interchangeable, so are kept together)
+        self.by_code = {card.code: card for card in cards if card.code != BLANK}
+        self.blank_cards = [card for card in cards if card.code == BLANK]
+
+        # the card in each slot of the board, updated in place
+        self.slots = [None] * dims.size
+
+    def __str__(self):
+        out = ""
+        ranks = self.dims.ranks
+        for i in reversed(range(self.dims.suits)):
+            out += " ".join(str(card) for card in self.slots[i * ranks:(i + 1) * ranks]) + "\n"
+        return out
+
+    def reset(self, scale=CARD_SCALE):
+        """Put the cards back to how they were made, ready for a new game"""
+        for card in self:
+            card.scale = scale
+            card.slot = None
+
+    def deal(self, board):
+        """Put the card sprites in the slots that match the board
+        (N.B. they're not drawn there until `assign_positions`)"""
+        blanks = iter(self.blank_cards)
+        for slot, code in enumerate(board.cells):
+            card = self.by_code[code] if code != BLANK else next(blanks)
+            card.slot = slot
+            self.slots[slot] = card
+
+    def card_at(self, slot):
+        """Get the card in a slot of the board"""
+        return self.slots[slot]
+
+    def move(self, from_slot, to_slot):
+        """Move the card in from_slot to the Blank in to_slot (swapping the sprites over)"""
+        card = self.slots[from_slot]
+        blank = self.slots[to_slot]
+        event("swap", card=card, from_slot=from_slot, to_slot=to_slot)
+
+        # swap positions (affects drawing)
+        card.position, blank.position = blank.position, card.position
+        card.slot, blank.slot = to_slot, from_slot
+        self.slots[from_slot], self.slots[to_slot] = blank, card
+
+    def assign_positions(self, layout):
+        """Assign positions for a full deal"""
+        for slot, card in enumerate(self.slots):
+            card.position = layout.position(slot)
+
+    def check_index(self, board):
+        """Raise an AssertionError if the sprites don't match the board"""
+        for slot, card in enumerate(self.slots):
+            assert card.slot == slot, f"{card} is in slot {slot}, but thinks it's in slot {card.slot}"
+            assert card.code == board.cells[slot], f"{card} is in slot {slot}, but the board has a different card there"
+
+
+class Card(arcade.Sprite):
+    """Card sprite"""
+
+    def __init__(self, suit, value, scale = 1, dims=STANDARD):
+        """Card constructor (the suit and value are names, as from `card_names`)"""
+    
+        # Attributes
+        self.suit = suit
+        self.value = value
+        self.value_int = VALUES_INT[self.value] if self.value in VALUES_INT else int(self.value)
+        self.code = dims.code(suit_index(self.suit), self.value_int) # how the card is stored in the engine
+        self.slot = None # where the card is on the board, set when dealt
+
+        # Image to use for the sprite (shared with any other sprites for the same card)
+        self.image_file_name = f":resources:images/cards/card{self.suit}{self.value}.png"
+        texture = card_texture(self.suit, self.value)
+
+        # Call the parent
+        super().__init__(scale=scale, texture=texture, hit_box_algorithm="None")
+
+    def set_visibility(self):
+        """Set visibility for the card. Needs to be called after card initialized in setup"""
+        if self.value in ["A", "Blank"]:
+            self.visible = False
+
+    def make_blank(self):
+        """Turn an Ace into a Blank"""
+        self.value = "Blank"
+        self.code = BLANK
+
+    def __str__(self):
+        if (self.value == "Blank"):
+            return "__"
+        elif (self.suit in CARD_SUITS):
+            return f"{self.value}{SUIT_ICONS[self.suit]}"
+        else:
+            return f"{self.value}/{self.suit}"
+
+
+class Layout:
+    """Where the slots of the board are on screen.
+
+    The cards are on a grid, so finding the slot under the mouse is just arithmetic,
+    rather than testing every sprite.
+    By default the cards are scaled to fit a window of the given size,
+    keeping the proportions of the board's layout (SCREEN_WIDTH x SCREEN_HEIGHT, for the standard game),
+    with the board in the middle of the window.
+    """
+
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, scale=None, dims=STANDARD):
+        if scale is None:
+            board_width, board_height = board_size(dims)
+            scale = min(width / board_width, height / board_height)
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.ranks = dims.ranks
+        self.suits = dims.suits
+
+        # sprite scales, for cards and for the selected card (which is drawn bigger)
+        self.card_scale = CARD_SCALE * scale
+        self.selected_scale = (CARD_SCALE + X_GAP_PCT) * scale
+
+        self.card_width = CARD_WIDTH * scale
+        self.card_height = CARD_HEIGHT * scale
+        # distance between the centres of neighbouring cards
+        self.x_pitch = (CARD_WIDTH + X_GAP) * scale
+        self.y_pitch = (CARD_HEIGHT + Y_GAP) * scale
+
+        # bottom left corner of the board (the same as X_MARGIN, Y_MARGIN at the default size)
+        self.left = (width - ((self.ranks - 1) * self.x_pitch + self.card_width)) / 2
+        self.bottom = (height - ((self.suits - 1) * self.y_pitch + self.card_height)) / 2
+
+    def position(self, slot):
+        """Centre of the card in a slot"""
+        row, col = divmod(slot, self.ranks)
+        return (self.left + self.card_width / 2 + col * self.x_pitch,
+                self.bottom + self.card_height / 2 + row * self.y_pitch)
+
+    def slot_at(self, x, y, selected=None):
+        """The slot of the card at a point, or None if there isn't one there
+        (e.g. the point's in a gap between cards).
+        `selected` is the slot of the selected card, if any, as it's bigger than the others
+        so can be clicked on in what would otherwise be the gap around it."""
+        if selected is not None:
+            grow = self.selected_scale / self.card_scale
+            centre_x, centre_y = self.position(selected)
+            if abs(x - centre_x) <= self.card_width * grow / 2 and abs(y - centre_y) <= self.card_height * grow / 2:
+                return selected
+
+        col, x_offset = divmod(x - self.left, self.x_pitch)
+        row, y_offset = divmod(y - self.bottom, self.y_pitch)
+        if not (0 <= col < self.ranks and 0 <= row < self.suits) or x_offset > self.card_width or y_offset > self.card_height:
+            return None
+        return int(row) * self.ranks + int(col)
+
+
+class GameWindow(arcade.Window):
+    """A window that only redraws when something might have changed
+
+    Input, a resize or a change of view marks the window as needing a redraw,
+    and so can a view (with `request_redraw`), when something changes on its own,
+    e.g. a hint arrives. Otherwise frames are skipped: nothing is drawn,
+    and the last frame stays on screen.
+    After IDLE_AFTER seconds with no input, on_update is called less often too,
+    so a game that's been left alone hardly uses any CPU.
+    """
+
+    # events that mean the window needs redrawing
+    REDRAW_EVENTS = {"on_key_press", "on_key_release", "on_mouse_press", "on_mouse_release",
+                     "on_resize", "on_show", "on_expose", "on_activate"}
+
+    def __init__(self, *args, **kwargs):
+        # (set before the window is created, as that sends it events)
+        self.needs_redraw = True
+        self.skipped_frame = False
+        self.last_input = time.perf_counter()
+        self.idle = False
+        super().__init__(*args, update_rate=UPDATE_RATE, **kwargs)
+
+    def request_redraw(self):
+        self.needs_redraw = True
+
+    def dispatch_event(self, event_type, *args):
+        if event_type == "on_draw":
+            self.skipped_frame = not self.needs_redraw
+            if self.skipped_frame:
+                return False
+            self.needs_redraw = False
+        elif event_type in self.REDRAW_EVENTS:
+            self.needs_redraw = True
+            self.last_input = time.perf_counter()
+            if self.idle:
+                self.idle = False
+                self.set_update_rate(UPDATE_RATE)
+        elif event_type == "on_update" and not self.idle and time.perf_counter() - self.last_input > IDLE_AFTER:
+            self.idle = True
+            self.set_update_rate(IDLE_UPDATE_RATE)
+        return super().dispatch_event(event_type, *args)
+
+    def flip(self):
+        # if nothing was drawn, keep showing the last frame
+        if not self.skipped_frame:
+            super().flip()
+
+    def show_view(self, new_view):
+        super().show_view(new_view)
+        self.needs_redraw = True
+
+
+class MenuView(arcade.View):
+    def __init__(self):
+        super().__init__()
+        # the text is laid out once, here, rather than every time it's drawn
+        self.texts = [
+            arcade.Text("Interference", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2,
+                        arcade.color.BLACK, font_size=50, anchor_x="center"),
+            arcade.Text("Press 'I' for instructions", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 75,
+                        arcade.color.GRAY, font_size=20, anchor_x="center"),
+            arcade.Text("Click or press 'ENTER' to start a new game", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 150,
+                        arcade.color.GRAY, font_size=20, anchor_x="center"),
+        ]
+
+    def on_show_view(self):
+        arcade.set_background_color(arcade.color.WHITE)
+
+    def on_draw(self):
+        self.clear()
+        for text in self.texts:
+            text.draw()
+
+        arcade.set_viewport(0, SCREEN_WIDTH, 0, SCREEN_HEIGHT)
+
+    def on_key_press(self, key, modifiers):
+        """Called whenever a key is pressed"""
+
+        # show instructions
+        if key == arcade.key.I:
+            instructions_view = InstructionView(self)
+            self.window.show_view(instructions_view)
+
+        # start a new game
+        if key == arcade.key.ENTER:
+            game_view = GameView()
+            self.window.show_view(game_view)
+
+    def on_mouse_press(self, _x, _y, _button, _modifiers):
+        game_view = GameView()
+        self.window.show_view(game_view)
+
+class InstructionView(arcade.View):
+    def __init__(self, previous_view):
+        super().__init__()
+        self.previous_view = previous_view
+        self.instructions = """
+- At the start, a deck of playing cards is shuffled and dealt into four rows of thirteen cards each, then the Aces are removed to create spaces.
+
+- The aim is to arrange each row in ascending order, from 2 to King (followed by a space), one row per suit.
+
+- Click on a card to select it, then click on a space to move it there, according to the following rules:
+
+    - If there's a space at the beginning of the row, any 2 can go there.
+
+    - Otherwise, you can only move a card into a space if it's the same suit and one rank higher than the card to the left of the space, e.g. only the 3S can be placed after the 2S, only the JH can be placed after 10H.
+
+    - Nothing can go after a King, or after a space.
+
+- The layout is blocked if there are no valid moves left, i.e. if all spaces are after Kings or other spaces.
+
+- When the layout is blocked, you can start a new round, up to three rounds. For a new round, all the cards that are not yet arranged by suit in ascending order at the start of a row are collected, shuffled, and then dealt out again to fill the rows, leaving one space in each row, after the ordered cards (or a space at the start of the row, if it doesn't yet start with a 2).
+
+- A new round can be triggered from the 'Round Over' screen, or at any time by pressing 'R'.
+
+- Because there are up to four valid moves at any time, this version of patience/solitaire requires skill. You have a better chance of success if you think strategically. What's the sequence of consequences of each valid move? What card would you like to be able to move, and what other cards need to move to make that possible?
+
+- The game ends when all rows are arranged in ascending order by suit, or when the third round is stuck.
+
+- Press 'U' to undo a move and 'Y' to redo it. To undo (or redo) a new round as well, hold down shift.
+
+- Stuck? Press 'H' for a hint, which outlines a good next move. Press 'A' to turn on (or off) a hint after every move.
+
+- If the game was started with a deal index (see dealindex.py), press 'W' for a new game with a deal that's guaranteed to be winnable, or 1 (easiest) to 5 (hardest) for a deal of that difficulty.
+
+- Toggle these instructions at any time by pressing 'I' (i.e. to return to the game if you were in the middle of one).
+
+- Click to return to previous screen.
+
+- A new game can be triggered at any time (including now!) by pressing 'ENTER'.
+        """
+        self.texts = [
+            arcade.Text("Instructions", 20, SCREEN_HEIGHT - 35,
+                        arcade.color.BLACK, font_size=20, anchor_x="left"),
+            arcade.Text(self.instructions, 20, SCREEN_HEIGHT - 75,
+                        arcade.color.BLACK, font_size=13, width=SCREEN_WIDTH-30, anchor_x="left", multiline=True),
+        ]
+
+    
+    def on_show_view(self):
+        arcade.set_background_color(arcade.color.WHITE)
+
+    def on_draw(self):
+        self.clear()
+        for text in self.texts:
+            text.draw()
+
+        arcade.set_viewport(0, SCREEN_WIDTH, 0, SCREEN_HEIGHT)
+
+    def on_key_press(self, key, modifiers):
+        """Called whenever a key is pressed"""
+
+        # start a new game
+        if key == arcade.key.I:
+            # Return to previous view
+            self.window.show_view(self.previous_view)
+            # Reset the background colour to previous view
+            self.previous_view.on_show_view()
+        elif key == arcade.key.ENTER:
+            # Start new game
+            game_view = GameView()
+            self.window.show_view(game_view)
+
+
+    def on_mouse_press(self, _x, _y, _button, _modifiers):
+        # Return to previous view
+        self.window.show_view(self.previous_view)
+        self.previous_view.on_show_view()
+
+
+class GameView(arcade.View):
+    """Main application class"""
+
+    # A `MoveLog` to write every game to, if any (set by `play`)
+    move_log = None
+
+    # A `DealIndex` to choose winnable (or easy, or hard) deals from, if any (set by `play`)
+    deal_index = None
+
+    # The size of the board and the number of rounds (set by `play`)
+    dims = STANDARD
+    rounds = ROUNDS
+
+    # Keys for choosing a deal of a given difficulty from the index
+    DIFFICULTY_KEYS = {getattr(arcade.key, f"KEY_{level}"): level for level in range(1, MAX_DIFFICULTY + 1)}
+
+    def __init__(self):
+        super().__init__()
+
+        # Sprite list with all cards (regardless of row), shared by all games
+        self.deck = card_pool(self.dims)
+
+        # where the cards go, to fit the window
+        self.layout = Layout(self.window.width, self.window.height, dims=self.dims)
+
+        # cards we need to consider each move
+        self.card_1 = None # the first card clicked on
+        self.blank = None # where we try to move the card (should be a Blank)
+
+        # the game logic, as a headless board of card codes,
+        # and the moves made on it (for undo and redo)
+        self.board = None
+        self.journal = None
+
+        # Game state
+        self.seed = None # the deal and new rounds all come from this, so the game can be replayed
+        self.deal_label = None # what's known about the deal, if it came from the index
+        self.deal_rng = None
+        self.round = None # `rounds` rounds allowed (3, usually), always start new game on round 1
+        self.round_over = None # need to allow for (unlikely) case that round is dealt over, so don't set to False in setup
+        self.game_over = None
+        self.success = None # if all rows are ordered
+
+        # For displaying user interface messages
+        self.round_message = None
+        self.round_message_text = None
+        self.message = None
+
+        # Hints: the engine that finds them, the one being shown (if any),
+        # and whether to find one after every move
+        self.hints = hint_engine()
+        self.hint = None
+        self.always_hint = False
+
+        # Call setup to initialize the game
+        self.setup()
+
+    def setup(self, seed=None, label=None):
+        """Setup up game here. Call this function to restart
+        (with a seed to play a particular deal, otherwise a random one,
+        and a label to show with the round, e.g. "guaranteed winnable")"""
+        # Game state
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.deal_label = label
+        self.deal_rng = random.Random(self.seed)
+        self.round = 1
+        self.round_message_text = self.round_text()
+        self.game_over = False
+        METRICS.count("games")
+        METRICS.count("rounds")
+        event("new_game", logging.INFO, seed=self.seed)
+
+        # deselect any selected cards
+        # e.g. if call new game in middle of another game
+        self.card_1 = self.blank = None
+        self.clear_hint()
+
+        # reuse the card sprites from the last game
+        # (which also puts any selected card back to its normal size)
+        # N.B. assign positions later, once they're in slots
+        self.deck.reset(self.layout.card_scale)
+
+        # shuffle and deal the cards on the board,
+        # then put the sprites in the same slots
+        self.board = Board.deal(self.deal_rng, self.dims)
+        self.journal = Journal(self.board)
+        self.deck.deal(self.board)
+        if self.move_log:
+            self.move_log.start_game(self.seed)
+
+        # round message
+        start_x = self.layout.left
+        start_y = self.layout.height - DEFAULT_LINE_HEIGHT * 1.5
+        self.round_message = arcade.Text(self.round_message_text,
+                        start_x,
+                        start_y,
+                        arcade.color.WHITE,
+                        font_size=DEFAULT_FONT_SIZE)
+                        #width=SCREEN_WIDTH,
+                        #align="left"
+        #self.round_message.scale = 0.5
+
+        # check for (extremely unlikely case) that deal results in round over
+        # set the value, in either case
+        self.round_over = self.board.is_stuck()
+
+        # give each card a position, so it can be drawn
+        self.deck.assign_positions(self.layout)
+
+        if self.always_hint:
+            self.ask_for_hint()
+
+    def round_text(self):
+        text = f"Round {self.round} of {self.rounds}"
+        if self.deal_label:
+            text += f" ({self.deal_label})"
+        return text
+
+    def setup_from_index(self, winnable=False, difficulty=None):
+        """Start a new game with a deal from the deal index, if there is one (and it has a deal that fits)"""
+        if not self.deal_index:
+            return
+        seed = self.deal_index.find(winnable, difficulty)
+        if seed is None:
+            event("no_deal", logging.INFO, winnable=winnable, difficulty=difficulty)
+            return
+        self.setup(seed, "guaranteed winnable" if winnable else f"difficulty {difficulty}")
+
+    def on_show_view(self):
+        """Called whenever this view is shown"""
+        arcade.set_background_color(arcade.color.AMAZON)
+        # the window might have changed size while another view was showing
+        if (self.window.width, self.window.height) != (self.layout.width, self.layout.height):
+            self.on_resize(self.window.width, self.window.height)
+
+    def on_resize(self, width, height):
+        """Fit the cards to the new size of the window"""
+        self.layout = Layout(width, height, dims=self.dims)
+        for card in self.deck:
+            card.scale = self.layout.card_scale
+        if self.card_1:
+            self.card_1.scale = self.layout.selected_scale
+        self.deck.assign_positions(self.layout)
+        self.round_message.x = self.layout.left
+        self.round_message.y = height - DEFAULT_LINE_HEIGHT * 1.5
+
+    def select(self, card):
+        """Select a card to move, drawing it bigger so it stands out"""
+        if self.card_1:
+            self.card_1.scale = self.layout.card_scale
+        self.card_1 = card
+        self.card_1.scale = self.layout.selected_scale
+
+    def deselect(self):
+        """Put any selected card back to its normal size, and forget the selection"""
+        if self.card_1:
+            self.card_1.scale = self.layout.card_scale
+        self.card_1 = self.blank = None
+
+    def on_draw(self):
+        with METRICS.timer("draw"):
+            self.clear()
+
+            self.round_message.draw()
+
+            # manually reset viewport
+            # this is necessary to overcome a weird effect where drawing the text 
+            # causes an animation effect that makes all the drawing shrink towards the bottom left corner
+            arcade.set_viewport(0, self.window.width, 0, self.window.height)
+
+            # all the cards are drawn together, from the one SpriteList
+            self.deck.draw()
+
+            # outline the card to move, and the space to move it to
+            if self.hint and self.hint.move:
+                for slot in self.hint.move:
+                    x, y = self.layout.position(slot)
+                    arcade.draw_rectangle_outline(x, y, self.layout.card_width, self.layout.card_height,
+                                                  arcade.color.YELLOW, border_width=4)
+
+    def on_update(self, delta_time):
+        # pick up any hint that's arrived (without waiting for one)
+        hint = self.hints.poll()
+        if hint:
+            self.hint = hint
+            self.window.request_redraw()
+
+        METRICS.maybe_dump()
+
+    def ask_for_hint(self):
+        """Start looking for a hint, in the background"""
+        if not (self.round_over or self.game_over):
+            METRICS.count("hints")
+            self.hints.request(self.board, self.rounds - self.round + 1)
+
+    def clear_hint(self):
+        """Stop showing (or looking for) a hint, as it's out of date"""
+        self.hints.cancel()
+        self.hint = None
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        METRICS.count("clicks")
+        with METRICS.timer("input"):
+            self.click(x, y)
+
+    def click(self, x, y):
+        """Select a card, or move the selected card, depending on what's been clicked on"""
+
+        # click shouldn't register anything if the round is over
+        if self.round_over or self.game_over:
+            return
+
+        card = None
+
+        # work out which slot we clicked on (if any) from the layout, then get its card
+        slot = self.layout.slot_at(x, y, self.card_1.slot if self.card_1 else None)
+        if slot is not None:
+            card = self.deck.card_at(slot)
+            #print(f"Card: {card}") 
+        
+        # if no card to swap selected and click on card, set card_1
+        if card and card.value != "Blank" and not self.card_1 and not self.blank:
+            self.select(card)
+            event("select", card=self.card_1)
+        
+        # if card_1 selected and click on card, change card_1
+        elif card and card.value != "Blank" and self.card_1 and not self.blank:
+            self.select(card)
+            event("select", card=self.card_1)
+
+        # if card_1 selected and click on Blank, set blank
+        elif card and card.value == "Blank" and self.card_1 and not self.blank:
+            self.blank = card
+            event("blank", blank=self.blank)
+
+            move = self.card_1.slot, self.blank.slot
+            with METRICS.timer("validate"):
+                valid = self.board.is_valid_move(*move)
+
+            # if we have a card and a blank, and valid move, then swap
+            if self.card_1 and self.blank and valid:
+                METRICS.count("moves")
+                event("move", card=self.card_1, from_slot=move[0], to_slot=move[1])
+                self.journal.move(move)
+                if self.move_log:
+                    self.move_log.move(*move)
+                self.deck.move(*move)
+                self.deselect()
+                self.clear_hint()
+                self.after_move()
+
+            # otherwise move is not valid
+            else:
+                METRICS.count("invalid_moves")
+                event("invalid_move", card=self.card_1, from_slot=move[0], to_slot=move[1])
+                self.deselect()
+                
+
+    def after_move(self):
+        """Check the game state after a move (made, or redone)"""
+        if self.board.debug:
+            self.deck.check_index(self.board)
+
+        self.round_over = self.board.is_stuck()
+        if self.round_over:
+            self.success = self.board.is_ordered()
+            if self.success:
+                METRICS.count("games_won")
+                event("game_won", logging.INFO, seed=self.seed, round=self.round)
+                #self.round_message_text = "Success!"
+                self.game_over = True
+                game_over_view = GameOverView(True)  # Pass True for success
+                self.window.show_view(game_over_view)
+            elif self.round == self.rounds and not self.success:
+                self.game_over = True
+                METRICS.count("games_lost")
+                event("game_over", logging.INFO, seed=self.seed, ordered=self.board.ordered_count())
+                #self.round_message_text = "Game over"
+                game_over_view = GameOverView(False)  # Pass False when over without success
+                self.window.show_view(game_over_view)
+            else:
+                event("round_over", logging.INFO, round=self.round, ordered=self.board.ordered_count())
+                #self.round_message_text = "Round over"
+                self.show_round_over()
+
+            self.round_message.text = self.round_message_text
+
+        else:
+            self.update_round_message()
+            if self.always_hint:
+                self.ask_for_hint()
+
+    def undo(self, across_rounds=False):
+        """Take back the last move (or the last new round, if `across_rounds`)"""
+        if self.game_over:
+            return
+        entry = self.journal.undo(across_rounds)
+        if entry is None:
+            return
+        METRICS.count("undos")
+        event("undo", new_round=isinstance(entry, Redeal))
+        if self.move_log:
+            self.move_log.undo()
+
+        self.deselect()
+        self.clear_hint()
+        if isinstance(entry, Redeal):
+            self.round -= 1
+            self.show_round()
+        else:
+            # move the card back
+            self.deck.move(entry[1], entry[0])
+
+        self.round_over = self.board.is_stuck()
+        self.update_round_message()
+        if self.always_hint:
+            self.ask_for_hint()
+
+    def redo(self, across_rounds=False):
+        """Make the last move that was undone again (or the new round, if `across_rounds`)"""
+        if self.game_over:
+            return
+        entry = self.journal.redo(across_rounds)
+        if entry is None:
+            return
+        METRICS.count("redos")
+        event("redo", new_round=isinstance(entry, Redeal))
+        if self.move_log:
+            self.move_log.redo()
+
+        self.deselect()
+        self.clear_hint()
+        if isinstance(entry, Redeal):
+            self.round += 1
+            self.show_round()
+            self.round_over = self.board.is_stuck()
+            if self.always_hint:
+                self.ask_for_hint()
+        else:
+            self.deck.move(*entry)
+            self.after_move()
+
+    def show_round(self):
+        """Update the round message, and move the sprites to match the board
+        (after a new round, or undoing or redoing one)"""
+        self.update_round_message()
+        self.deck.deal(self.board)
+        self.deck.assign_positions(self.layout)
+
+    def update_round_message(self):
+        """Show which round it is, and whether it's dead: there are still moves,
+        but none of them can order any more cards (see deadlock.py), so it's time for a new round"""
+        self.round_message_text = self.round_text()
+        if not self.board.is_stuck() and is_dead(self.board):
+            event("round_dead", logging.INFO, round=self.round, ordered=self.board.ordered_count())
+            if self.round < self.rounds:
+                self.round_message_text += ": no more cards can be ordered this round, press 'R' for a new round"
+            else:
+                self.round_message_text += ": no more cards can be ordered"
+        self.round_message.text = self.round_message_text
+
+    def new_round(self):
+
+        if self.round == self.rounds:
+            game_over_view = GameOverView(False)  # Pass False when over without success
+            self.window.show_view(game_over_view)
+            event("out_of_rounds", logging.INFO, seed=self.seed)
+            return
+
+        self.round_over = False
+        self.round += 1
+
+        # deselect any selected cards
+        self.deselect()
+        self.clear_hint()
+
+        METRICS.count("rounds")
+        event("new_round", logging.INFO, round=self.round)
+
+        # keep the ordered cards, then shuffle and deal the rest,
+        # then update the round message and move the sprites to match
+        self.journal.redeal(self.deal_rng)
+        if self.move_log:
+            self.move_log.redeal()
+        self.show_round()
+
+        if self.always_hint:
+            self.ask_for_hint()
+        
+    def on_key_press(self, key, modifiers):
+        # start a new round
+        if key == arcade.key.R:
+            self.new_round()
+        # start a new game
+        elif key == arcade.key.ENTER:
+            self.setup()
+        # show instructions
+        elif key == arcade.key.I:
+            instructions_view = InstructionView(self)
+            self.window.show_view(instructions_view)
+        # undo and redo (with shift, taking back a new round too)
+        elif key == arcade.key.U:
+            self.undo(across_rounds=bool(modifiers & arcade.key.MOD_SHIFT))
+        elif key == arcade.key.Y:
+            self.redo(across_rounds=bool(modifiers & arcade.key.MOD_SHIFT))
+        # ask for a hint
+        elif key == arcade.key.H:
+            self.ask_for_hint()
+        # turn hints after every move on or off
+        elif key == arcade.key.A:
+            self.always_hint = not self.always_hint
+            if self.always_hint:
+                self.ask_for_hint()
+            else:
+                self.clear_hint()
+        # start a new game with a deal that can be won
+        elif key == arcade.key.W:
+            self.setup_from_index(winnable=True)
+        # start a new game with a deal of a given difficulty
+        elif key in self.DIFFICULTY_KEYS:
+            self.setup_from_index(difficulty=self.DIFFICULTY_KEYS[key])
+
+    def show_round_over(self):
+        round_over_view = RoundOverView(self)
+        self.window.show_view(round_over_view)
+
+
+class RoundOverView(arcade.View):
+    def __init__(self, game_view):
+        super().__init__()
+        # Store reference to the game view that created this round over view
+        self.game_view = game_view
+        self.texts = [
+            arcade.Text("ROUND OVER", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2,
+                        arcade.color.BLACK, font_size=50, anchor_x="center"),
+            arcade.Text("Click or press 'R' to start new round", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 75,
+                        arcade.color.GRAY, font_size=20, anchor_x="center"),
+            arcade.Text("Press 'U' to take back the last move", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 150,
+                        arcade.color.GRAY, font_size=20, anchor_x="center"),
+        ]
+
+    def on_show_view(self):
+        arcade.set_background_color(arcade.color.WHITE)
+
+    def on_draw(self):
+        self.clear()
+        for text in self.texts:
+            text.draw()
+
+        arcade.set_viewport(0, SCREEN_WIDTH, 0, SCREEN_HEIGHT)
+
+    def on_key_press(self, key, modifiers):
+        if key == arcade.key.R:
+            # Start new round in the existing game view
+            self.game_view.new_round()
+            # Switch back to the game view
+            self.window.show_view(self.game_view)
+            # Call on_show_view to reset the background color
+            self.game_view.on_show_view()
+        elif key == arcade.key.U:
+            # Go back to the game, taking back the last move
+            self.game_view.undo()
+            self.window.show_view(self.game_view)
+            self.game_view.on_show_view()
+        elif key == arcade.key.I:
+            instructions_view = InstructionView(self)
+            self.window.show_view(instructions_view)
+
+    def on_mouse_press(self, _x, _y, _button, _modifiers):
+            # Start new round in the existing game view
+            self.game_view.new_round()
+            # Switch back to the game view
+            self.window.show_view(self.game_view)
+            # Call on_show_view to reset the background color
+            self.game_view.on_show_view()
+
+
+class GameOverView(arcade.View):
+    def __init__(self, success):
+        super().__init__()
+        self.success = success
+
+        message = "CONGRATULATIONS!" if self.success else "GAME OVER"
+        subtext = "You successfully ordered all the cards!" if self.success else "Better luck next time!"
+        self.texts = [
+            arcade.Text(message,
+                        SCREEN_WIDTH / 2,
+                        SCREEN_HEIGHT / 2,
+                        arcade.color.GOLD if self.success else arcade.color.WHITE,
+                        font_size=50,
+                        anchor_x="center"),
+            arcade.Text(subtext,
+                        SCREEN_WIDTH / 2,
+                        SCREEN_HEIGHT / 2 - 75,
+                        arcade.color.WHITE if self.success else arcade.color.GRAY,
+                        font_size=20,
+                        anchor_x="center"),
+            arcade.Text("Click or press 'ENTER' to start a new game",
+                        SCREEN_WIDTH / 2,
+                        SCREEN_HEIGHT / 2 - 150,
+                        arcade.color.WHITE if self.success else arcade.color.GRAY,
+                        font_size=20,
+                        anchor_x="center"),
+        ]
+
+    def on_show_view(self):
+        arcade.set_background_color(arcade.color.AMAZON if self.success else arcade.color.BLACK)
+
+    def on_draw(self):
+        self.clear()
+        for text in self.texts:
+            text.draw()
+
+        arcade.set_viewport(0, SCREEN_WIDTH, 0, SCREEN_HEIGHT)
+
+    def on_mouse_press(self, _x, _y, _button, _modifiers):
+        game_view = GameView()
+        self.window.show_view(game_view)
+
+    def on_key_press(self, key, modifiers):
+        if key == arcade.key.ENTER:
+            game_view = GameView()
+            self.window.show_view(game_view)
+        elif key == arcade.key.I:
+            instructions_view = InstructionView(self)
+            self.window.show_view(instructions_view)
+
+
+def play(deals=None, solver_cache=None, log=None, metrics=None, dims=STANDARD, rounds=ROUNDS):
+    """Open the window and play (until the window is closed), optionally with a deal index,
+    a solver cache for the hints, a move log to append to, and a file to save the metrics to,
+    and with a board of another size, or another number of rounds.
+    (Deal indexes and move logs are only for the standard board.)"""
+    GameView.dims = dims
+    GameView.rounds = rounds
+    if log:
+        GameView.move_log = MoveLog.open(log)
+    if deals:
+        GameView.deal_index = DealIndex(deals)
+    if solver_cache:
+        hint_engine().cache_path = solver_cache
+
+    window = GameWindow(int(SCREEN_WIDTH), int(SCREEN_HEIGHT), SCREEN_TITLE, resizable=True)
+    # load all the card images up front
+    card_textures()
+    menu_view = MenuView()
+    window.show_view(menu_view)
+    arcade.run()
+
+    if GameView.move_log:
+        GameView.move_log.close()
+    if metrics:
+        METRICS.dump()
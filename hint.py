@@ -0,0 +1,143 @@
+"""
+Hints: the built-in 'interferer', suggesting the next move.
+
+The search for a hint runs in a separate process, so the game window keeps
+drawing while it thinks. `HintEngine.request` sends it the current position,
+then the worker searches deeper and deeper (an iterative deepening search,
+using `solver.solve` with a depth limit), sending back a better hint each time
+it finishes a depth, until it runs out of time or has searched the whole round.
+The game collects hints with `HintEngine.poll`, without waiting.
+Searches that finish are cached (see poscache.py), so asking again about
+a position already searched (or the same one with the rows in a different order)
+doesn't search it again.
+
+A new request, or `HintEngine.cancel`, stops the search straight away
+(the worker checks for messages while it searches),
+and any hints still on their way for an old request are ignored.
+"""
+
+import multiprocessing
+import time
+
+from engine import Board
+from poscache import PositionCache, solve_cached
+
+# Default time allowed to think about each request, in seconds
+TIME_BUDGET = 0.1
+
+# Keep the transposition table small, so it's quick to set up for each depth
+HINT_MEMORY_MB = 4
+
+
+class Hint:
+    """A suggested move (or None, if no line of play adds any ordered cards),
+    found by searching `depth` moves ahead. `final` is True for the last hint for a request."""
+
+    def __init__(self, request_id, move, ordered, depth, final):
+        self.request_id = request_id
+        self.move = move
+        self.ordered = ordered
+        self.depth = depth
+        self.final = final
+
+    def __str__(self):
+        return f"hint {self.move} (to {self.ordered} ordered cards, looking {self.depth} moves ahead)"
+
+
+def think(conn, cache, request_id, cells, dims, rounds_left, time_budget):
+    """Search for hints for one request, sending them back as they improve.
+    If another message arrives in the meantime, stop and return it."""
+    board = Board(cells, dims)
+    deadline = time.perf_counter() + time_budget
+
+    def should_stop():
+        return time.perf_counter() >= deadline or conn.poll()
+
+    best = None
+    depth = 2
+    while True:
+        solution = solve_cached(cache, board, rounds_left, max_depth=depth, should_stop=should_stop,
+                                memory_mb=HINT_MEMORY_MB)
+        # a search that was cut short still counts, if it found something better
+        if solution.complete or best is None or solution.ordered > best.ordered:
+            searched_everything = solution.complete and solution.stats.max_depth < depth
+            move = solution.moves[0] if solution.moves else None
+            best = Hint(request_id, move, solution.ordered, depth, searched_everything)
+            conn.send(best)
+            if searched_everything:
+                return None
+
+        if conn.poll():
+            return conn.recv()
+        if time.perf_counter() >= deadline:
+            break
+        depth *= 2
+
+    if best is not None:
+        conn.send(Hint(request_id, best.move, best.ordered, best.depth, True))
+    return None
+
+
+def run_worker(conn, cache_path=None):
+    """Main loop of the worker process: wait for requests, and think about them"""
+    cache = PositionCache(cache_path)
+    message = None
+    while True:
+        if message is None:
+            message = conn.recv()
+        kind, *args = message
+        if kind == "stop":
+            return
+        elif kind == "request":
+            message = think(conn, cache, *args)
+        else: # "cancel": nothing to do, as we only think when asked
+            message = None
+
+
+class HintEngine:
+    """Runs the hint search in a worker process, started when it's first needed"""
+
+    def __init__(self, time_budget=TIME_BUDGET, cache_path=None):
+        self.time_budget = time_budget
+        self.cache_path = cache_path # a file to keep searches in between games (otherwise only in memory)
+        self.request_id = 0
+        self.conn = None
+        self.process = None
+
+    def start(self):
+        self.conn, worker_conn = multiprocessing.Pipe()
+        # a daemon process is stopped automatically when the game exits
+        self.process = multiprocessing.Process(target=run_worker, args=(worker_conn, self.cache_path), daemon=True)
+        self.process.start()
+
+    def request(self, board, rounds_left, time_budget=None):
+        """Start looking for a hint for `board`, dropping any earlier request"""
+        if self.process is None:
+            self.start()
+        self.request_id += 1
+        budget = self.time_budget if time_budget is None else time_budget
+        self.conn.send(("request", self.request_id, board.cells.tolist(), board.dims, rounds_left, budget))
+
+    def cancel(self):
+        """Stop looking for a hint (e.g. because the player has moved)"""
+        if self.process is None:
+            return
+        self.request_id += 1
+        self.conn.send(("cancel",))
+
+    def poll(self):
+        """The best hint received so far for the current request, or None.
+        Doesn't wait, so can be called every frame."""
+        hint = None
+        while self.conn is not None and self.conn.poll():
+            received = self.conn.recv()
+            if received.request_id == self.request_id:
+                hint = received
+        return hint
+
+    def close(self):
+        if self.process is not None:
+            self.conn.send(("stop",))
+            self.process.join(timeout=1)
+            self.process = None
+            self.conn = None
@@ -0,0 +1,199 @@
+"""
+Logging and metrics for the game, all off by default.
+
+Events (a card selected, a move that isn't valid, a new round, ...) go to the
+"interference" logger as structured records: an event name plus some fields,
+which are only turned into text if the logger is enabled for that level,
+so an event costs next to nothing when logging is off.
+`configure` turns logging on, writing one JSON object per line.
+
+`METRICS` counts things (moves, invalid moves, rounds, games) and keeps
+histograms of how long things take (handling a click, checking a move,
+drawing a frame). It does nothing until it's enabled, and can be saved as a
+JSON snapshot, either when asked or every so often (see `Metrics.maybe_dump`).
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+logger = logging.getLogger("interference")
+logger.addHandler(logging.NullHandler())
+
+
+def event(name, level=logging.DEBUG, **fields):
+    """Log an event, with some fields (which are only formatted if it's logged)"""
+    if logger.isEnabledFor(level):
+        logger.log(level, name, extra={"fields": fields})
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats an event as one line of JSON"""
+
+    def format(self, record):
+        out = {"time": record.created, "level": record.levelname.lower(), "event": record.getMessage()}
+        for key, value in getattr(record, "fields", {}).items():
+            # cards etc. are written the way they print
+            out[key] = value if isinstance(value, (int, float, bool, type(None))) else str(value)
+        return json.dumps(out)
+
+
+class Histogram:
+    """Counts of durations, in buckets that double in size:
+    bucket 0 is under 1 microsecond, and bucket b is 2**(b-1) up to 2**b microseconds"""
+
+    BUCKETS = 32 # (the last one is over half an hour, and takes anything longer)
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        self.counts[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Roughly the p-th percentile (0 to 100), as the top of the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        wanted = p / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(2**bucket / 1e6, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            # upper bound of each bucket (in microseconds) -> count, leaving out empty buckets
+            "buckets": {2**bucket: count for bucket, count in enumerate(self.counts) if count},
+        }
+
+
+class Timer:
+    """Times a block of code into a histogram, e.g. `with METRICS.timer("draw"): ...`"""
+
+    __slots__ = ("metrics", "name", "began")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.began)
+
+
+class NoTimer:
+    """Stands in for a `Timer` when metrics are off"""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+NO_TIMER = NoTimer()
+
+
+class Metrics:
+    """Counters and latency histograms, which record nothing until `enabled` is set"""
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = Counter()
+        self.histograms = {}
+        self.started = time.time()
+
+        # for saving snapshots every so often
+        self.dump_path = None
+        self.dump_interval = None
+        self.last_dump = time.perf_counter()
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, name):
+        return Timer(self, name) if self.enabled else NO_TIMER
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+        self.started = time.time()
+
+    def snapshot(self):
+        """Everything recorded so far, as a dict that can be saved as JSON"""
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def dump(self, path=None):
+        """Save a snapshot as JSON (to `dump_path` if no path is given)"""
+        path = path or self.dump_path
+        # write to a new file and then swap it in, so a reader never sees half a snapshot
+        with open(path + ".tmp", "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
+        os.replace(path + ".tmp", path)
+        self.last_dump = time.perf_counter()
+
+    def maybe_dump(self):
+        """Save a snapshot if it's time to (call this often, e.g. every frame)"""
+        if (self.enabled and self.dump_path and self.dump_interval is not None
+                and time.perf_counter() - self.last_dump >= self.dump_interval):
+            self.dump()
+
+
+METRICS = Metrics()
+
+
+def configure(level=None, stream=None, metrics=False, dump_path=None, dump_interval=None):
+    """Turn on logging (at `level`, e.g. "debug" or "info", to `stream`, default stderr)
+    and/or metrics (saved to `dump_path` every `dump_interval` seconds, if given)"""
+    if level is not None:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JSONFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+        logger.propagate = False
+
+    if metrics or dump_path:
+        METRICS.enabled = True
+        METRICS.dump_path = dump_path
+        METRICS.dump_interval = dump_interval
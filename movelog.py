@@ -0,0 +1,230 @@
+"""
+Seeded games, a compact binary log of their moves, and fast replay.
+
+Every game has a seed: the deal and each new round's redeal come from
+`random.Random(seed)` (as in `simulate.play_game`), so the seed and the moves
+are all it takes to play a game through again.
+
+A log is a file of games, one after another, each written as it's played
+(so the file is only ever appended to):
+
+- a 12-byte header: b"IFL", the format version (1 byte), then the seed (8 bytes, little-endian)
+- 2 bytes for each move: from_slot then to_slot (0 to 51)
+- 2 bytes, 0xFF 0xFF, for each new round
+- 2 bytes, 0xFE 0xFE, for an undo (of a move or a new round), and 0xFD 0xFD for a redo
+  (added in version 2; version 1 logs are still read)
+
+None of the bytes after a header can be b"I" (73), so the start of the next game
+can be found by searching for the next header, rather than stepping through the moves.
+
+`replay` plays a logged game through again on a headless `Board`,
+checking every move with `Board.is_valid_move` (the same rules as the game),
+e.g. `python movelog.py games.log` checks every game in a log.
+"""
+
+import argparse
+import random
+import struct
+import time
+
+from engine import BLANK, ROUNDS, Board, Redeal
+
+MAGIC = b"IFL"
+VERSION = 2
+READABLE_VERSIONS = {1, 2}
+HEADER = struct.Struct("<3sBQ")
+
+# Markers for a new round, an undo and a redo (the first byte can never be a slot)
+REDEAL = b"\xff\xff"
+REDEAL_BYTE = REDEAL[0]
+UNDO = b"\xfe\xfe"
+UNDO_BYTE = UNDO[0]
+REDO = b"\xfd\xfd"
+REDO_BYTE = REDO[0]
+
+
+class LogError(ValueError):
+    """A log that can't be read (as opposed to a game in it that doesn't replay)"""
+
+
+class MoveLog:
+    """Writes games to a log file, a move at a time"""
+
+    def __init__(self, file):
+        self.file = file
+
+    @classmethod
+    def open(cls, path):
+        """Append to the log at `path` (creating it if need be)"""
+        return cls(open(path, "ab"))
+
+    def start_game(self, seed):
+        # the last game is finished with, so make sure it's all on disk
+        self.file.flush()
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed))
+
+    def move(self, from_slot, to_slot):
+        self.file.write(bytes((from_slot, to_slot)))
+
+    def redeal(self):
+        self.file.write(REDEAL)
+
+    def undo(self):
+        self.file.write(UNDO)
+
+    def redo(self):
+        self.file.write(REDO)
+
+    def close(self):
+        self.file.close()
+
+
+def read_games(data):
+    """The games in a log (as bytes), as (seed, body) pairs,
+    where body is the bytes of the game's moves and new-round markers"""
+    start = 0
+    while start < len(data):
+        if len(data) - start < HEADER.size:
+            raise LogError(f"log ends part way through a game header, at byte {start}")
+        magic, version, seed = HEADER.unpack_from(data, start)
+        if magic != MAGIC:
+            raise LogError(f"expected a game header at byte {start}")
+        if version not in READABLE_VERSIONS:
+            raise LogError(f"game at byte {start} is format version {version}, expected {VERSION}")
+
+        body_start = start + HEADER.size
+        end = data.find(MAGIC, body_start)
+        if end == -1:
+            end = len(data)
+        yield seed, data[body_start:end]
+        start = end
+
+
+def read_log(path):
+    with open(path, "rb") as file:
+        return list(read_games(file.read()))
+
+
+class Replay:
+    """The result of playing a logged game through again"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.error = None # why the game didn't replay, if it didn't
+        self.moves = 0
+        self.rounds = 1
+        self.board = None # the final position
+        self.line = [] # the moves and `Redeal`s that stand at the end (not counting any that were undone)
+        self.ordered = 0
+        self.won = False
+
+    @property
+    def valid(self):
+        return self.error is None
+
+    def __str__(self):
+        outcome = "won" if self.won else f"{self.ordered} ordered"
+        out = f"game {self.seed}: {self.moves} moves, {self.rounds} rounds, {outcome}"
+        if self.error:
+            out += f" (INVALID: {self.error})"
+        return out
+
+
+def replay(seed, body):
+    """Play a game through from its seed and logged moves, checking each move is legal"""
+    result = Replay(seed)
+    rng = random.Random(seed)
+    board = Board.deal(rng)
+    # Checking a move only needs the layout, so moves just swap the cells over,
+    # and the rest of the board's index is rebuilt when it's needed (for a new round, and at the end).
+    # That's a few times faster than keeping it up to date with `Board.apply`.
+    cells = board.cells
+    # For undo and redo: the moves, and `Redeal`s for the new rounds, as in a `Journal`
+    done = []
+    undone = []
+
+    if len(body) % 2:
+        result.error = "log ends part way through a move"
+    for i in range(0, len(body) - 1, 2):
+        from_slot = body[i]
+        to_slot = body[i + 1]
+        if from_slot == REDEAL_BYTE:
+            if result.rounds == ROUNDS:
+                result.error = f"new round after round {ROUNDS}"
+                break
+            before = cells[:]
+            board.build_index()
+            board.redeal(rng)
+            cells = board.cells
+            done.append(Redeal(before, cells))
+            undone.clear()
+            result.rounds += 1
+        elif from_slot == UNDO_BYTE:
+            if not done:
+                result.error = "undo with nothing to undo"
+                break
+            entry = done.pop()
+            undone.append(entry)
+            if isinstance(entry, Redeal):
+                board.unpermute(entry.perm)
+                cells = board.cells
+                result.rounds -= 1
+            else:
+                # make the move backwards
+                cells[entry[0]] = cells[entry[1]]
+                cells[entry[1]] = BLANK
+                result.moves -= 1
+        elif from_slot == REDO_BYTE:
+            if not undone:
+                result.error = "redo with nothing to redo"
+                break
+            entry = undone.pop()
+            done.append(entry)
+            if isinstance(entry, Redeal):
+                board.permute(entry.perm)
+                cells = board.cells
+                result.rounds += 1
+            else:
+                cells[entry[1]] = cells[entry[0]]
+                cells[entry[0]] = BLANK
+                result.moves += 1
+        elif from_slot < 52 and to_slot < 52 and board.is_valid_move(from_slot, to_slot):
+            cells[to_slot] = cells[from_slot]
+            cells[from_slot] = BLANK
+            done.append((from_slot, to_slot))
+            undone.clear()
+            result.moves += 1
+        else:
+            result.error = f"move {result.moves + 1} ({from_slot} -> {to_slot}) isn't valid"
+            break
+
+    board.build_index()
+    result.board = board
+    result.line = done
+    result.ordered = board.ordered_count()
+    result.won = board.is_ordered()
+    return result
+
+
+def replay_log(path):
+    """Replay every game in a log"""
+    return [replay(seed, body) for seed, body in read_log(path)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the games in Interference move logs")
+    parser.add_argument("logs", nargs="+", metavar="LOG")
+    parser.add_argument("--verbose", action="store_true", help="print every game, not just invalid ones")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    results = [result for path in args.logs for result in replay_log(path)]
+    seconds = time.perf_counter() - began
+
+    for result in results:
+        if args.verbose or not result.valid:
+            print(result)
+    valid = sum(result.valid for result in results)
+    won = sum(result.won for result in results)
+    print(f"{len(results)} games, {valid} valid, {won} won, "
+          f"in {seconds:.2f}s ({len(results) / seconds if seconds else 0:,.0f} games/sec)")
@@ -0,0 +1,365 @@
+"""
+Planning across rounds: which position to end a round in, given what the new round will do.
+
+The solver (solver.py) finds the line that orders the most cards this round,
+but that isn't always the best line for the game: a new round keeps each row's
+ordered cards, then shuffles and deals out the rest, so what matters is which
+cards are kept, and how well the following rounds are likely to go from there.
+E.g. one long run and three empty rows isn't the same as four short runs.
+
+`plan` looks for the positions that can be reached this round (a depth-first
+search, up to `node_limit` positions), and groups them by what a new round would
+keep (each row's ordered run). Those are the candidates for where to end the round.
+Each candidate is scored by sampling: redeal it, play out the rounds left with a
+quick rollout policy (from simulate.py), and see whether the game is won, and how
+many cards end up ordered; the expected outcome is the average over the samples.
+
+Sample k uses the same seed for every candidate (common random numbers), so the
+candidates are compared on the same shuffles, as far as that goes, and the
+differences between them are less noisy than their scores. Samples are shared
+out between worker processes, in chunks, with a budget of samples per candidate
+and an overall time limit, after which the best estimate so far is returned.
+
+    python planner.py --seed 5 --samples 200 --time-limit 30
+"""
+
+import argparse
+import math
+import multiprocessing
+import random
+import time
+
+from engine import ROUNDS, STANDARD, Board, Dimensions
+from simulate import MAX_MOVES_PER_ROUND, POLICIES, SolverPolicy
+from tournament import REDEAL, Strategy
+
+# Positions searched this round, looking for places to end it
+NODE_LIMIT = 50_000
+
+# Candidates kept (the ones that order the most cards, of those that aren't dominated)
+MAX_CANDIDATES = 12
+
+# Samples of the rounds left, per candidate
+SAMPLES = 200
+
+# Samples per task handed to a worker
+CHUNK_SIZE = 8
+
+ROLLOUT = "greedy"
+
+
+def keeps(board):
+    """What a new round would keep: the (first card, length) of each row's ordered run,
+    in a canonical order, as rows are interchangeable (a row with no run is (-1, 0))"""
+    ranks = board.dims.ranks
+    return tuple(sorted((board.cells[i * ranks] if board.split_index(i) else -1, board.split_index(i))
+                        for i in range(board.dims.suits)))
+
+
+def dominates(a, b):
+    """True if keeping `a` keeps everything `b` would (the same runs, at least as long)"""
+    runs = {card: length for card, length in a if length}
+    return a != b and all(runs.get(card, 0) >= length for card, length in b if length)
+
+
+class Candidate:
+    """A place to end the round: a line of play to get there, and what sampling made of it"""
+
+    def __init__(self, moves, board):
+        self.moves = moves
+        self.board = board # the position at the end of the line
+        self.keeps = keeps(board)
+        self.ordered = board.ordered_count()
+        self.samples = 0
+        self.wins = 0
+        self.total_ordered = 0 # at the end of the game, over the samples
+        self.total_squared = 0 # (for the standard error)
+
+    def add(self, wins, total_ordered, total_squared, samples):
+        self.wins += wins
+        self.total_ordered += total_ordered
+        self.total_squared += total_squared
+        self.samples += samples
+
+    @property
+    def win_rate(self):
+        return self.wins / self.samples if self.samples else float(self.board.is_ordered())
+
+    @property
+    def mean_ordered(self):
+        return self.total_ordered / self.samples if self.samples else float(self.ordered)
+
+    @property
+    def stderr(self):
+        """Standard error of `mean_ordered`"""
+        if self.samples < 2:
+            return 0.0
+        variance = (self.total_squared - self.total_ordered ** 2 / self.samples) / (self.samples - 1)
+        return math.sqrt(max(variance, 0.0) / self.samples)
+
+    @property
+    def score(self):
+        """Win rate first, then the cards ordered by the end of the game"""
+        return (self.win_rate, self.mean_ordered)
+
+    def __str__(self):
+        name = self.board.dims.card_name
+        runs = ", ".join(name(card) if length == 1 else f"{name(card)}-{name(card + length - 1)}"
+                         for card, length in self.keeps if length) or "nothing"
+        return (f"{len(self.moves):3} moves, {self.ordered:2} ordered (keeps {runs}): "
+                f"{self.win_rate:6.1%} won, {self.mean_ordered:.1f} +/- {self.stderr:.1f} ordered "
+                f"({self.samples} samples)")
+
+
+class Plan:
+    """The result of `plan`: the candidates, best first"""
+
+    def __init__(self, candidates, rounds_left, positions, complete, seconds):
+        self.candidates = candidates
+        self.rounds_left = rounds_left
+        self.positions = positions # searched this round
+        self.complete = complete # False if the search (or the sampling) was cut short
+        self.seconds = seconds
+
+    @property
+    def best(self):
+        return self.candidates[0] if self.candidates else None
+
+    def __str__(self):
+        out = f"{len(self.candidates)} candidates from {self.positions} positions, in {self.seconds:.1f}s"
+        out += "" if self.complete else " (cut short)"
+        for candidate in self.candidates:
+            out += "\n" + str(candidate)
+        return out
+
+
+def end_positions(position, node_limit=NODE_LIMIT, deadline=None):
+    """Candidates for where to end the round: for each thing a new round could keep,
+    the shortest line found that gets there (as the search found it, see `shorten`). Returns them, and the number of positions searched,
+    and whether that was all of them (it stops after `node_limit` positions, or at the deadline)."""
+    board = position.copy()
+    found = {}
+
+    def record(path):
+        key = keeps(board)
+        if key not in found or len(path) < len(found[key][0]):
+            found[key] = (path[:], board.copy())
+
+    # depth-first, making and unmaking moves on one board, as in the solver
+    seen = {board.hash}
+    path = []
+    stack = [board.legal_moves()]
+    record(path)
+    while stack and len(seen) < node_limit:
+        if deadline is not None and not len(seen) % 256 and time.time() > deadline:
+            break
+        moves = stack[-1]
+        if not moves:
+            stack.pop()
+            if path:
+                board.unapply(path.pop())
+            continue
+        move = moves.pop()
+        board.apply(move)
+        if board.hash in seen:
+            board.unapply(move)
+            continue
+        seen.add(board.hash)
+        path.append(move)
+        record(path)
+        stack.append(board.legal_moves())
+
+    return [Candidate(moves, end) for moves, end in found.values()], len(seen), not stack
+
+
+def shortlist(candidates, position, max_candidates=MAX_CANDIDATES):
+    """Drop the candidates that another one dominates, then keep the ones that order the most
+    (with the detours cut out of their lines)"""
+    kept = [a for a in candidates if not any(dominates(b.keeps, a.keeps) for b in candidates)]
+    kept.sort(key=lambda candidate: (-candidate.ordered, len(candidate.moves)))
+    kept = kept[:max_candidates]
+    for candidate in kept:
+        candidate.moves = shorten(position, candidate.moves)
+    return kept
+
+
+def shorten(position, moves):
+    """Cut the detours out of a line of play: wherever a later position on the line
+    is one move from an earlier one, go straight there. (A depth-first search
+    wanders, so its lines are often much longer than they need to be.)"""
+    board = position.copy()
+    on_line = {board.hash: 0}
+    for i, move in enumerate(moves):
+        board.apply(move)
+        on_line[board.hash] = i + 1
+
+    board = position.copy()
+    shorter = []
+    i = 0
+    while i < len(moves):
+        # the move that gets furthest along the line
+        furthest, best = i + 1, moves[i]
+        for move in board.legal_moves():
+            board.apply(move)
+            j = on_line.get(board.hash, -1)
+            board.unapply(move)
+            if j > furthest:
+                furthest, best = j, move
+        board.apply(best)
+        shorter.append(best)
+        i = furthest
+    return shorter
+
+
+def describe(position, moves):
+    """A line of play as the cards moved, in order"""
+    board = position.copy()
+    names = []
+    for move in moves:
+        names.append(board.dims.card_name(board.cells[move[0]]))
+        board.apply(move)
+    return " ".join(names)
+
+
+def rollout(board, rounds_left, deal_rng, policy, policy_rng, max_moves=MAX_MOVES_PER_ROUND):
+    """Play out the rounds left after this one from `board` (which is changed), as `simulate.play_game` does"""
+    for _ in range(rounds_left - 1):
+        if board.is_ordered():
+            break
+        board.redeal(deal_rng)
+        moves = 0
+        while moves < max_moves and not board.is_stuck():
+            move = policy(board, policy_rng)
+            if move is None:
+                break
+            board.apply(move)
+            moves += 1
+    return board
+
+
+def sample_chunk(args):
+    """Samples `first` to `stop` for one candidate (in a worker process), stopping early at the deadline.
+    Returns (candidate index, wins, total ordered, total ordered squared, samples)."""
+    index, cells, dims, rounds_left, seed, first, stop, rollout_name, deadline = args
+    policy = POLICIES[rollout_name]
+    wins = total = squared = samples = 0
+    for k in range(first, stop):
+        if deadline is not None and time.time() > deadline:
+            break
+        # the same random numbers for sample k of every candidate
+        board = rollout(Board(cells, dims), rounds_left, random.Random(f"{seed}/{k}"), policy,
+                        random.Random(f"{seed}/{k}/policy"))
+        ordered = board.ordered_count()
+        wins += board.is_ordered()
+        total += ordered
+        squared += ordered * ordered
+        samples += 1
+    return index, wins, total, squared, samples
+
+
+def add_samples(candidates, results, deadline):
+    """Add up the samples from `sample_chunk`, until they're done or it's past the deadline"""
+    for index, *counts in results:
+        candidates[index].add(*counts)
+        if deadline is not None and time.time() > deadline:
+            break
+
+
+def plan(position, rounds_left=ROUNDS, samples=SAMPLES, time_limit=None, workers=None, seed=0,
+         node_limit=NODE_LIMIT, max_candidates=MAX_CANDIDATES, rollout_policy=ROLLOUT, chunk_size=CHUNK_SIZE):
+    """Work out where to end the round from `position` (a `Board`), given the `rounds_left` (counting this one).
+    Each candidate gets up to `samples` samples of the rounds after this one, in `workers` processes
+    (1 for none), all within `time_limit` seconds (if given). Returns a `Plan`."""
+    began = time.perf_counter()
+    deadline = time.time() + time_limit if time_limit is not None else None
+    # (the search gets up to half the time, leaving the rest for sampling)
+    search_deadline = time.time() + time_limit / 2 if time_limit is not None else None
+    candidates, positions, complete = end_positions(position, node_limit, search_deadline)
+    candidates = shortlist(candidates, position, max_candidates)
+
+    if rounds_left > 1 and candidates:
+        # sample k of every candidate, then sample k+1, ..., so that stopping early still leaves
+        # them all with about the same samples
+        tasks = ((index, candidate.board.cells, position.dims, rounds_left, seed, first, min(first + chunk_size, samples),
+                  rollout_policy, deadline)
+                 for first in range(0, samples, chunk_size) for index, candidate in enumerate(candidates))
+        if workers == 1:
+            add_samples(candidates, map(sample_chunk, tasks), deadline)
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                # (leaving the `with` stops the workers, if it's out of time)
+                add_samples(candidates, pool.imap_unordered(sample_chunk, tasks), deadline)
+        complete = complete and all(candidate.samples == samples for candidate in candidates)
+        candidates.sort(key=lambda candidate: candidate.score, reverse=True)
+    else:
+        # no rounds after this one: the candidate that orders the most is the best
+        candidates.sort(key=lambda candidate: (candidate.ordered, -len(candidate.moves)), reverse=True)
+
+    return Plan(candidates, rounds_left, positions, complete, time.perf_counter() - began)
+
+
+class PlannerStrategy(Strategy):
+    """Plays the planner's line for each round, then starts the next one
+    (for tournaments, e.g. `python tournament.py greedy planner:PlannerStrategy --time-limit 60`).
+    It plans in the tournament's worker process, so with a small budget by default."""
+
+    name = "planner"
+
+    def __init__(self, samples=32, node_limit=5000, max_candidates=6):
+        self.samples = samples
+        self.node_limit = node_limit
+        self.max_candidates = max_candidates
+        self.line = [] # the moves left to play, next one last
+        self.expected = None # the board's hash when the next move is due
+        # in the last round there's nothing to plan for, only cards to order, which is what the solver does
+        self.solver = SolverPolicy()
+
+    def new_game(self, seed):
+        self.line = []
+        self.expected = None
+        self.solver.plan = []
+
+    def choose(self, view, rng):
+        if view.rounds_left == 1:
+            self.solver.time_limit = view.time_limit * 0.8 if view.time_limit else None
+            move = self.solver(view, rng)
+            return REDEAL if move is None else move
+
+        if view.hash != self.expected:
+            board = view.copy()
+            result = plan(board, view.rounds_left, self.samples, workers=1, seed=rng.getrandbits(32),
+                          node_limit=self.node_limit, max_candidates=self.max_candidates,
+                          time_limit=view.time_limit * 0.8 if view.time_limit else None)
+            self.line = result.best.moves[::-1] if result.best else []
+            self.expected = board.hash
+        if not self.line:
+            return REDEAL
+        move = self.line.pop()
+        board = view.copy()
+        board.apply(move)
+        self.expected = board.hash
+        return move
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Work out where to end the first round of a deal")
+    parser.add_argument("--seed", type=int, default=0, help="deal seed (as in the game)")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="samples per candidate")
+    parser.add_argument("--time-limit", type=float, default=None, metavar="SECONDS")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--node-limit", type=int, default=NODE_LIMIT, help="positions searched this round")
+    parser.add_argument("--rollout", choices=sorted(POLICIES), default=ROLLOUT,
+                        help="policy for playing out the rounds after this one")
+    parser.add_argument("--dims", type=Dimensions.parse, default=STANDARD, metavar="SUITSxRANKS",
+                        help="size of the board (default %(default)s)")
+    args = parser.parse_args()
+
+    board = Board.deal(random.Random(args.seed), args.dims)
+    print(board)
+    result = plan(board, ROUNDS, args.samples, args.time_limit, args.workers, args.seed, args.node_limit,
+                  rollout_policy=args.rollout)
+    print(result)
+    if result.best:
+        print("\nSteer for:")
+        print(result.best.board)
+        print("by moving", describe(board, result.best.moves))
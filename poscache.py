@@ -0,0 +1,197 @@
+"""
+Cache of solver results, shared between runs (and processes).
+
+The rows of the layout are interchangeable (any 2 can start any row, and
+a new round deals the rows the same way), so a position is keyed with its rows
+in a canonical order: rows with longer ordered prefixes first, then by their
+cards. Positions that are the same apart from the order of the rows share a key,
+and the moves are stored for the canonical layout, then mapped back through the
+row order for whichever layout asked.
+
+The key also has the rounds left and the depth limit of the search, as both
+change the answer, and, for a board that isn't the standard 4x13, its size. Only complete searches are cached
+(one stopped by a node or time limit might have missed a better line). With the moves goes
+whether the search got as deep as its depth limit: if it didn't, it searched the whole round,
+which the hints need to know, to stop searching deeper.
+
+There are two tiers: an in-memory LRU with a cap on its entries, and an
+optional SQLite database, which survives restarts and can be used by several
+processes at once. `solve_cached` wraps `solver.solve` with a cache.
+"""
+
+import argparse
+import sqlite3
+import struct
+from collections import OrderedDict
+
+from metrics import METRICS
+from engine import STANDARD
+from solver import SearchStats, Solution, solve
+
+# Entries kept in memory
+MAX_ENTRIES = 100_000
+
+# Stands in for 'no depth limit' in a key
+NO_LIMIT = 0xFFFF
+
+KEY_PREFIX = struct.Struct("<BH") # rounds left, depth limit
+DIMS_PREFIX = struct.Struct("<BB") # suits, ranks (only in the keys of boards other than the standard one)
+
+
+def canonical(board):
+    """The board's cells with the rows in canonical order (as bytes),
+    and that order (a list of the original row index of each canonical row)"""
+    rows = [board.row(i).tobytes() for i in range(board.dims.suits)]
+    order = sorted(range(board.dims.suits), key=lambda i: (-board.split_index(i), rows[i]))
+    return b"".join(rows[i] for i in order), order
+
+
+def position_key(board, rounds_left=1, max_depth=None):
+    """Cache key for a search of `board`, and the row order it was made with"""
+    cells, order = canonical(board)
+    prefix = KEY_PREFIX.pack(rounds_left, NO_LIMIT if max_depth is None else max_depth)
+    if board.dims is not STANDARD:
+        # (standard boards keep the keys they always had, so existing caches still work)
+        prefix += DIMS_PREFIX.pack(board.dims.suits, board.dims.ranks)
+    return prefix + cells, order
+
+
+def to_canonical(moves, order, ranks=13):
+    """Map moves on the original layout to moves on the canonical one"""
+    row_of = {original: row for row, original in enumerate(order)}
+    return [tuple(row_of[slot // ranks] * ranks + slot % ranks for slot in move) for move in moves]
+
+
+def from_canonical(moves, order, ranks=13):
+    """Map moves on the canonical layout back to the original one"""
+    return [tuple(order[slot // ranks] * ranks + slot % ranks for slot in move) for move in moves]
+
+
+def encode(moves, ordered, at_limit):
+    return bytes([ordered, at_limit]) + bytes(slot for move in moves for slot in move)
+
+
+def decode(value):
+    """(moves, ordered, at_limit) from an entry.
+    Entries from before `at_limit` was stored are an odd number of bytes, with no flag,
+    so they're taken to have hit the limit (the safe guess: a hint will search deeper)."""
+    if len(value) % 2:
+        return [(value[i], value[i + 1]) for i in range(1, len(value), 2)], value[0], True
+    return [(value[i], value[i + 1]) for i in range(2, len(value), 2)], value[0], bool(value[1])
+
+
+class PositionCache:
+    """Solver results, by position key: an LRU in memory, in front of an optional SQLite file"""
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.memory = OrderedDict()
+        self.max_entries = max_entries
+        self.db = None
+        if path:
+            # (a timeout, as other processes might be writing)
+            self.db = sqlite3.connect(path, timeout=30)
+            # write-ahead logging lets readers carry on while another process writes
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS positions (key BLOB PRIMARY KEY, value BLOB NOT NULL)")
+            self.db.commit()
+
+        # Stats
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.memory)
+
+    def get(self, key):
+        """The (canonical moves, ordered, at_limit) stored for a key, or None"""
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            METRICS.count("cache_memory_hits")
+            return decode(value)
+
+        if self.db is not None:
+            row = self.db.execute("SELECT value FROM positions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.remember(key, row[0])
+                self.disk_hits += 1
+                METRICS.count("cache_disk_hits")
+                return decode(row[0])
+
+        self.misses += 1
+        METRICS.count("cache_misses")
+        return None
+
+    def put(self, key, moves, ordered, at_limit=False):
+        """Store canonical moves, the ordered count they reach,
+        and whether the search reached its depth limit"""
+        value = encode(moves, ordered, at_limit)
+        self.remember(key, value)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO positions VALUES (?, ?)", (key, value))
+            self.db.commit()
+
+    def remember(self, key, value):
+        """Keep an entry in memory, dropping the least recently used one if it's full"""
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+            METRICS.count("cache_evictions")
+
+    def hit_rate(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def disk_entries(self):
+        if self.db is None:
+            return 0
+        return self.db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def as_dict(self):
+        return {
+            "memory_entries": len(self.memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate(),
+        }
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def solve_cached(cache, position, rounds_left=1, max_depth=None, **limits):
+    """`solver.solve`, but looking in `cache` first, and caching the result if the search was complete"""
+    key, order = position_key(position, rounds_left, max_depth)
+    ranks = position.dims.ranks
+    found = cache.get(key)
+    if found is not None:
+        moves, ordered, at_limit = found
+        # (no search was done, but the stats say how deep the one that was went, as far as is known:
+        # to the limit, or at least as far as the line it found)
+        stats = SearchStats()
+        stats.max_depth = max_depth if at_limit else len(moves)
+        return Solution(from_canonical(moves, order, ranks), ordered, rounds_left, True, stats, position.dims)
+
+    solution = solve(position, rounds_left, max_depth, **limits)
+    if solution.complete:
+        at_limit = max_depth is not None and solution.stats.max_depth >= max_depth
+        cache.put(key, to_canonical(solution.moves, order, ranks), solution.ordered, at_limit)
+    return solution
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look at a solver cache")
+    parser.add_argument("cache")
+    args = parser.parse_args()
+    cache = PositionCache(args.cache)
+    print(f"{cache.disk_entries()} positions")
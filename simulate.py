@@ -0,0 +1,374 @@
+"""
+Monte Carlo simulation of whole games of Interference, with no display.
+
+`play_game` plays one game (the deal, then moves chosen by a policy,
+then a new round, as in `GameView.new_round`, whenever the layout is stuck,
+up to ROUNDS rounds). `simulate` plays many games, split into shards
+that run in a pool of worker processes, and adds up the results.
+`stream_games` plays them the same way, but hands back every game's result,
+in order, as soon as its shard is done, only ever holding a few shards' worth,
+so a run of millions of games can be written out as it goes
+(`python interference.py simulate` writes them as JSON lines).
+
+Every game gets its own seed, worked out from the master seed and the game's
+number, so a run gives the same results whatever the number of workers.
+
+Games can be played on other sizes of board (`dims`, see `engine.Dimensions`),
+e.g. `python simulate.py --dims 4x6`, and with any number of rounds.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter, deque
+
+from deadlock import is_dead
+from engine import ROUNDS, STANDARD, Board, Dimensions
+from solver import solve
+
+# A player can start a new round at any time, so a policy that's going round in circles
+# (which a random one can do) moves on to the next round after this many moves
+MAX_MOVES_PER_ROUND = 1000
+
+# Games are shared out between workers in shards of this size.
+# It doesn't depend on the number of workers, so neither do the results.
+SHARD_SIZE = 1000
+
+# With `stop_when_dead`, check whether the round is dead every this many moves, once there's
+# only one space left to play in (the check costs as much as a couple of dozen moves,
+# and a round with more spaces to play in is seldom dead)
+DEAD_CHECK_EVERY = 8
+
+# Streamed games come back in smaller shards, so they come out steadily,
+# with at most this many shards per worker being played (or waiting to be written out) at once
+STREAM_SHARD_SIZE = 100
+SHARDS_PER_WORKER = 2
+
+# Positions the solver policy searches for each plan (a round's first search is never complete,
+# so this trades strength for speed), and the size of its transposition table
+SOLVER_NODE_LIMIT = 20_000
+SOLVER_MEMORY_MB = 4
+
+
+def game_seed(master_seed, game):
+    """Seed for game number `game` of a run"""
+    # seeding with a string hashes it (with SHA-512), so nearby games get unrelated seeds
+    return random.Random(f"{master_seed}/{game}").getrandbits(64)
+
+
+# Policies choose a move (from `board.legal_moves()`) given the board,
+# or return None to give up on the round.
+
+def random_policy(board, rng):
+    """Any legal move"""
+    moves = board.legal_moves()
+    return rng.choice(moves) if moves else None
+
+
+def greedy_policy(board, rng):
+    """A legal move that adds to the ordered cards if there is one,
+    otherwise one that doesn't take a card out of them"""
+    moves = board.legal_moves()
+    if not moves:
+        return None
+    ranks = board.dims.ranks
+    splits = [board.split_index(i) for i in range(board.dims.suits)]
+
+    def score(move):
+        from_slot, to_slot = move
+        extends = to_slot % ranks == splits[to_slot // ranks]
+        breaks = from_slot % ranks < splits[from_slot // ranks]
+        # (moving a 2 from the start of one row to another does both)
+        return extends - breaks
+
+    best = max(score(move) for move in moves)
+    return rng.choice([move for move in moves if score(move) == best])
+
+
+class SolverPolicy:
+    """Plays the solver's line for the round: the line that orders the most cards it can find
+    in `node_limit` positions (or `time_limit` seconds). The line is worked out once, then played
+    a move at a time, and only searched for again if the board isn't where the plan expects
+    (e.g. a new round or game). The board is only looked at, never changed."""
+
+    def __init__(self, node_limit=SOLVER_NODE_LIMIT, memory_mb=SOLVER_MEMORY_MB, time_limit=None):
+        self.node_limit = node_limit
+        self.memory_mb = memory_mb
+        self.time_limit = time_limit
+        self.plan = [] # (move, the board's hash when it's due), next move last
+
+    def __call__(self, board, rng):
+        if not self.plan or self.plan[-1][1] != board.hash:
+            self.make_plan(board)
+        if not self.plan:
+            # nothing orders any more cards, so on to the next round
+            return None
+        return self.plan.pop()[0]
+
+    def make_plan(self, board):
+        moves = solve(board, node_limit=self.node_limit, time_limit=self.time_limit, memory_mb=self.memory_mb).moves
+        # play the line through on a copy, to know where the board should be for each move
+        after = board.copy()
+        self.plan = []
+        for move in moves:
+            self.plan.append((move, after.hash))
+            after.apply(move)
+        self.plan.reverse()
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "solver": SolverPolicy(),
+}
+
+
+def make_policy(name):
+    """The named policy, for a game played alongside others in the same process:
+    the solver's plan is for one board, so each game needs a `SolverPolicy` of its own
+    (games that took turns with the one in POLICIES would each throw the other's plan away)"""
+    policy = POLICIES[name]
+    return SolverPolicy() if isinstance(policy, SolverPolicy) else policy
+
+
+class GameResult:
+    """What happened in one game"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.game = None # its number in a run, if it's part of one
+        self.won = False
+        self.ordered = [] # ordered cards at the end of each round played
+        self.moves = [] # moves made in each round played
+        self.seconds = 0.0
+
+    @property
+    def rounds(self):
+        return len(self.ordered)
+
+    def as_dict(self):
+        return {
+            "game": self.game,
+            "seed": self.seed,
+            "rounds": self.rounds,
+            "ordered": self.ordered,
+            "moves": self.moves,
+            "won": self.won,
+            "seconds": self.seconds,
+        }
+
+
+def play_game(seed, policy, rounds=ROUNDS, max_moves=MAX_MOVES_PER_ROUND, log=None, stop_when_dead=False,
+              positions=None, dims=STANDARD):
+    """Play a game from the deal given by `seed`, choosing moves with `policy`, on a board of size `dims`.
+    If `log` is a `movelog.MoveLog`, the game is written to it.
+    If `positions` is a `dataset.PositionBuffer`, each position is added to it before its move is made
+    (the caller finishes the game off with `positions.end_game(result)`).
+    If `stop_when_dead`, a round ends as soon as no more cards can be ordered in it (see deadlock.py),
+    rather than when the policy gives up or runs out of moves."""
+    result = GameResult(seed)
+    began = time.perf_counter()
+    if log:
+        log.start_game(seed)
+
+    # The deal and the new rounds use one random number generator,
+    # and the policy another, so the cards come out the same whatever the policy does
+    deal_rng = random.Random(seed)
+    policy_rng = random.Random(f"{seed}/policy")
+    board = Board.deal(deal_rng, dims)
+
+    for round in range(1, rounds + 1):
+        if round > 1:
+            board.redeal(deal_rng)
+            if log:
+                log.redeal()
+
+        moves = 0
+        while moves < max_moves and not board.is_stuck():
+            if stop_when_dead and board.live_total == 1 and moves % DEAD_CHECK_EVERY == 0 and is_dead(board):
+                break
+            move = policy(board, policy_rng)
+            if move is None:
+                break
+            if positions is not None:
+                positions.add(board, round, move)
+            board.apply(move)
+            if log:
+                log.move(*move)
+            moves += 1
+
+        result.ordered.append(board.ordered_count())
+        result.moves.append(moves)
+        if board.is_ordered():
+            result.won = True
+            break
+
+    result.seconds = time.perf_counter() - began
+    return result
+
+
+class SimulationStats:
+    """Totals over many games. Stats from different shards can be merged, in any order."""
+
+    def __init__(self, rounds=ROUNDS):
+        self.games = 0
+        self.wins = 0
+        self.seconds = 0.0 # time spent playing, added up over the workers
+        self.rounds_used = Counter() # number of rounds played -> number of games
+        self.ordered = [Counter() for _ in range(rounds)] # per round: ordered cards at the end -> number of games
+        self.moves = [0] * rounds # per round: total moves
+
+    def add(self, result):
+        self.games += 1
+        self.wins += result.won
+        self.rounds_used[result.rounds] += 1
+        for round, (ordered, moves) in enumerate(zip(result.ordered, result.moves)):
+            self.ordered[round][ordered] += 1
+            self.moves[round] += moves
+
+    def merge(self, other):
+        self.games += other.games
+        self.wins += other.wins
+        self.seconds += other.seconds
+        self.rounds_used += other.rounds_used
+        for round in range(len(self.ordered)):
+            self.ordered[round] += other.ordered[round]
+            self.moves[round] += other.moves[round]
+
+    @property
+    def win_rate(self):
+        return self.wins / self.games if self.games else 0.0
+
+    def mean_moves(self, round):
+        """Mean number of moves in a round (index from 0), over the games that got that far"""
+        played = sum(self.ordered[round].values())
+        return self.moves[round] / played if played else 0.0
+
+    def mean_ordered(self, round):
+        played = sum(self.ordered[round].values())
+        return sum(n * count for n, count in self.ordered[round].items()) / played if played else 0.0
+
+    def as_dict(self):
+        return {
+            "games": self.games,
+            "wins": self.wins,
+            "win_rate": self.win_rate,
+            "rounds_used": dict(sorted(self.rounds_used.items())),
+            "ordered": [dict(sorted(counts.items())) for counts in self.ordered],
+            "mean_ordered": [self.mean_ordered(round) for round in range(len(self.ordered))],
+            "mean_moves": [self.mean_moves(round) for round in range(len(self.ordered))],
+            "games_per_sec": self.games / self.seconds if self.seconds else 0.0,
+        }
+
+    def __str__(self):
+        out = f"{self.games} games, {self.wins} won ({self.win_rate:.2%})\n"
+        for round in range(len(self.ordered)):
+            out += (f"Round {round + 1}: {sum(self.ordered[round].values())} games, "
+                    f"mean ordered {self.mean_ordered(round):.1f}, mean moves {self.mean_moves(round):.1f}\n")
+        return out
+
+
+def run_shard(args):
+    """Play games `start` to `stop` of a run (in a worker process)"""
+    master_seed, start, stop, policy_name, rounds, stop_when_dead, dims = args
+    policy = POLICIES[policy_name]
+    stats = SimulationStats(rounds)
+    began = time.perf_counter()
+    for game in range(start, stop):
+        stats.add(play_game(game_seed(master_seed, game), policy, rounds, stop_when_dead=stop_when_dead, dims=dims))
+    stats.seconds = time.perf_counter() - began
+    return stats
+
+
+def play_shard(args):
+    """Play games `start` to `stop` of a run (in a worker process), returning every game's result"""
+    master_seed, start, stop, policy_name, rounds, stop_when_dead, dims = args
+    policy = POLICIES[policy_name]
+    results = []
+    for game in range(start, stop):
+        result = play_game(game_seed(master_seed, game), policy, rounds, stop_when_dead=stop_when_dead, dims=dims)
+        result.game = game
+        results.append(result)
+    return results
+
+
+def stream_games(games, policy="random", seed=0, workers=None, rounds=ROUNDS, shard_size=STREAM_SHARD_SIZE,
+                 stop_when_dead=False, dims=STANDARD):
+    """Play `games` games with the named policy, yielding each game's `GameResult`, in order.
+    The games are the same as `simulate`'s for the same seed. Only a few shards per worker
+    are handed out at a time, so however many games there are, only those are held in memory."""
+    shards = ((seed, start, min(start + shard_size, games), policy, rounds, stop_when_dead, dims)
+              for start in range(0, games, shard_size))
+
+    if workers == 1:
+        for shard in shards:
+            yield from play_shard(shard)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        # (Pool.imap would read the whole of `shards` straight away, and keep every result
+        # that's ready until it's asked for, so the shards are handed out a few at a time instead)
+        in_flight = deque()
+        max_in_flight = SHARDS_PER_WORKER * (workers or multiprocessing.cpu_count())
+        for shard in shards:
+            in_flight.append(pool.apply_async(play_shard, (shard,)))
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().get()
+        while in_flight:
+            yield from in_flight.popleft().get()
+
+
+def write_jsonl(results, file=sys.stdout, rounds=ROUNDS):
+    """Write each game's result as a line of JSON as it comes, returning the `SimulationStats` for them all"""
+    stats = SimulationStats(rounds)
+    for result in results:
+        file.write(json.dumps(result.as_dict()) + "\n")
+        stats.add(result)
+        stats.seconds += result.seconds
+    file.flush()
+    return stats
+
+
+def simulate(games, policy="random", seed=0, workers=None, rounds=ROUNDS, shard_size=SHARD_SIZE, stop_when_dead=False,
+             dims=STANDARD):
+    """Play `games` games with the named policy and return the `SimulationStats`.
+    `workers` is the number of processes (default: one per CPU core)."""
+    shards = [(seed, start, min(start + shard_size, games), policy, rounds, stop_when_dead, dims)
+              for start in range(0, games, shard_size)]
+
+    stats = SimulationStats(rounds)
+    if workers == 1:
+        for shard in shards:
+            stats.merge(run_shard(shard))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for shard_stats in pool.imap_unordered(run_shard, shards):
+                stats.merge(shard_stats)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate games of Interference")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--dims", type=Dimensions.parse, default=STANDARD, metavar="SUITSxRANKS",
+                        help="size of the board (default %(default)s)")
+    parser.add_argument("--stop-dead", action="store_true",
+                        help="end a round as soon as no more cards can be ordered in it")
+    parser.add_argument("--json", action="store_true", help="print the stats as JSON")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    stats = simulate(args.games, args.policy, args.seed, args.workers, args.rounds, stop_when_dead=args.stop_dead,
+                     dims=args.dims)
+    if args.json:
+        print(json.dumps(stats.as_dict()))
+    else:
+        print(stats, end="")
+        print(f"{time.perf_counter() - began:.1f}s")
@@ -0,0 +1,273 @@
+"""
+Solver for a round of Interference.
+
+`solve` does an exhaustive depth-first search of every position reachable in the
+current round, looking for the line of play that orders the most cards
+(the total of `Board.split_index` over the rows), and stops early if it finds
+a line that orders as many as `deadlock.ordered_bound` says could be ordered
+(the whole board, unless some cards can be shown never to move, e.g. in a dead
+position, which isn't searched at all).
+
+Different orders of moves often lead to the same position, so positions are
+remembered in a transposition table, keyed by the board's Zobrist hash,
+and only searched once. The table has a fixed memory cap: when two positions
+hash to the same bucket, the newer one replaces the older one,
+which then might be searched again, but the search is still exhaustive.
+"""
+
+import sys
+import time
+from array import array
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+from deadlock import ordered_bound
+from engine import STANDARD, Board, Dimensions
+
+# The total split_index when every row is ordered (2 to K), in the standard game
+# (for another size of board, it's `board.dims.all_ordered`)
+ALL_ORDERED = STANDARD.all_ordered
+
+# Stands in for 'no depth limit' in the transposition table
+UNLIMITED = 32767
+
+
+class TranspositionTable:
+    """Fixed-size hash table of positions already searched, keyed by Zobrist hash
+
+    Each entry is a hash (8 bytes) and the depth it was searched to (2 bytes),
+    so a table with a cap of `max_bytes` has at most `max_bytes // 10` entries
+    (rounded down to a power of two, so a bucket is just the low bits of the hash).
+    """
+
+    ENTRY_BYTES = 10
+
+    def __init__(self, max_bytes=64 * 2**20):
+        size = 1
+        while size * 2 * self.ENTRY_BYTES <= max_bytes:
+            size *= 2
+        self.mask = size - 1
+        self.keys = array("Q", [0]) * size
+        self.depths = array("h", [0]) * size
+
+        # Stats
+        self.probes = 0
+        self.hits = 0
+        self.filled = 0
+        self.replacements = 0
+
+    def __len__(self):
+        return self.mask + 1
+
+    @property
+    def nbytes(self):
+        return len(self) * self.ENTRY_BYTES
+
+    def seen(self, key, depth):
+        """Has this position already been searched at least `depth` moves deep?"""
+        self.probes += 1
+        i = key & self.mask
+        if self.keys[i] == key and self.depths[i] >= depth:
+            self.hits += 1
+            return True
+        return False
+
+    def store(self, key, depth):
+        """Record that a position is being searched `depth` moves deep,
+        replacing whatever was in its bucket"""
+        i = key & self.mask
+        old_key = self.keys[i]
+        if old_key == 0:
+            self.filled += 1
+        elif old_key != key:
+            self.replacements += 1
+        self.keys[i] = key
+        self.depths[i] = depth
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+class SearchStats:
+    """How much work a search did"""
+
+    def __init__(self):
+        self.nodes = 0
+        self.seconds = 0.0
+        self.max_depth = 0
+        self.hit_rate = 0.0
+        self.table_entries = 0
+        self.table_replacements = 0
+        self.table_bytes = 0
+        self.peak_rss_bytes = 0
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "seconds": self.seconds,
+            "nodes_per_sec": self.nodes_per_sec,
+            "max_depth": self.max_depth,
+            "hit_rate": self.hit_rate,
+            "table_entries": self.table_entries,
+            "table_replacements": self.table_replacements,
+            "table_bytes": self.table_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+    def __str__(self):
+        return (f"{self.nodes} nodes in {self.seconds:.2f}s ({self.nodes_per_sec:,.0f} nodes/sec), "
+                f"max depth {self.max_depth}, table hit rate {self.hit_rate:.1%}, "
+                f"table {self.table_entries} entries ({self.table_bytes / 2**20:.1f} MB), "
+                f"peak memory {self.peak_rss_bytes / 2**20:.1f} MB")
+
+
+class Solution:
+    """The result of `solve`
+
+    `moves` is the line of play (a list of (from_slot, to_slot) moves) that reaches
+    the position with the most ordered cards, and `ordered` is how many that is.
+    If `won` is False and there are rounds left after this one,
+    the plan is to play `moves` and then start a new round (`redeal` is True).
+    `complete` is False if the search was stopped by a limit before it finished,
+    in which case `moves` is the best line found so far.
+    """
+
+    def __init__(self, moves, ordered, rounds_left, complete, stats, dims=STANDARD):
+        self.moves = moves
+        self.ordered = ordered
+        self.won = ordered == dims.all_ordered
+        self.redeal = not self.won and rounds_left > 1
+        self.complete = complete
+        self.stats = stats
+
+    def __str__(self):
+        if self.won:
+            outcome = "win"
+        elif self.redeal:
+            outcome = "then new round"
+        else:
+            outcome = "game over"
+        return f"{len(self.moves)} moves to {self.ordered} ordered cards ({outcome})"
+
+
+def peak_rss_bytes():
+    """Peak memory use of this process so far (0 if it can't be measured)"""
+    if resource is None:
+        return 0
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def ordered_moves(board):
+    """Legal moves, with the most promising last (as the search pops moves off the end)"""
+    moves = board.legal_moves()
+    # moves that extend the ordered run at the start of a row
+    ranks = board.dims.ranks
+    moves.sort(key=lambda move: move[1] % ranks == board.split_index(move[1] // ranks))
+    return moves
+
+
+def solve(position, rounds_left=1, max_depth=None, node_limit=None, time_limit=None,
+          memory_mb=64, should_stop=None):
+    """Search the current round from `position` (a `Board`) for the line of play
+    that orders the most cards. Returns a `Solution`.
+
+    `rounds_left` counts the current round, so is 1 in the last round.
+    `max_depth` limits the number of moves in a line,
+    and `node_limit`, `time_limit` (in seconds) and `should_stop` (a function
+    that returns True when the search should give up) bound the work done.
+    `memory_mb` caps the size of the transposition table.
+    """
+    board = position.copy() # so the caller's board is left alone
+    table = TranspositionTable(memory_mb * 2**20)
+    stats = SearchStats()
+    depth_limit = UNLIMITED if max_depth is None else max_depth
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+
+    best_moves = []
+    best_ordered = board.ordered_count()
+    # no line can order more than this (see deadlock.py), so the search can stop if it gets there
+    bound = ordered_bound(board)
+
+    # Depth-first search with an explicit stack (lines can be longer than Python's recursion limit),
+    # making and unmaking moves on the one board, rather than copying it.
+    # `stack` holds the moves still to try at each depth, and `path` the moves made to get here.
+    # Positions on the current path are never revisited, even if evicted from the table,
+    # which stops the search going round in circles.
+    path = []
+    on_path = {board.hash}
+    table.store(board.hash, depth_limit)
+    stack = [ordered_moves(board)] if best_ordered < bound and depth_limit > 0 else []
+    complete = True
+
+    while stack and complete:
+        moves = stack[-1]
+
+        # no moves left here, so back up a level
+        if not moves:
+            stack.pop()
+            if path:
+                on_path.discard(board.hash)
+                board.unapply(path.pop())
+            continue
+
+        move = moves.pop()
+        board.apply(move)
+        depth = len(path) + 1
+        # with no depth limit, a position only ever needs searching once
+        remaining = UNLIMITED if max_depth is None else depth_limit - depth
+        if board.hash in on_path or table.seen(board.hash, remaining):
+            board.unapply(move)
+            continue
+
+        table.store(board.hash, remaining)
+        on_path.add(board.hash)
+        path.append(move)
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, depth)
+
+        ordered = board.ordered_count()
+        if ordered > best_ordered:
+            best_ordered = ordered
+            best_moves = path[:]
+            if ordered == bound:
+                break
+
+        # (The bound isn't checked at every position, to cut off lines that can't beat the best so far:
+        # it costs a few positions' worth of time, and hardly ever cuts anything off,
+        # as a position with a space or two to play in is seldom dead.)
+        stack.append(ordered_moves(board) if remaining > 0 else [])
+
+        # check the limits every so often
+        if stats.nodes & 255 == 0:
+            if ((node_limit is not None and stats.nodes >= node_limit)
+                    or (deadline is not None and time.perf_counter() >= deadline)
+                    or (should_stop is not None and should_stop())):
+                complete = False
+
+    stats.seconds = time.perf_counter() - start
+    stats.hit_rate = table.hit_rate()
+    stats.table_entries = table.filled
+    stats.table_replacements = table.replacements
+    stats.table_bytes = table.nbytes
+    stats.peak_rss_bytes = peak_rss_bytes()
+
+    return Solution(best_moves, best_ordered, rounds_left, complete, stats, board.dims)
+
+
+if __name__ == "__main__":
+    # Solve a random deal, e.g. `python solver.py`, or `python solver.py 4x6` for a smaller board
+    dims = Dimensions.parse(sys.argv[1]) if len(sys.argv) > 1 else STANDARD
+    board = Board.deal(dims=dims)
+    print(board)
+    solution = solve(board, time_limit=30)
+    print(solution)
+    print(solution.stats)
@@ -0,0 +1,339 @@
+"""
+A window of many games at once, each played by a bot, for demos and soak tests.
+
+    python interference.py watch --grid 8x8 --policy greedy --plies-per-second 10
+
+The window is tiled with tables (e.g. an 8x8 grid). Each table is a `Table`:
+a headless `Board` played by one of the policies in simulate.py, a ply at a time
+(a move, or the end of a round), so the games are the same as
+`simulate.play_game(..., stop_when_dead=True)`'s for the same seeds.
+`SpectatorView.on_update` plays each table on at the given rate, and starts
+the next game on a table a moment after its last one finishes.
+
+It's drawn quite differently from `GameView`, so it can keep up with dozens of tables:
+there's no sprite per card per view, no Rows and no `Deck` (which is shared by one game).
+All the cards of all the tables are sprites in one SpriteList, the felt of the
+finished tables is another, and the text for all the tables is in one pyglet batch,
+so a frame is a handful of draw calls however many tables there are.
+The card textures are the same ones `GameView` uses (`game.card_textures`),
+loaded once, and every SpriteList packs them into arcade's default texture atlas,
+so all the tables share one copy of each card image on the GPU.
+A move just changes the position of one sprite, and a table's text is only
+laid out again when its game or round changes.
+
+The line at the top of the window has the frame rate, and the frame time
+(mean and worst over the last second or so), split into drawing and updating.
+"""
+
+import random
+import time
+from collections import deque
+
+import arcade
+import pyglet
+
+from deadlock import is_dead
+from engine import BLANK, CARD_SUITS, CARD_VALUES, ROUNDS, Board, card_code
+from game import UPDATE_RATE, Layout, card_textures
+from simulate import DEAD_CHECK_EVERY, MAX_MOVES_PER_ROUND, game_seed, make_policy
+
+SCREEN_WIDTH = 1600
+SCREEN_HEIGHT = 900
+SCREEN_TITLE = "Interference (spectating)"
+
+# Room at the top of the window for the frame time readout
+HEADER_HEIGHT = 28
+HEADER_FONT_SIZE = 12
+
+# Plies each table plays a second, by default
+PLIES_PER_SECOND = 10
+
+# How long a finished game stays on its table before the next one starts (in seconds)
+FINISHED_PAUSE = 2.0
+
+# Time on_update can spend playing moves in a frame (in seconds).
+# The time is checked before each table's ply, so a frame goes over by at most one ply,
+# and a slow policy (e.g. the solver) falls behind the ply rate rather than holding up frames,
+# catching up by at most MAX_BACKLOG plies per table.
+UPDATE_BUDGET = 0.008
+MAX_BACKLOG = 10
+
+# Frames the readout is worked out over, and how often it's updated (in seconds)
+READOUT_FRAMES = 120
+READOUT_EVERY = 0.5
+
+# Felt colours for a game being played, won and lost
+PLAYING_COLOR = arcade.color.AMAZON
+WON_COLOR = arcade.color.DARK_GOLDENROD
+LOST_COLOR = arcade.color.WINE
+
+
+class Table:
+    """One game played by a bot, with no display, a ply at a time
+
+    It plays just as `simulate.play_game` (with `stop_when_dead`) does,
+    but a step at a time, so `step` can be called from a frame update.
+    """
+
+    def __init__(self, policy, rounds=ROUNDS, max_moves=MAX_MOVES_PER_ROUND):
+        self.policy = policy
+        self.rounds = rounds
+        self.max_moves = max_moves
+        self.game = None
+        self.seed = None
+        self.board = None
+        self.round = None
+        self.moves = None # moves made this round
+        self.over = False
+        self.won = False
+        self.ordered = None # ordered cards at the end of each round played
+        self.rest = 0.0 # time left to show the finished game
+
+    def start(self, game, seed):
+        """Start game number `game`, dealt from `seed`"""
+        self.game = game
+        self.seed = seed
+        self.deal_rng = random.Random(seed)
+        self.policy_rng = random.Random(f"{seed}/policy")
+        self.board = Board.deal(self.deal_rng)
+        self.round = 1
+        self.moves = 0
+        self.over = False
+        self.won = False
+        self.ordered = []
+
+    def step(self):
+        """Play a ply: make a move and return it, or, if the round's over, start the next one
+        (or finish the game), returning None"""
+        board = self.board
+        if self.moves < self.max_moves and not board.is_stuck():
+            dead = board.live_total == 1 and self.moves % DEAD_CHECK_EVERY == 0 and is_dead(board)
+            move = None if dead else self.policy(board, self.policy_rng)
+            if move is not None:
+                board.apply(move)
+                self.moves += 1
+                return move
+
+        self.ordered.append(board.ordered_count())
+        if board.is_ordered() or self.round == self.rounds:
+            self.won = board.is_ordered()
+            self.over = True
+            self.rest = FINISHED_PAUSE
+        else:
+            board.redeal(self.deal_rng)
+            self.round += 1
+            self.moves = 0
+        return None
+
+    def status(self):
+        if not self.over:
+            return f"Game {self.game}, round {self.round} of {self.rounds}"
+        if self.won:
+            return f"Game {self.game}: won in {len(self.ordered)} rounds"
+        return f"Game {self.game}: {self.ordered[-1]} ordered"
+
+
+class SpectatorView(arcade.View):
+    """Tables of bot games tiled over the window (see the top of the file)"""
+
+    def __init__(self, columns=8, rows=8, policy="greedy", plies_per_second=PLIES_PER_SECOND, seed=0,
+                 rounds=ROUNDS):
+        super().__init__()
+        self.columns = columns
+        self.rows = rows
+        self.plies_per_second = plies_per_second
+        self.seed = seed
+        self.due = 0.0 # plies owed to every table, for the time that's passed
+        self.owed = 0 # table plies still to play, going round the tables from `cursor`
+        self.cursor = 0
+
+        # the tables, and the number of the next game to start on one
+        # (each with its own policy, as the solver's keeps a plan for its board)
+        self.tables = [Table(make_policy(policy), rounds) for _ in range(columns * rows)]
+        self.next_game = 0
+        self.games = 0
+        self.wins = 0
+        self.plies = 0
+
+        # the sprite for each card on each table (by card code, None for the Aces)
+        textures = card_textures()
+        texture_of = {card_code(suit, value): textures[suit, value]
+                      for suit in CARD_SUITS for value in CARD_VALUES[2:]}
+        self.cards = arcade.SpriteList(capacity=48 * len(self.tables))
+        self.sprites = []
+        for _ in self.tables:
+            sprites = [None] * 52
+            for code, texture in texture_of.items():
+                sprites[code] = arcade.Sprite(texture=texture, hit_box_algorithm="None")
+                self.cards.append(sprites[code])
+            self.sprites.append(sprites)
+
+        # The felt behind a finished game, coloured by how it went, and each table's text.
+        # (The window is cleared to the colour of a game being played, so those tables
+        # don't need drawing twice: filling the screen is what costs, on a small GPU.)
+        self.felts = [arcade.SpriteSolidColor(8, 8, arcade.color.WHITE) for _ in self.tables]
+        self.felt = arcade.SpriteList(capacity=len(self.tables))
+        self.text = pyglet.graphics.Batch()
+        self.labels = [pyglet.text.Label("", batch=self.text, anchor_y="center") for _ in self.tables]
+        self.header = arcade.Text("", 8, 0, arcade.color.WHITE, font_size=HEADER_FONT_SIZE, anchor_y="center")
+
+        # for the frame time readout: when each frame started, and the time spent drawing and updating
+        self.frame_starts = deque(maxlen=READOUT_FRAMES)
+        self.draw_times = deque(maxlen=READOUT_FRAMES)
+        self.update_times = deque(maxlen=READOUT_FRAMES)
+        self.last_readout = 0.0
+        self.plies_at_readout = 0
+
+        self.layout = None
+        self.origins = None
+        for i in range(len(self.tables)):
+            self.start_game(i)
+        self.on_resize(self.window.width, self.window.height)
+
+    def start_game(self, i):
+        table = self.tables[i]
+        table.start(self.next_game, game_seed(self.seed, self.next_game))
+        self.next_game += 1
+        if self.layout:
+            self.show_table(i)
+
+    def on_show_view(self):
+        arcade.set_background_color(PLAYING_COLOR)
+
+    def on_resize(self, width, height):
+        """Tile the window with the tables, and fit the cards to the tiles"""
+        tile_width = width / self.columns
+        tile_height = (height - HEADER_HEIGHT) / self.rows
+        # every table is laid out the same, just in a different place
+        self.layout = Layout(tile_width, tile_height)
+        # bottom left corner of each table's tile (table 0 at the top left)
+        self.origins = [((i % self.columns) * tile_width, (self.rows - 1 - i // self.columns) * tile_height)
+                        for i in range(len(self.tables))]
+
+        font_size = max(6, round(self.layout.bottom * 0.45))
+        for i, (x, y) in enumerate(self.origins):
+            felt = self.felts[i]
+            felt.width = tile_width - 2
+            felt.height = tile_height - 2
+            felt.position = x + tile_width / 2, y + tile_height / 2
+            label = self.labels[i]
+            label.font_size = font_size
+            label.x = x + self.layout.left
+            # (in the margin above the cards)
+            label.y = y + tile_height - self.layout.bottom / 2
+            for sprite in self.sprites[i]:
+                if sprite:
+                    sprite.scale = self.layout.card_scale
+            self.show_table(i)
+
+        self.header.x = 8
+        self.header.y = height - HEADER_HEIGHT / 2
+
+    def position(self, i, slot):
+        """Centre of the card in a slot of table i"""
+        x, y = self.layout.position(slot)
+        origin_x, origin_y = self.origins[i]
+        return origin_x + x, origin_y + y
+
+    def show_table(self, i):
+        """Put all of table i's cards where they are on its board, and update its text and felt"""
+        table = self.tables[i]
+        sprites = self.sprites[i]
+        for slot, code in enumerate(table.board.cells):
+            if code != BLANK:
+                sprites[code].position = self.position(i, slot)
+        self.labels[i].text = table.status()
+        felt = self.felts[i]
+        if table.over:
+            felt.color = WON_COLOR if table.won else LOST_COLOR
+            if not felt.sprite_lists:
+                self.felt.append(felt)
+        elif felt.sprite_lists:
+            self.felt.remove(felt)
+
+    def on_update(self, delta_time):
+        began = time.perf_counter()
+        self.due = min(self.due + delta_time * self.plies_per_second, MAX_BACKLOG)
+        plies = int(self.due)
+        self.due -= plies
+        count = len(self.tables)
+        self.owed = min(self.owed + plies * count, MAX_BACKLOG * count)
+
+        for i, table in enumerate(self.tables):
+            if table.over:
+                table.rest -= delta_time
+                if table.rest <= 0:
+                    self.start_game(i)
+
+        # a ply at a time, round the tables, until they're all caught up or the frame's out of time
+        # (in which case the rest are carried over, and the next frame carries on from the next table,
+        # so it isn't always the same tables that wait)
+        stepped = False
+        while self.owed:
+            if stepped and time.perf_counter() - began > UPDATE_BUDGET:
+                break
+            self.owed -= 1
+            i = self.cursor
+            self.cursor = (i + 1) % count
+            table = self.tables[i]
+            if table.over:
+                continue
+            stepped = True
+            move = table.step()
+            self.plies += 1
+            if move:
+                from_slot, to_slot = move
+                self.sprites[i][table.board.cells[to_slot]].position = self.position(i, to_slot)
+            else:
+                if table.over:
+                    self.games += 1
+                    self.wins += table.won
+                self.show_table(i)
+
+        self.update_times.append(time.perf_counter() - began)
+
+    def on_draw(self):
+        began = time.perf_counter()
+        self.frame_starts.append(began)
+        self.clear()
+        # (once a frame, for all the tables, as in `GameView.on_draw`)
+        arcade.set_viewport(0, self.window.width, 0, self.window.height)
+        self.felt.draw()
+        self.cards.draw()
+        with self.window.ctx.pyglet_rendering():
+            self.text.draw()
+        if began - self.last_readout > READOUT_EVERY:
+            self.update_readout(began)
+        self.header.draw()
+        self.draw_times.append(time.perf_counter() - began)
+
+    def update_readout(self, now):
+        """Lay out the header text again, with the latest frame times"""
+        seconds = now - self.last_readout
+        plies_per_second = (self.plies - self.plies_at_readout) / seconds if self.last_readout else 0.0
+        self.last_readout = now
+        self.plies_at_readout = self.plies
+
+        frames = len(self.frame_starts) - 1
+        if frames > 0:
+            intervals = [b - a for a, b in zip(self.frame_starts, list(self.frame_starts)[1:])]
+            fps = frames / (self.frame_starts[-1] - self.frame_starts[0])
+            frame_ms = 1000 * sum(intervals) / frames
+            worst_ms = 1000 * max(intervals)
+        else:
+            fps = frame_ms = worst_ms = 0.0
+        draw_ms = 1000 * sum(self.draw_times) / len(self.draw_times) if self.draw_times else 0.0
+        update_ms = 1000 * sum(self.update_times) / len(self.update_times) if self.update_times else 0.0
+        win_rate = self.wins / self.games if self.games else 0.0
+        self.header.text = (f"{len(self.tables)} tables, {self.games} games finished, {self.wins} won ({win_rate:.1%}), "
+                            f"{plies_per_second:,.0f} plies/sec  |  {fps:.0f} fps, frame {frame_ms:.1f} ms "
+                            f"(worst {worst_ms:.1f}), draw {draw_ms:.2f} ms, update {update_ms:.2f} ms")
+
+
+def watch(columns=8, rows=8, policy="greedy", plies_per_second=PLIES_PER_SECOND, seed=0, rounds=ROUNDS):
+    """Open a window of `columns` x `rows` tables of bot games, and watch (until the window is closed)"""
+    # (no antialiasing: the cards are drawn small, and multisampling them costs a lot of fill)
+    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, resizable=True, update_rate=UPDATE_RATE,
+                           antialiasing=False)
+    window.show_view(SpectatorView(columns, rows, policy, plies_per_second, seed, rounds))
+    arcade.run()
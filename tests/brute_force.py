@@ -0,0 +1,58 @@
+"""Brute-force searches of a round, to check the solver and the deadlock bound against, on small boards"""
+
+import random
+
+from engine import Board
+
+# Positions visited before giving up on a search (the small boards' rounds are mostly much smaller than this)
+LIMIT = 20_000
+
+
+def most_ordered(board, limit=LIMIT):
+    """The most ordered cards any line of play reaches this round, by visiting every position
+    (or None, if there are more than `limit` positions)"""
+    board = board.copy()
+    seen = {board.cells.tobytes()}
+    best = board.ordered_count()
+    stack = [iter(board.legal_moves())]
+    path = []
+    while stack:
+        move = next(stack[-1], None)
+        if move is None:
+            stack.pop()
+            if path:
+                board.unapply(path.pop())
+            continue
+        board.apply(move)
+        cells = board.cells.tobytes()
+        if cells in seen:
+            board.unapply(move)
+            continue
+        if len(seen) >= limit:
+            return None
+        seen.add(cells)
+        best = max(best, board.ordered_count())
+        path.append(move)
+        stack.append(iter(board.legal_moves()))
+    return best
+
+
+def positions(dims, count=30):
+    """Some positions on a board of this size: deals, then a few random moves and new rounds"""
+    rng = random.Random(str(dims))
+    for _ in range(count):
+        board = Board.deal(rng, dims)
+        for _ in range(rng.randrange(40)):
+            if board.is_stuck():
+                board.redeal(rng)
+            else:
+                board.apply(rng.choice(board.legal_moves()))
+        yield board
+
+
+def searchable(dims, count=30):
+    """(position, most ordered) for the positions small enough to search"""
+    for board in positions(dims, count):
+        best = most_ordered(board)
+        if best is not None:
+            yield board, best
@@ -0,0 +1,80 @@
+"""The NumPy batch engine, against `engine.Board` on the same layouts"""
+
+import random
+from collections import Counter
+
+import numpy as np
+
+from batch import BatchBoards
+from engine import BLANK, Board
+
+GAMES = 64
+
+
+def check(batch, boards):
+    """The batch's view of each layout is the board's"""
+    from_slots, to_slots, valid = batch.legal_moves()
+    splits = batch.split_index()
+    stuck = batch.is_stuck()
+    ordered = batch.ordered_count()
+    won = batch.is_ordered()
+    for i, board in enumerate(boards):
+        assert batch.flat[i].tolist() == board.cells.tolist()
+        moves = {(int(f), int(t)) for f, t, ok in zip(from_slots[i], to_slots[i], valid[i]) if ok}
+        assert moves == set(board.legal_moves())
+        assert splits[i].tolist() == [board.split_index(row) for row in range(4)]
+        assert stuck[i] == board.is_stuck()
+        assert ordered[i] == board.ordered_count()
+        assert won[i] == board.is_ordered()
+        for code, slot in enumerate(batch.pos[i]):
+            if slot != BLANK:
+                assert board.cells[slot] == code
+
+
+def test_same_as_board():
+    rng = random.Random(0)
+    boards = [Board.deal(random.Random(seed)) for seed in range(GAMES)]
+    batch = BatchBoards([board.cells.tolist() for board in boards])
+    np_rng = np.random.default_rng(0)
+    check(batch, boards)
+
+    for step in range(300):
+        if step % 100 == 99:
+            # a new round for the stuck layouts (and some that aren't), in both
+            which = np.array([i for i, board in enumerate(boards) if board.is_stuck() or rng.random() < 0.2])
+            before = [boards[i] for i in which]
+            batch.redeal(which, np_rng)
+            for i, old in zip(which, before):
+                # the batch shuffles with NumPy, so its new layout is different from `Board.redeal`'s,
+                # but the ordered cards stay, with a space after each row's, and the rest are the same cards
+                new = Board(batch.flat[i].tolist())
+                assert new.splits == old.splits
+                for row, split in enumerate(old.splits):
+                    assert new.row(row)[:split] == old.row(row)[:split]
+                    assert new.card_at(row, split) == BLANK
+                assert Counter(new.cells) == Counter(old.cells)
+                # and the same as what `Board.redeal` makes, apart from the order of the shuffled cards
+                expected = old.copy()
+                expected.redeal(random.Random(step))
+                assert [code == BLANK for code in new.cells] == [code == BLANK for code in expected.cells]
+                boards[i] = new
+        else:
+            from_slots = np.zeros(GAMES, dtype=np.int64)
+            to_slots = np.zeros(GAMES, dtype=np.int64)
+            active = np.zeros(GAMES, dtype=bool)
+            for i, board in enumerate(boards):
+                if not board.is_stuck():
+                    move = rng.choice(board.legal_moves())
+                    board.apply(move)
+                    from_slots[i], to_slots[i] = move
+                    active[i] = True
+            batch.apply(from_slots, to_slots, active)
+        check(batch, boards)
+
+
+def test_deal():
+    batch = BatchBoards.deal(100, np.random.default_rng(1))
+    for cells in batch.flat:
+        board = Board(cells.tolist())
+        board.check_index()
+        assert sorted(board.cells) == sorted(Board.deal(random.Random(0)).cells)
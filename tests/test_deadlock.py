@@ -0,0 +1,39 @@
+"""The frozen cards and the bound on the ordered cards, against brute-force searches and random play"""
+
+import random
+
+import pytest
+
+from brute_force import positions, searchable
+from deadlock import frozen_cards, is_dead, ordered_bound
+from engine import BLANK, Dimensions
+
+SIZES = [Dimensions.of(2, 4), Dimensions.of(3, 5), Dimensions.of(3, 6), Dimensions.of(4, 5), Dimensions.of(4, 6)]
+
+
+@pytest.mark.parametrize("dims", SIZES, ids=str)
+def test_bound_is_at_least_the_best(dims):
+    checked = 0
+    for board, best in searchable(dims):
+        bound = ordered_bound(board)
+        assert board.ordered_count() <= best <= bound <= dims.all_ordered, f"on\n{board}"
+        # dead means no line orders any more cards
+        if is_dead(board):
+            assert best == board.ordered_count()
+        checked += 1
+    assert checked >= 15
+
+
+@pytest.mark.parametrize("dims", SIZES + [Dimensions.of(4, 13)], ids=str)
+def test_frozen_cards_never_move(dims):
+    rng = random.Random(str(dims))
+    for board in positions(dims, 20):
+        frozen = frozen_cards(board)
+        slots = {code: board.slot_of(code) for code in board.cells if code != BLANK and frozen[code]}
+        # random play to the end of the round (or for a good while)
+        for _ in range(500):
+            if board.is_stuck():
+                break
+            board.apply(rng.choice(board.legal_moves()))
+            for code, slot in slots.items():
+                assert board.slot_of(code) == slot
@@ -0,0 +1,112 @@
+"""The board's indexes, checked against the layout (with `Board.debug`) over random games"""
+
+import random
+
+import pytest
+
+from engine import BLANK, STANDARD, Board, Dimensions, Journal
+
+SIZES = [STANDARD, Dimensions.of(4, 6), Dimensions.of(2, 3), Dimensions.of(1, 5), Dimensions.of(8, 13)]
+
+
+@pytest.fixture(autouse=True)
+def debug(monkeypatch):
+    # check the index after every change to the board
+    monkeypatch.setattr(Board, "debug", True)
+
+
+def brute_force_moves(board):
+    """Every valid move, by trying every pair of slots"""
+    size = board.dims.size
+    return [(from_slot, to_slot) for to_slot in range(size) for from_slot in range(size)
+            if board.is_valid_move(from_slot, to_slot)]
+
+
+def check(board):
+    """Check everything the board keeps up to date against what it would be worked out from scratch"""
+    board.check_index()
+    moves = board.legal_moves()
+    assert sorted(moves) == sorted(brute_force_moves(board))
+    assert [to_slot for _, to_slot in moves] == sorted(to_slot for _, to_slot in moves)
+    # a live space is one a card can be moved into
+    assert board.is_stuck() == (not moves)
+    assert board.live == [board.count_live_blanks(i) for i in range(board.dims.suits)]
+    assert board.splits == [board.find_split_index(i) for i in range(board.dims.suits)]
+    assert board.ordered_count() == sum(board.splits)
+    assert board.is_ordered() == (board.ordered_count() == board.dims.all_ordered)
+
+
+@pytest.mark.parametrize("dims", SIZES, ids=str)
+@pytest.mark.parametrize("seed", range(5))
+def test_random_walk(dims, seed):
+    rng = random.Random(seed)
+    board = Board.deal(rng, dims)
+    journal = Journal(board)
+    # the layout after each entry in the journal (and before the first), to check undo and redo against
+    layouts = [board.cells.tolist()]
+    undone = []
+    check(board)
+    for _ in range(400):
+        action = rng.random()
+        if action < 0.6 and not board.is_stuck():
+            journal.move(rng.choice(board.legal_moves()))
+            layouts.append(board.cells.tolist())
+            undone.clear()
+        elif action < 0.75:
+            across_rounds = rng.random() < 0.5
+            if journal.undo(across_rounds) is not None:
+                undone.append(layouts.pop())
+                assert board.cells.tolist() == layouts[-1]
+        elif action < 0.9:
+            across_rounds = rng.random() < 0.5
+            if journal.redo(across_rounds) is not None:
+                layouts.append(undone.pop())
+                assert board.cells.tolist() == layouts[-1]
+        else:
+            ordered = board.splits[:]
+            journal.redeal(rng)
+            layouts.append(board.cells.tolist())
+            undone.clear()
+            # the ordered cards stay, with a space after them
+            assert board.splits == ordered
+            for i, split in enumerate(ordered):
+                assert board.card_at(i, split) == BLANK
+        check(board)
+
+
+@pytest.mark.parametrize("dims", SIZES, ids=str)
+def test_unapply(dims):
+    board = Board.deal(random.Random(1), dims)
+    for move in board.legal_moves():
+        before = board.copy()
+        board.apply(move)
+        board.unapply(move)
+        assert board.cells == before.cells
+        assert board.hash == before.hash
+        assert (board.live, board.live_total, board.splits) == (before.live, before.live_total, before.splits)
+
+
+def test_check_index_finds_mistakes():
+    board = Board.deal(random.Random(2))
+    board.live[0] += 1
+    with pytest.raises(AssertionError):
+        board.check_index()
+
+    board = Board.deal(random.Random(2))
+    code = next(code for code in board.cells if code != BLANK)
+    board.pos[code] = (board.pos[code] + 1) % len(board.cells)
+    with pytest.raises(AssertionError):
+        board.check_index()
+
+
+def test_ordered_board():
+    # each row 2 to the top rank of one suit, then a space
+    dims = Dimensions.of(3, 5)
+    cells = []
+    for suit in range(dims.suits):
+        cells.extend(dims.code(suit, rank) for rank in range(2, dims.top + 1))
+        cells.append(BLANK)
+    board = Board(cells, dims)
+    check(board)
+    assert board.is_ordered()
+    assert board.is_stuck()
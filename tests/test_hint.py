@@ -0,0 +1,43 @@
+"""The hint search, run in this process (without the worker)"""
+
+import random
+
+from engine import Board
+from hint import think
+from poscache import PositionCache
+
+
+class Conn:
+    """Stands in for the worker's end of the pipe: collects the hints, with no messages coming in"""
+
+    def __init__(self):
+        self.hints = []
+
+    def send(self, hint):
+        self.hints.append(hint)
+
+    def poll(self):
+        return False
+
+
+def hints_for(cache, board, time_budget=0.5):
+    conn = Conn()
+    assert think(conn, cache, 1, board.cells.tolist(), board.dims, 1, time_budget) is None
+    return conn.hints
+
+
+def test_asking_twice_goes_as_deep():
+    # a fresh deal has more than 2 moves in it, so a depth 2 search doesn't cover the round
+    board = Board.deal(random.Random(0))
+    cache = PositionCache()
+    first = hints_for(cache, board)
+    assert not first[0].final
+    assert cache.misses
+
+    # the second time, the searches come from the cache, but the depth 2 one still isn't the last
+    second = hints_for(cache, board)
+    assert cache.memory_hits
+    assert not second[0].final
+    assert (second[0].depth, second[0].ordered, second[0].move) == (first[0].depth, first[0].ordered, first[0].move)
+    assert max(hint.depth for hint in second) > 2
+    assert second[-1].final
@@ -0,0 +1,70 @@
+"""The launcher's command line (without opening a window)"""
+
+import sys
+import types
+
+import pytest
+
+import interference
+import simulate
+from engine import STANDARD, Dimensions
+
+
+def simulate_args(monkeypatch, argv):
+    """Run `interference.main(argv)`, returning what it asked `stream_games` for"""
+    calls = []
+
+    def stream_games(games, policy, seed, workers, rounds, stop_when_dead=False, dims=STANDARD):
+        calls.append((rounds, dims))
+        return iter(())
+
+    monkeypatch.setattr(simulate, "stream_games", stream_games)
+    interference.main(argv + ["--games", "1", "--output", "-"])
+    [call] = calls
+    return call
+
+
+def test_simulate_defaults(monkeypatch):
+    assert simulate_args(monkeypatch, ["simulate"]) == (3, STANDARD)
+
+
+def test_simulate_gets_the_game_flags(monkeypatch):
+    # given before the subcommand, they mustn't be replaced by its defaults
+    assert simulate_args(monkeypatch, ["--dims", "4x6", "--rounds", "2", "simulate"]) == (2, Dimensions.of(4, 6))
+
+
+def test_simulate_flags(monkeypatch):
+    assert simulate_args(monkeypatch, ["simulate", "--dims", "4x6", "--rounds", "2"]) == (2, Dimensions.of(4, 6))
+
+
+@pytest.mark.parametrize("game_flags", [["--dims", "4x6"], ["--rounds", "5"]])
+@pytest.mark.parametrize("file_flag", ["--log", "--deals"])
+def test_logs_and_deals_are_standard_only(game_flags, file_flag, tmp_path, monkeypatch):
+    # (before any window is opened)
+    monkeypatch.setattr(interference, "configure", None)
+    with pytest.raises(SystemExit):
+        interference.main(game_flags + [file_flag, str(tmp_path / "file")])
+
+
+def watch_args(monkeypatch, argv):
+    """Run `interference.main(argv)` for the watch command, returning what it asked `spectator.watch` for
+    (spectator needs arcade, so it's replaced before it's imported)"""
+    calls = []
+    spectator = types.ModuleType("spectator")
+    spectator.watch = lambda *args: calls.append(args)
+    monkeypatch.setitem(sys.modules, "spectator", spectator)
+    interference.main(argv)
+    [call] = calls
+    return call
+
+
+def test_watch_gets_the_rounds(monkeypatch):
+    assert watch_args(monkeypatch, ["watch"])[-1] == 3
+    assert watch_args(monkeypatch, ["--rounds", "2", "watch"])[-1] == 2
+    assert watch_args(monkeypatch, ["watch", "--rounds", "5"])[-1] == 5
+
+
+@pytest.mark.parametrize("argv", [["--dims", "4x6", "watch"], ["watch", "--dims", "4x6"]])
+def test_watch_is_standard_only(monkeypatch, argv):
+    with pytest.raises(SystemExit):
+        watch_args(monkeypatch, argv)
@@ -0,0 +1,119 @@
+"""Move logs: written with `MoveLog`, read back and replayed"""
+
+import io
+import random
+
+import pytest
+
+from engine import ROUNDS, Board, Journal, Redeal
+from movelog import HEADER, MAGIC, LogError, MoveLog, read_games, replay
+
+
+def play(log, seed, rng, actions=300):
+    """Play a game as the game view does (moves, new rounds, undo and redo, through a `Journal`),
+    logging it, and return the board, the journal and the round it ends on"""
+    deal_rng = random.Random(seed)
+    board = Board.deal(deal_rng)
+    journal = Journal(board)
+    log.start_game(seed)
+    round = 1
+    for _ in range(actions):
+        action = rng.random()
+        if action < 0.6 and not board.is_stuck():
+            move = rng.choice(board.legal_moves())
+            journal.move(move)
+            log.move(*move)
+        elif action < 0.7 and round < ROUNDS:
+            journal.redeal(deal_rng)
+            log.redeal()
+            round += 1
+        elif action < 0.85:
+            entry = journal.undo(across_rounds=rng.random() < 0.5)
+            if entry is not None:
+                log.undo()
+                round -= isinstance(entry, Redeal)
+        else:
+            entry = journal.redo(across_rounds=rng.random() < 0.5)
+            if entry is not None:
+                log.redo()
+                round += isinstance(entry, Redeal)
+    return board, journal, round
+
+
+def line(entries):
+    """Moves and new rounds, comparable between a journal and a replay"""
+    return [entry.perm.tolist() if isinstance(entry, Redeal) else tuple(entry) for entry in entries]
+
+
+def test_round_trip():
+    file = io.BytesIO()
+    log = MoveLog(file)
+    rng = random.Random(0)
+    games = [(seed, *play(log, seed, rng)) for seed in range(20)]
+    data = file.getvalue()
+
+    logged = list(read_games(data))
+    assert [seed for seed, _ in logged] == [seed for seed, *_ in games]
+    for (seed, body), (_, board, journal, round) in zip(logged, games):
+        result = replay(seed, body)
+        assert result.valid, result.error
+        assert result.board.cells == board.cells
+        assert result.rounds == round
+        assert result.moves == sum(not isinstance(entry, Redeal) for entry in journal.done)
+        assert line(result.line) == line(journal.done)
+        assert result.ordered == board.ordered_count()
+        assert result.won == board.is_ordered()
+
+
+def test_version_1():
+    # no undo or redo, but otherwise the same
+    board = Board.deal(random.Random(5))
+    move = board.legal_moves()[0]
+    data = HEADER.pack(MAGIC, 1, 5) + bytes(move)
+    [(seed, body)] = read_games(data)
+    result = replay(seed, body)
+    assert result.valid and result.moves == 1
+
+
+def logged_game(seed=3):
+    file = io.BytesIO()
+    play(MoveLog(file), seed, random.Random(seed), actions=50)
+    return file.getvalue()
+
+
+def test_cut_off_in_a_move():
+    data = logged_game()[:-1]
+    [(seed, body)] = read_games(data)
+    assert "part way through a move" in replay(seed, body).error
+
+
+def test_cut_off_in_a_header():
+    data = logged_game() + logged_game()[:HEADER.size - 1]
+    with pytest.raises(LogError, match="part way through a game header"):
+        list(read_games(data))
+
+
+def test_bad_magic():
+    data = b"XYZ" + logged_game()[3:]
+    with pytest.raises(LogError, match="expected a game header"):
+        list(read_games(data))
+
+
+def test_bad_version():
+    data = HEADER.pack(MAGIC, 99, 1)
+    with pytest.raises(LogError, match="version"):
+        list(read_games(data))
+
+
+def test_invalid_moves():
+    seed = 4
+    board = Board.deal(random.Random(seed))
+    space = board.blanks[0]
+    # a space can't be moved, nor can anything go in a space that's taken
+    taken = next(slot for slot in range(len(board.cells)) if slot not in board.blanks)
+    for move in [(space, board.blanks[1]), (taken, taken)]:
+        result = replay(seed, bytes(move))
+        assert not result.valid and "isn't valid" in result.error
+    assert "nothing to undo" in replay(seed, b"\xfe\xfe").error
+    assert "nothing to redo" in replay(seed, b"\xfd\xfd").error
+    assert "new round after round" in replay(seed, b"\xff\xff" * ROUNDS).error
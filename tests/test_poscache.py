@@ -0,0 +1,113 @@
+"""The solver cache: keys with the rows in canonical order, moves mapped back, and the two tiers"""
+
+import random
+
+import pytest
+
+from engine import STANDARD, Board, Dimensions
+from poscache import PositionCache, decode, encode, from_canonical, position_key, solve_cached, to_canonical
+
+SMALL = Dimensions.of(4, 6)
+
+
+def permuted(board, order):
+    """A copy of the board with its rows in another order (row i of the copy is row order[i])"""
+    cells = []
+    for i in order:
+        cells.extend(board.row(i))
+    return Board(cells, board.dims)
+
+
+def replay(board, moves):
+    """Make the moves on a copy of the board, checking each one's valid"""
+    board = board.copy()
+    for move in moves:
+        assert board.is_valid_move(*move), f"{move} isn't valid on\n{board}"
+        board.apply(move)
+    return board
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_permuted_board_hits(seed):
+    rng = random.Random(seed)
+    board = Board.deal(rng, SMALL)
+    order = list(range(SMALL.suits))
+    rng.shuffle(order)
+    other = permuted(board, order)
+    assert position_key(board)[0] == position_key(other)[0]
+
+    cache = PositionCache()
+    first = solve_cached(cache, board)
+    assert first.complete
+    assert cache.misses == 1 and len(cache) == 1
+    assert replay(board, first.moves).ordered_count() == first.ordered
+
+    second = solve_cached(cache, other)
+    assert cache.memory_hits == 1
+    assert second.ordered == first.ordered
+    assert replay(other, second.moves).ordered_count() == second.ordered
+
+
+def test_canonical_moves_round_trip():
+    board = Board.deal(random.Random(1))
+    key, order = position_key(board)
+    moves = board.legal_moves()
+    canonical = to_canonical(moves, order, STANDARD.ranks)
+    assert from_canonical(canonical, order, STANDARD.ranks) == moves
+
+
+def test_key_has_the_search():
+    board = Board.deal(random.Random(2), SMALL)
+    keys = {position_key(board, rounds_left, max_depth)[0] for rounds_left in (1, 2) for max_depth in (None, 4)}
+    assert len(keys) == 4
+    # and the size, so boards of other sizes with the same cells can't share a key
+    assert position_key(board)[0] != position_key(Board(board.cells, Dimensions.of(6, 4)))[0]
+
+
+def test_depth_limit_is_remembered():
+    board = Board.deal(random.Random(3), SMALL)
+    cache = PositionCache()
+    searched = solve_cached(cache, board, max_depth=2)
+    cached = solve_cached(cache, board, max_depth=2)
+    assert cache.memory_hits == 1
+    assert searched.stats.max_depth == 2 and cached.stats.max_depth == 2
+    assert cached.moves == searched.moves
+
+
+def test_old_entries():
+    # (before the depth limit flag, an entry was the ordered count and then the moves)
+    moves = [(1, 2), (3, 4)]
+    assert decode(bytes([7, 1, 2, 3, 4])) == (moves, 7, True)
+    assert decode(encode(moves, 7, False)) == (moves, 7, False)
+
+
+def test_lru_eviction():
+    cache = PositionCache(max_entries=2)
+    cache.put(b"a", [], 1)
+    cache.put(b"b", [], 2)
+    cache.get(b"a") # now b is the least recently used
+    cache.put(b"c", [], 3)
+    assert cache.evictions == 1
+    assert cache.get(b"b") is None
+    assert cache.get(b"a")[1] == 1
+    assert cache.get(b"c")[1] == 3
+
+
+def test_sqlite_survives_restarts(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    board = Board.deal(random.Random(4), SMALL)
+    cache = PositionCache(path)
+    first = solve_cached(cache, board)
+    cache.close()
+
+    cache = PositionCache(path)
+    assert cache.disk_entries() == 1
+    other = permuted(board, [3, 1, 0, 2])
+    second = solve_cached(cache, other)
+    assert cache.disk_hits == 1
+    assert second.ordered == first.ordered
+    assert replay(other, second.moves).ordered_count() == second.ordered
+    # and it's in memory now
+    solve_cached(cache, other)
+    assert cache.memory_hits == 1
+    cache.close()
@@ -0,0 +1,53 @@
+"""The solver, against a brute-force search, on boards small enough to search that way"""
+
+import random
+
+import pytest
+
+from brute_force import searchable
+from engine import Board, Dimensions
+from solver import solve
+
+SIZES = [Dimensions.of(2, 4), Dimensions.of(3, 5), Dimensions.of(3, 6), Dimensions.of(4, 5), Dimensions.of(4, 6)]
+
+
+@pytest.mark.parametrize("dims", SIZES, ids=str)
+def test_matches_brute_force(dims):
+    checked = 0
+    for board, best in searchable(dims):
+        solution = solve(board)
+        assert solution.complete
+        assert solution.ordered == best, f"on\n{board}"
+
+        # the moves are legal, and get there
+        after = board.copy()
+        for move in solution.moves:
+            assert after.is_valid_move(*move)
+            after.apply(move)
+        assert after.ordered_count() == solution.ordered
+        assert solution.won == after.is_ordered()
+        checked += 1
+    assert checked >= 15
+
+
+def test_leaves_the_board_alone():
+    board = Board.deal(random.Random(0), Dimensions.of(4, 6))
+    before = board.copy()
+    solve(board)
+    assert board.cells == before.cells and board.hash == before.hash
+
+
+def test_depth_limit():
+    board = Board.deal(random.Random(1), Dimensions.of(4, 6))
+    for depth in range(4):
+        solution = solve(board, max_depth=depth)
+        assert len(solution.moves) <= depth
+        assert solution.stats.max_depth <= depth
+
+
+def test_node_limit_stops_early():
+    # a standard first round is far too big to search in 1000 positions
+    board = Board.deal(random.Random(2))
+    solution = solve(board, node_limit=1000)
+    assert not solution.complete
+    assert solution.stats.nodes < 2000
@@ -0,0 +1,433 @@
+"""
+Strategies for playing Interference, and a tournament to compare them.
+
+A strategy is anything with a `choose(view, rng)` method (see `Strategy`), which is
+given a `BoardView` (a read-only look at the game: the legal moves, the rows,
+the round) and returns a move, (from_slot, to_slot), or REDEAL to give up on
+the round and start the next one. The policies in simulate.py can be used as
+strategies too (`PolicyStrategy`), and a strategy (or policy) in another module
+can be named as "module:name".
+
+`tournament` plays every strategy on the same games: game number n has the same
+seed for every strategy, so the same deal, and the same cards come out for each
+new round (the deal and the redeals come from one seeded random number generator,
+whatever the strategy does), as in `simulate.play_game`. The games are shared out
+in shards between worker processes.
+
+Each decision has a CPU time limit. On Unix it's enforced with a CPU-time timer
+(SIGPROF), which stops a strategy that's still thinking; elsewhere a decision
+is only checked once it's made. A strategy that runs out of time, or returns a
+move that isn't legal, loses the rest of that round (as if it had chosen REDEAL).
+
+    python tournament.py random greedy solver --games 1000 --time-limit 0.1
+"""
+
+import argparse
+import importlib
+import json
+import math
+import multiprocessing
+import random
+import signal
+import time
+
+from engine import ROUNDS, STANDARD, Board, Dimensions
+from simulate import (MAX_MOVES_PER_ROUND, SOLVER_MEMORY_MB, SOLVER_NODE_LIMIT, GameResult, SolverPolicy,
+                      game_seed, greedy_policy, random_policy)
+
+# What a strategy returns to start the next round
+REDEAL = "redeal"
+
+# CPU seconds a strategy has for each decision
+TIME_LIMIT = 1.0
+
+# Games per shard (the same for every strategy, so the shards line up)
+SHARD_SIZE = 50
+
+# z for a 95% confidence interval
+Z_95 = 1.959964
+
+# SIGPROF counts the CPU time of the process (not available on Windows)
+CPU_TIMER = hasattr(signal, "setitimer") and hasattr(signal, "SIGPROF")
+
+
+class BoardView:
+    """A read-only look at a game in progress, which is what a strategy gets to see.
+    A strategy that wants to search ahead can take a `copy` of the board."""
+
+    __slots__ = ("_board", "round", "rounds", "time_limit")
+
+    def __init__(self, board, round, rounds=ROUNDS, time_limit=None):
+        self._board = board
+        self.round = round # (from 1)
+        self.rounds = rounds
+        self.time_limit = time_limit # CPU seconds for this decision
+
+    @property
+    def rounds_left(self):
+        """Rounds left, counting this one"""
+        return self.rounds - self.round + 1
+
+    @property
+    def hash(self):
+        return self._board.hash
+
+    @property
+    def dims(self):
+        """The size of the board (see `engine.Dimensions`)"""
+        return self._board.dims
+
+    def legal_moves(self):
+        return self._board.legal_moves()
+
+    def is_valid_move(self, from_slot, to_slot):
+        return self._board.is_valid_move(from_slot, to_slot)
+
+    def row(self, i):
+        """The card codes in row i (a copy)"""
+        return tuple(self._board.row(i))
+
+    def card_at(self, row, col):
+        return self._board.card_at(row, col)
+
+    def slot_of(self, code):
+        return self._board.slot_of(code)
+
+    def split_index(self, i):
+        return self._board.split_index(i)
+
+    def ordered_count(self):
+        return self._board.ordered_count()
+
+    def is_stuck(self):
+        return self._board.is_stuck()
+
+    def copy(self):
+        """A `Board` of the position, to do as you like with"""
+        return self._board.copy()
+
+    def __str__(self):
+        return str(self._board)
+
+
+class Strategy:
+    """Chooses the moves in a game. Subclasses override `choose`, and `new_game` if they keep any state."""
+
+    name = "strategy"
+
+    def new_game(self, seed):
+        """Called before each game"""
+
+    def choose(self, view, rng):
+        """A legal move for the position in `view` (a `BoardView`), or REDEAL.
+        `rng` is for any random choices, so that games can be played again."""
+        raise NotImplementedError
+
+
+class PolicyStrategy(Strategy):
+    """A strategy from a policy as in simulate.py: a function of (board, rng)
+    that returns a move, or None to give up on the round"""
+
+    def __init__(self, policy, name=None):
+        self.policy = policy
+        self.name = name or policy.__name__
+
+    def choose(self, view, rng):
+        move = self.policy(view, rng)
+        return REDEAL if move is None else move
+
+
+class SolverStrategy(Strategy):
+    """Plays the solver's line for each round (see `simulate.SolverPolicy`),
+    searching for as long as the time limit allows"""
+
+    name = "solver"
+
+    def __init__(self, node_limit=SOLVER_NODE_LIMIT, memory_mb=SOLVER_MEMORY_MB):
+        self.policy = SolverPolicy(node_limit, memory_mb)
+
+    def new_game(self, seed):
+        self.policy.plan = []
+
+    def choose(self, view, rng):
+        if view.time_limit is not None:
+            # (leaving some time over for making the plan)
+            self.policy.time_limit = view.time_limit * 0.8
+        move = self.policy(view, rng)
+        return REDEAL if move is None else move
+
+
+# The strategies that can be named on the command line, as functions that make one
+STRATEGIES = {
+    "random": lambda: PolicyStrategy(random_policy, "random"),
+    "greedy": lambda: PolicyStrategy(greedy_policy, "greedy"),
+    "solver": SolverStrategy,
+}
+
+
+def load_strategy(name):
+    """Make a strategy from its name in STRATEGIES, or from "module:name"
+    (a strategy class, or instance, or a policy function)"""
+    if name in STRATEGIES:
+        return STRATEGIES[name]()
+    if ":" not in name:
+        raise ValueError(f"unknown strategy {name!r}: expected one of {sorted(STRATEGIES)}, or module:name")
+    module_name, attr = name.split(":", 1)
+    found = getattr(importlib.import_module(module_name), attr)
+    if isinstance(found, type):
+        found = found()
+    if not hasattr(found, "choose"):
+        # a plain policy function (of board, rng)
+        found = PolicyStrategy(found, name)
+    return found
+
+
+class MoveTimeout(Exception):
+    """A strategy ran out of CPU time for a decision"""
+
+
+def on_timeout(signum, frame):
+    raise MoveTimeout()
+
+
+class DecisionStats:
+    """How long a strategy took to decide (wall time, as CPU time is only counted in ticks
+    on some systems, which is fine for a limit, but too coarse for a mean),
+    and how often it broke the rules"""
+
+    def __init__(self):
+        self.decisions = 0
+        self.seconds = 0.0 # in total
+        self.max_seconds = 0.0
+        self.timeouts = 0
+        self.illegal = 0
+
+    def add(self, seconds):
+        self.decisions += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def merge(self, other):
+        self.decisions += other.decisions
+        self.seconds += other.seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.timeouts += other.timeouts
+        self.illegal += other.illegal
+
+    @property
+    def mean_seconds(self):
+        return self.seconds / self.decisions if self.decisions else 0.0
+
+
+def decide(strategy, view, rng, stats):
+    """Ask the strategy for a move, within the time limit. Returns the move, or REDEAL if it
+    chose to, ran out of time, or chose a move that isn't legal."""
+    limit = view.time_limit
+    timed = CPU_TIMER and limit is not None
+    timed_out = False
+    began = time.perf_counter()
+    cpu_began = time.process_time()
+    try:
+        if timed:
+            signal.setitimer(signal.ITIMER_PROF, limit)
+        try:
+            move = strategy.choose(view, rng)
+        finally:
+            if timed:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+    except MoveTimeout:
+        timed_out = True
+    cpu_seconds = time.process_time() - cpu_began
+    stats.add(time.perf_counter() - began)
+
+    if timed_out or (limit is not None and cpu_seconds > limit):
+        stats.timeouts += 1
+        return REDEAL
+    if move == REDEAL:
+        return REDEAL
+    try:
+        from_slot, to_slot = move
+        size = view.dims.size
+        legal = 0 <= from_slot < size and 0 <= to_slot < size and view.is_valid_move(from_slot, to_slot)
+    except (TypeError, ValueError):
+        legal = False
+    if not legal:
+        stats.illegal += 1
+        return REDEAL
+    return (from_slot, to_slot)
+
+
+def play_match(seed, strategy, stats, rounds=ROUNDS, max_moves=MAX_MOVES_PER_ROUND, time_limit=TIME_LIMIT,
+               dims=STANDARD):
+    """Play a game from the deal given by `seed` with a strategy (as `simulate.play_game` does with a policy),
+    adding its decisions to `stats`"""
+    result = GameResult(seed)
+    began = time.perf_counter()
+    # the same random number generators as play_game, so the cards come out the same
+    deal_rng = random.Random(seed)
+    strategy_rng = random.Random(f"{seed}/policy")
+    board = Board.deal(deal_rng, dims)
+    strategy.new_game(seed)
+
+    for round in range(1, rounds + 1):
+        if round > 1:
+            board.redeal(deal_rng)
+
+        view = BoardView(board, round, rounds, time_limit)
+        moves = 0
+        while moves < max_moves and not board.is_stuck():
+            move = decide(strategy, view, strategy_rng, stats)
+            if move == REDEAL:
+                break
+            board.apply(move)
+            moves += 1
+
+        result.ordered.append(board.ordered_count())
+        result.moves.append(moves)
+        if board.is_ordered():
+            result.won = True
+            break
+
+    result.seconds = time.perf_counter() - began
+    return result
+
+
+class StrategyStats:
+    """One strategy's results in a tournament"""
+
+    def __init__(self, name):
+        self.name = name
+        self.games = 0
+        self.wins = 0
+        self.ordered = 0 # at the end of the game, in total
+        self.rounds_used = 0
+        self.decisions = DecisionStats()
+        self.results = {} # game number -> won, for comparing strategies game by game
+
+    def add(self, game, result):
+        self.games += 1
+        self.wins += result.won
+        self.ordered += result.ordered[-1]
+        self.rounds_used += result.rounds
+        self.results[game] = result.won
+
+    def merge(self, other):
+        self.games += other.games
+        self.wins += other.wins
+        self.ordered += other.ordered
+        self.rounds_used += other.rounds_used
+        self.decisions.merge(other.decisions)
+        self.results.update(other.results)
+
+    @property
+    def win_rate(self):
+        return self.wins / self.games if self.games else 0.0
+
+    def win_rate_interval(self, z=Z_95):
+        return wilson_interval(self.wins, self.games, z)
+
+    def as_dict(self):
+        low, high = self.win_rate_interval()
+        return {
+            "games": self.games,
+            "wins": self.wins,
+            "win_rate": self.win_rate,
+            "win_rate_95": [low, high],
+            "mean_ordered": self.ordered / self.games if self.games else 0.0,
+            "mean_rounds": self.rounds_used / self.games if self.games else 0.0,
+            "decisions": self.decisions.decisions,
+            "mean_decision_seconds": self.decisions.mean_seconds,
+            "max_decision_seconds": self.decisions.max_seconds,
+            "timeouts": self.decisions.timeouts,
+            "illegal_moves": self.decisions.illegal,
+        }
+
+
+def wilson_interval(wins, games, z=Z_95):
+    """Wilson score interval for a win rate (which, unlike the usual +/- interval,
+    behaves when there are few games, or the rate is near 0 or 1)"""
+    if not games:
+        return 0.0, 1.0
+    p = wins / games
+    centre = (p + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z / (1 + z * z / games) * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games))
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def run_shard(args):
+    """Play games `start` to `stop` of a tournament with one strategy (in a worker process)"""
+    name, master_seed, start, stop, rounds, time_limit, dims = args
+    if CPU_TIMER:
+        signal.signal(signal.SIGPROF, on_timeout)
+    strategy = load_strategy(name)
+    stats = StrategyStats(name)
+    for game in range(start, stop):
+        stats.add(game, play_match(game_seed(master_seed, game), strategy, stats.decisions, rounds,
+                                   time_limit=time_limit, dims=dims))
+    return stats
+
+
+def tournament(strategies, games, seed=0, workers=None, rounds=ROUNDS, time_limit=TIME_LIMIT,
+               shard_size=SHARD_SIZE, dims=STANDARD):
+    """Play `games` games with each of the named strategies, on the same deals,
+    and return their `StrategyStats` (by name)"""
+    shards = [(name, seed, start, min(start + shard_size, games), rounds, time_limit, dims)
+              for start in range(0, games, shard_size) for name in strategies]
+
+    stats = {name: StrategyStats(name) for name in strategies}
+    if workers == 1:
+        for shard in shards:
+            shard_stats = run_shard(shard)
+            stats[shard_stats.name].merge(shard_stats)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for shard_stats in pool.imap_unordered(run_shard, shards):
+                stats[shard_stats.name].merge(shard_stats)
+    return stats
+
+
+def head_to_head(a, b):
+    """Games (of those both played) won by `a` and not `b`, and won by `b` and not `a`"""
+    games = a.results.keys() & b.results.keys()
+    only_a = sum(a.results[game] and not b.results[game] for game in games)
+    only_b = sum(b.results[game] and not a.results[game] for game in games)
+    return only_a, only_b
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play strategies against each other, on the same deals")
+    parser.add_argument("strategies", nargs="+", metavar="STRATEGY",
+                        help=f"one of {', '.join(sorted(STRATEGIES))}, or module:name")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, metavar="SECONDS",
+                        help="CPU time for each decision (default %(default)s)")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--dims", type=Dimensions.parse, default=STANDARD, metavar="SUITSxRANKS",
+                        help="size of the board (default %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    for name in args.strategies:
+        load_strategy(name) # (to fail now if there's a typo, rather than in every worker)
+
+    began = time.perf_counter()
+    stats = tournament(args.strategies, args.games, args.seed, args.workers, args.rounds, args.time_limit,
+                       dims=args.dims)
+    if args.json:
+        print(json.dumps({name: strategy_stats.as_dict() for name, strategy_stats in stats.items()}, indent=2))
+    else:
+        for name, strategy_stats in stats.items():
+            out = strategy_stats.as_dict()
+            low, high = out["win_rate_95"]
+            print(f"{name:12} {out['win_rate']:7.2%} won (95% CI {low:.2%} to {high:.2%}), "
+                  f"mean ordered {out['mean_ordered']:.1f}, "
+                  f"{out['mean_decision_seconds'] * 1e3:.3f} ms per decision (max {out['max_decision_seconds'] * 1e3:.1f}), "
+                  f"{out['timeouts']} timeouts, {out['illegal_moves']} illegal")
+        names = list(stats)
+        for i, a in enumerate(names):
+            for b in names[i + 1:]:
+                only_a, only_b = head_to_head(stats[a], stats[b])
+                print(f"{a} won {only_a} games that {b} lost, and lost {only_b} that it won")
+        print(f"{time.perf_counter() - began:.1f}s")